@@ -7,6 +7,7 @@ import { ArchivoCargado } from "../entities/ArchivoCargado";
 import { AuditoriaCargas } from "../entities/AuditoriaCargas";
 import { ingestarKardex } from "../services/ingestaKardex";
 import { sha256File } from "../utils/fileHash";
+import { parserErrorStatus, parserJobOptions } from "../utils/parserJobQueue";
 
 export const kardexController = {
     uploadFile: async (req: Request, res: Response) => {
@@ -56,8 +57,29 @@ export const kardexController = {
                 })
             );
 
-            // 2) Parseamos con Python
-            const py = await runPythonKardex(absPath);
+            // 2) Parseamos con Python (el hash permite reutilizar la caché de parseo).
+            //    El trabajo pasa por la cola de parseo: ?bulk=1 lo deja detrás de las
+            //    cargas interactivas y se cancela si el cliente corta la conexión.
+            let py: any;
+            try {
+                py = await runPythonKardex(absPath, [`--sha256=${hash}`], parserJobOptions(req, res));
+            } catch (e: any) {
+                await auditRepo.save(
+                    auditRepo.create({
+                        archivo_id: archivo.id,
+                        etapa: "PARSE",
+                        estado: "ERROR",
+                        detalle: e?.message?.substring(0, 800) || "Error al parsear el Kárdex",
+                    })
+                );
+                await archivoRepo.update(archivo.id, { estado_proceso: "ERROR" });
+                if (res.writableEnded || res.destroyed) return;
+                return res.status(parserErrorStatus(e)).json({
+                    status: "error",
+                    isValid: false,
+                    message: [e?.message || "Error al parsear el Kárdex"],
+                });
+            }
             if (!py?.ok) {
                 await auditRepo.save(
                     auditRepo.create({
@@ -6,6 +6,7 @@ import { ArchivoCargado } from "../entities/ArchivoCargado";
 import { AuditoriaCargas } from "../entities/AuditoriaCargas";
 import { sha256File } from "../utils/fileHash";
 import { ingestaPlan } from "../services/ingestaPlan";
+import { parserErrorStatus, parserJobOptions } from "../utils/parserJobQueue";
 
 export const planController = {
   uploadFile: async (req: Request, res: Response) => {
@@ -72,11 +73,29 @@ export const planController = {
       );
 
       // 1) Parsear con Python (con flags opcionales)
-      const args: string[] = [];
+      const args: string[] = [`--sha256=${hash}`];
       if (debug) args.push("--debug");
       if (ocr) args.push("--ocr");
 
-      const parsed = await runPythonPlan(fullPath, args);
+      // La cola de parseo aplica prioridad (?bulk=1), límite de concurrencia y timeout
+      let parsed: any;
+      try {
+        parsed = await runPythonPlan(fullPath, args, parserJobOptions(req, res));
+      } catch (e: any) {
+        await repoAud.save(
+          repoAud.create({
+            archivo_id: archivoId,
+            etapa: "PARSE",
+            estado: "ERROR",
+            detalle: e?.message?.substring(0, 800) || "Error al parsear el plan",
+          })
+        );
+        await repoArchivo.update(archivoId, { estado_proceso: "ERROR" });
+        if (res.writableEnded || res.destroyed) return;
+        return res
+          .status(parserErrorStatus(e))
+          .json({ ok: false, error: e?.message ?? String(e) });
+      }
 
       await repoAud.save(
         repoAud.create({
@@ -141,11 +160,12 @@ export const planController = {
       if (debug) args.push("--debug");
       if (ocr) args.push("--ocr");
 
-      const parsed = await runPythonPlan(fullPath, args);
+      const parsed = await runPythonPlan(fullPath, args, parserJobOptions(req, res));
       return res.json(parsed);
     } catch (e: any) {
+      if (res.writableEnded || res.destroyed) return;
       return res
-        .status(500)
+        .status(parserErrorStatus(e))
         .json({ ok: false, error: e?.message ?? String(e) });
     }
   },
@@ -0,0 +1,12 @@
+import { Router } from "express";
+import { getParserQueue } from "../utils/parserJobQueue";
+
+const router = Router();
+
+// Monitoreo de la cola de parseo: trabajos activos, profundidad por prioridad,
+// tiempos de espera y contadores (completados, fallidos, timeouts, cancelados).
+router.get("/stats", (_req, res) => {
+    res.json(getParserQueue().stats());
+});
+
+export default router;
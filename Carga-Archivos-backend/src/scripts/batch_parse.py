@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Procesamiento por lotes de PDFs (re-importaciones de generaciones completas).
+
+Uso:
+  python batch_parse.py <carpeta|glob|@lista.txt> [...] --out=resultados.ndjson
+                        [--parser=kardex|plan] [--jobs=N] [--manifest=RUTA] [--retry-errors]
+                        [--columnar=DIR] [--columnar-format=parquet|arrow]
+
+- Reparte los archivos entre todos los núcleos con un pool de procesos.
+- Escribe un registro NDJSON por archivo: la misma salida de main() más
+  "path" y "error" (null si todo bien). Si un archivo truena, los demás siguen.
+- Manifest reanudable (por defecto <out>.manifest): un archivo ya procesado
+  con el mismo tamaño y fecha de modificación se salta en la siguiente corrida
+  (los que fallaron también, salvo con --retry-errors).
+- Con --columnar, al terminar exporta todo el NDJSON a tablas Arrow/Parquet
+  (materias + resumen, ver columnar_export.py).
+"""
+import sys, json, os, glob, importlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# parser -> (módulo, función que recibe Path y devuelve el dict de main())
+PARSERS = {
+    "kardex": ("kardex", "parse_kardex"),
+    "plan": ("plan_estudio", "parse_plan"),
+}
+
+MAX_ATTEMPTS = 2  # caídas del worker (segfault, OOM) con el archivo corriendo solo antes de darlo por fallido
+
+
+# ------------------------ Entrada ------------------------
+def collect_inputs(specs: list[str]) -> list[Path]:
+    """Expande carpetas (recursivo), globs y listas '@archivo.txt' a PDFs únicos."""
+    found: list[Path] = []
+    for spec in specs:
+        if spec.startswith("@"):
+            with open(spec[1:], encoding="utf-8") as fh:
+                found += [Path(l.strip()) for l in fh if l.strip() and not l.startswith("#")]
+        elif os.path.isdir(spec):
+            found += sorted(Path(spec).rglob("*.pdf")) + sorted(Path(spec).rglob("*.PDF"))
+        elif glob.has_magic(spec):
+            found += [Path(p) for p in sorted(glob.glob(spec, recursive=True))]
+        else:
+            found.append(Path(spec))
+
+    seen, out = set(), []
+    for p in found:
+        key = str(p.resolve())
+        if key not in seen:
+            seen.add(key)
+            out.append(Path(key))
+    return out
+
+
+def file_stamp(path: Path) -> dict:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+# ------------------------ Manifest ------------------------
+def load_manifest(path: Path) -> dict:
+    """path -> último registro del manifest. Tolera una última línea truncada."""
+    done = {}
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            done[rec["path"]] = rec
+    return done
+
+
+def _append(fh, rec: dict) -> None:
+    fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    fh.flush()
+    os.fsync(fh.fileno())
+
+
+# ------------------------ Worker ------------------------
+def parse_one(path_str: str, parser: str) -> dict:
+    """Se ejecuta en el proceso hijo: nunca lanza, el error va en el registro."""
+    mod_name, fn_name = PARSERS[parser]
+    if not os.path.exists(path_str):
+        return {"path": path_str, "ok": False, "error": f"No existe el archivo: {path_str}"}
+    try:
+        fn = getattr(importlib.import_module(mod_name), fn_name)
+        result = fn(Path(path_str))
+        return {"path": path_str, "error": None if result.get("ok") else result.get("error"), **result}
+    except Exception as e:
+        return {"path": path_str, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_batch(files: list[Path], out_path: Path, manifest_path: Path,
+              parser: str = "kardex", jobs: int | None = None, retry_errors: bool = False) -> dict:
+    done = load_manifest(manifest_path)
+    pending = []
+    skipped = 0
+    for p in files:
+        if not p.exists():
+            pending.append(p)  # se registrará como error
+            continue
+        prev = done.get(str(p))
+        stamp = file_stamp(p)
+        if prev and prev.get("size") == stamp["size"] and prev.get("mtime_ns") == stamp["mtime_ns"] \
+                and (prev.get("ok") or not retry_errors):
+            skipped += 1
+        else:
+            pending.append(p)
+
+    stats = {"total": len(files), "skipped": skipped, "parsed": 0, "failed": 0}
+    jobs = jobs or os.cpu_count() or 1
+    attempts: dict[str, int] = {}
+
+    with open(out_path, "a", encoding="utf-8") as out_fh, open(manifest_path, "a", encoding="utf-8") as man_fh:
+
+        def record(rec: dict) -> None:
+            _append(out_fh, rec)
+            p = Path(rec["path"])
+            stamp = file_stamp(p) if p.exists() else {"size": None, "mtime_ns": None}
+            _append(man_fh, {"path": rec["path"], **stamp, "ok": bool(rec.get("ok"))})
+            stats["parsed" if rec.get("ok") else "failed"] += 1
+
+        # Si un worker muere se rompe todo el pool: los archivos que estaban en vuelo
+        # pasan a "sospechosos" y se reintentan de uno en uno (antes que el resto de
+        # la cola) para aislar al culpable. Solo cuenta como intento fallido una
+        # caída con el archivo corriendo solo: los demás del pool roto no tienen culpa.
+        queue = [str(p) for p in pending]
+        suspects: list[str] = []
+        while queue or suspects:
+            if suspects:
+                batch, workers, window = suspects, 1, 1
+                suspects = []
+            else:
+                batch, workers, window = queue, jobs, jobs * 4
+                queue = []
+
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                # ventana acotada para no crear miles de futures de golpe
+                in_flight = {}
+                it = iter(batch)
+                broken = False
+
+                def submit_next() -> bool:
+                    nxt = next(it, None)
+                    if nxt is None:
+                        return False
+                    in_flight[ex.submit(parse_one, nxt, parser)] = nxt
+                    return True
+
+                for _ in range(window):
+                    if not submit_next():
+                        break
+
+                while in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        path_str = in_flight.pop(fut)
+                        try:
+                            record(fut.result())
+                        except BrokenProcessPool:
+                            broken = True
+                            if workers == 1:
+                                attempts[path_str] = attempts.get(path_str, 0) + 1
+                            if attempts.get(path_str, 0) >= MAX_ATTEMPTS:
+                                record({"path": path_str, "ok": False,
+                                        "error": "El proceso del parser terminó inesperadamente"})
+                            else:
+                                suspects.append(path_str)
+                        if not broken:
+                            submit_next()
+                if broken:
+                    # lo que no llegó a enviarse vuelve a la cola de la que salió
+                    rest = list(it)
+                    if workers == 1:
+                        suspects += rest
+                    else:
+                        queue += rest
+
+    return stats
+
+
+# ----------------------------- Main -----------------------------
+def main():
+    args = sys.argv[1:]
+    opts = {a.split("=", 1)[0]: (a.split("=", 1)[1] if "=" in a else "1") for a in args if a.startswith("--")}
+    specs = [a for a in args if not a.startswith("--")]
+
+    if not specs or "--out" not in opts:
+        print(json.dumps({"ok": False, "error": "Uso: batch_parse.py <carpeta|glob|@lista.txt> --out=resultados.ndjson"}))
+        sys.exit(1)
+
+    parser = opts.get("--parser", "kardex")
+    if parser not in PARSERS:
+        print(json.dumps({"ok": False, "error": f"Parser desconocido: {parser}"}))
+        sys.exit(1)
+
+    out_path = Path(opts["--out"])
+    manifest_path = Path(opts.get("--manifest", str(out_path) + ".manifest"))
+    jobs = int(opts["--jobs"]) if "--jobs" in opts else None
+
+    files = collect_inputs(specs)
+    stats = run_batch(files, out_path, manifest_path, parser=parser, jobs=jobs,
+                      retry_errors="--retry-errors" in opts)
+    if "--columnar" in opts:
+        from columnar_export import export_ndjson
+        try:
+            stats["columnar"] = export_ndjson(out_path, Path(opts["--columnar"]), parser,
+                                              opts.get("--columnar-format", "parquet"))
+        except Exception as e:
+            stats["columnar"] = {"error": str(e)}
+    print(json.dumps({"ok": True, **stats}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark por etapa de kardex.py y plan_estudio.py sobre PDFs sintéticos.
+
+Genera (en un directorio temporal) kárdex con N materias y planes oficial/alumno
+de varios tamaños, cronometra cada etapa del parser y escribe un JSON con los
+resultados para comparar escalamiento entre commits.
+
+Uso:
+  python bench_parsers.py [--out=bench-results.json] [--repeat=3]
+                          [--kardex-sizes=30,120,480] [--plan-sizes=40,160,480]
+                          [--only=kardex|oficial|alumno]
+
+Si no hay Tabula/Camelot (sin JVM, por ejemplo), las etapas parse_frames_* se
+miden sobre frames sintéticos equivalentes y se marca "frames_source": "synthetic".
+"""
+import sys, json, time, tempfile, platform, statistics, subprocess, contextlib, io
+from pathlib import Path
+
+import kardex
+import plan_estudio
+import bench_pdfs
+
+DEFAULT_KARDEX_SIZES = [30, 120, 480]
+DEFAULT_PLAN_SIZES = [40, 160, 480]
+
+
+def _opt(argv, name, default=None):
+    return next((a.split("=", 1)[1] for a in argv if a.startswith(name + "=")), default)
+
+
+def _sizes(raw, default):
+    return [int(x) for x in raw.split(",") if x.strip()] if raw else default
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+
+    def __call__(self, name, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.samples.setdefault(name, []).append(time.perf_counter() - t0)
+        return out
+
+    def summary(self) -> dict:
+        return {
+            name: {"min_s": round(min(v), 6), "median_s": round(statistics.median(v), 6), "runs": len(v)}
+            for name, v in self.samples.items()
+        }
+
+
+# ------------------------ Kárdex ------------------------
+def bench_kardex(workdir: Path, n: int, repeat: int) -> dict:
+    pdf = workdir / f"kardex_{n}.pdf"
+    bench_pdfs.kardex_pdf(pdf, n)
+    timer = StageTimer()
+    rows = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pages = timer("read_pages", kardex.read_pages, pdf)
+        raw = timer("read_text", kardex.read_text, pdf, pages)
+        timer("extract_header", kardex.extract_header, raw)
+        rows = len(timer("extract_subject_rows", kardex.extract_subject_rows, pages))
+        timer("extract_summary", kardex.extract_summary, raw)
+        timer.samples.setdefault("total", []).append(time.perf_counter() - t0)
+    return {"doc": "kardex", "size": n, "pages": len(pages), "rows_out": rows, "stages": timer.summary()}
+
+
+# ------------------------ Planes ------------------------
+def _synthetic_frames(kind: str, rows, acents=None):
+    pd = plan_estudio.pd
+    if kind == "oficial":
+        cols = [c.upper() for c in bench_pdfs.OFI_COLS]
+        data = [[r["codigo"], r["nombre"], str(r["horas_teo"]), str(r["horas_lab"]),
+                 r["eje"], r["tipo"], str(r["creditos"]), ""] for r in rows]
+        frames = [pd.DataFrame(data[i:i + 35], columns=cols) for i in range(0, len(data), 35)]
+        acent = []
+        for name, mats in acents or []:
+            acent += [[name, "", ""]] + [[m["codigo"], m["nombre"], str(m["creditos"])] for m in mats]
+        frames.append(pd.DataFrame(acent, columns=["CLAVE", "MATERIA", "CRÉDITOS"]))
+        return frames
+    data = [[r["codigo"].lstrip("0"), r["nombre"], r["tipo"], str(r["creditos"])] for r in rows]
+    return [pd.DataFrame(data[i:i + 40], columns=["CLAVE", "MATERIA", "TIPO", "CRÉDITOS"])
+            for i in range(0, len(data), 40)]
+
+
+def bench_plan(workdir: Path, kind: str, n: int, repeat: int) -> dict:
+    pdf = workdir / f"plan_{kind}_{n}.pdf"
+    if kind == "oficial":
+        rows, acents = bench_pdfs.plan_oficial_pdf(pdf, n)
+    else:
+        rows, acents = bench_pdfs.plan_alumno_pdf(pdf, n), None
+
+    timer = StageTimer()
+    source, out_rows = "extracted", 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        text = timer("read_text_basic", plan_estudio.read_text_basic, pdf)
+        origen = timer("detect_origen", plan_estudio.detect_origen, text)
+        timer("parse_plan_info", plan_estudio.parse_plan_info, text)
+        # tabula-py imprime avisos por stdout cuando no encuentra la JVM
+        with contextlib.redirect_stdout(io.StringIO()):
+            frames = timer("try_tabula_frames", plan_estudio.try_tabula_frames, pdf)
+            if not frames:
+                frames = timer("try_camelot_frames", plan_estudio.try_camelot_frames, pdf)
+        if not frames:
+            source = "synthetic"
+            frames = _synthetic_frames(kind, rows, acents)
+        if origen == "OFICIAL":
+            mats, _, _ = timer("parse_frames_oficial", plan_estudio.parse_frames_oficial, frames, text_full=text)
+        else:
+            mats, _ = timer("parse_frames_portal_alumno", plan_estudio.parse_frames_portal_alumno, frames)
+        out_rows = len(timer("sanitize_materias", plan_estudio.sanitize_materias, mats))
+        timer.samples.setdefault("total", []).append(time.perf_counter() - t0)
+
+    return {"doc": f"plan_{kind}", "size": n, "origen": origen, "frames_source": source,
+            "frames": len(frames), "rows_out": out_rows, "stages": timer.summary()}
+
+
+# ------------------------ Main ------------------------
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).parent, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main():
+    argv = sys.argv[1:]
+    out_path = Path(_opt(argv, "--out", "bench-results.json"))
+    repeat = int(_opt(argv, "--repeat", "3"))
+    only = _opt(argv, "--only")
+    k_sizes = _sizes(_opt(argv, "--kardex-sizes"), DEFAULT_KARDEX_SIZES)
+    p_sizes = _sizes(_opt(argv, "--plan-sizes"), DEFAULT_PLAN_SIZES)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-parsers-") as tmp:
+        work = Path(tmp)
+        if only in (None, "kardex"):
+            for n in k_sizes:
+                results.append(bench_kardex(work, n, repeat))
+                print(f"kardex n={n}: {results[-1]['stages']['total']['median_s']:.3f}s", file=sys.stderr)
+        for kind in ("oficial", "alumno"):
+            if only in (None, kind):
+                for n in p_sizes:
+                    results.append(bench_plan(work, kind, n, repeat))
+                    print(f"plan_{kind} n={n}: {results[-1]['stages']['total']['median_s']:.3f}s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "extractors": {"tabula": plan_estudio.tabula is not None, "camelot": plan_estudio.camelot is not None},
+        },
+        "results": results,
+    }
+    out_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps({"ok": True, "out": str(out_path), "cases": len(results)}))
+
+
+if __name__ == "__main__":
+    main()
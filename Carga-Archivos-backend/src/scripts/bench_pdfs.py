@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generadores de PDFs sintéticos para benchmarks (sin dependencias externas).
+
+- kardex_pdf:      Kárdex electrónico con N materias repartidas en páginas
+                   (cabecera, tabla con rejilla, pie "Pagina X de Y" y resumen final).
+- plan_oficial_pdf: Listado oficial (Servicios Escolares, "Hoja : X de Y", columnas
+                   Horas Teo./Horas Lab./Eje/Req.) más la hoja de acentuaciones.
+- plan_alumno_pdf: Plan descargado del portal de alumnos (sin rejilla, filas sueltas).
+
+Cada generador devuelve además los datos con los que se construyó el PDF, para
+poder armar frames "como los daría Tabula" cuando no hay JVM disponible.
+
+Uso:
+  python bench_pdfs.py kardex  <salida.pdf> [N]
+  python bench_pdfs.py oficial <salida.pdf> [N]
+  python bench_pdfs.py alumno  <salida.pdf> [N]
+"""
+import sys, random
+from pathlib import Path
+
+PAGE_W, PAGE_H = 612, 792  # carta, en puntos
+
+MATERIA_WORDS = [
+    "PROGRAMACIÓN", "ESTRUCTURA", "DE", "DATOS", "BASES", "REDES", "CÁLCULO", "DIFERENCIAL",
+    "INTEGRAL", "ÁLGEBRA", "LINEAL", "INGENIERÍA", "SOFTWARE", "SISTEMAS", "OPERATIVOS",
+    "ADMINISTRACIÓN", "PROYECTOS", "INFORMACIÓN", "ESTADÍSTICA", "MÉTODOS", "NUMÉRICOS",
+    "DESARROLLO", "WEB", "MÓVIL", "SEGURIDAD", "INFORMÁTICA", "ARQUITECTURA", "COMPUTADORAS",
+]
+ACENTUACIONES = ["DESARROLLO WEB", "COMPUTACIÓN MÓVIL", "CIENCIA DE DATOS", "REDES Y SEGURIDAD"]
+
+
+# ------------------------ Escritor PDF mínimo ------------------------
+def _pdf_str(s: str) -> str:
+    raw = s.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+class PdfCanvas:
+    """Páginas con texto (Helvetica, WinAnsi) y líneas. Suficiente para pdfplumber/pdfminer."""
+
+    def __init__(self):
+        self.pages: list[list[str]] = []
+
+    def new_page(self) -> None:
+        self.pages.append([])
+
+    def text(self, x: float, y: float, s: str, size: float = 8) -> None:
+        self.pages[-1].append(f"BT /F1 {size} Tf {x:.2f} {y:.2f} Td {_pdf_str(s)} Tj ET")
+
+    def line(self, x0: float, y0: float, x1: float, y1: float) -> None:
+        self.pages[-1].append(f"{x0:.2f} {y0:.2f} m {x1:.2f} {y1:.2f} l S")
+
+    def grid(self, xs: list[float], top: float, row_h: float, n_rows: int) -> None:
+        bottom = top - row_h * n_rows
+        for i in range(n_rows + 1):
+            y = top - row_h * i
+            self.line(xs[0], y, xs[-1], y)
+        for x in xs:
+            self.line(x, top, x, bottom)
+
+    def save(self, path: Path) -> None:
+        objs: list[bytes] = []
+        n = len(self.pages)
+        # 1 catálogo, 2 páginas, 3 fuente, luego (página, contenido) por cada hoja
+        kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+        objs.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+        objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode())
+        objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        for i, ops in enumerate(self.pages):
+            content = ("0.5 w\n" + "\n".join(ops)).encode("latin-1")
+            objs.append(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_W} {PAGE_H}] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+            )
+            objs.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+        out = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for num, body in enumerate(objs, start=1):
+            offsets.append(len(out))
+            out += f"{num} 0 obj\n".encode() + body + b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+        for off in offsets:
+            out += f"{off:010d} 00000 n \n".encode()
+        out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+        Path(path).write_bytes(bytes(out))
+
+
+# ------------------------ Datos sintéticos ------------------------
+def _nombre(rng: random.Random) -> str:
+    return " ".join(rng.choice(MATERIA_WORDS) for _ in range(rng.randint(2, 5)))
+
+
+def kardex_rows(n: int, seed: int = 7) -> list[list[str]]:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        anio, ciclo = 19 + i // 12, 1 + (i // 6) % 2
+        ord_ = rng.choice([str(rng.randint(60, 100))] * 8 + ["NP", "AC", str(rng.randint(20, 59))])
+        rows.append([
+            str(rng.choice([4, 6, 8, 10])), f"{6000 + i:04d}", _nombre(rng),
+            "", "", ord_, "", f"{anio:02d}{ciclo:02d}", "", "", "",
+        ])
+    return rows
+
+
+def plan_rows(n: int, seed: int = 11) -> list[dict]:
+    rng = random.Random(seed)
+    return [{
+        "codigo": f"{4000 + i:05d}",
+        "nombre": _nombre(rng),
+        "tipo": rng.choice(["OBL"] * 4 + ["OPT"]),
+        "creditos": rng.choice([4, 6, 8, 10]),
+        "horas_teo": rng.randint(1, 4),
+        "horas_lab": rng.randint(0, 4),
+        "eje": rng.choice(["BÁSICO", "PROFESIONAL", "ESPECIALIZANTE"]),
+    } for i in range(n)]
+
+
+def acentuacion_rows(rows: list[dict], per_block: int = 5) -> list[tuple[str, list[dict]]]:
+    opts = [r for r in rows if r["tipo"] == "OPT"] or rows
+    return [(name, opts[i * per_block:(i + 1) * per_block]) for i, name in enumerate(ACENTUACIONES)]
+
+
+# ------------------------ Kárdex ------------------------
+KARDEX_COLS = ["CR", "CVE", "MATERIA", "E1", "E2", "ORD", "REG", "CIC", "I", "R", "B"]
+KARDEX_XS = [30, 52, 92, 330, 355, 380, 410, 435, 470, 490, 510, 530]
+
+
+def kardex_pdf(path: Path, n_subjects: int, rows_per_page: int = 30, seed: int = 7) -> list[list[str]]:
+    rows = kardex_rows(n_subjects, seed)
+    chunks = [rows[i:i + rows_per_page] for i in range(0, len(rows), rows_per_page)] or [[]]
+    total_pages = len(chunks) + 1
+    c = PdfCanvas()
+    for p, chunk in enumerate(chunks, start=1):
+        c.new_page()
+        y = PAGE_H - 40
+        for line in ["UNIVERSIDAD DE SONORA", "KÁRDEX ELECTRÓNICO", "",
+                     "PROGRAMA: INGENIERÍA EN SISTEMAS DE INFORMACIÓN", "PLAN: 2182",
+                     "UNIDAD: HERMOSILLO", "EXPEDIENTE: 222202156 ANA MARÍA LÓPEZ NÚÑEZ",
+                     "ESTATUS: A .. Alumno activo....", "Fecha: 21/09/2025"]:
+            if line:
+                c.text(30, y, line, 9)
+            y -= 13
+        row_h, top = 14, y - 6
+        table = [KARDEX_COLS] + chunk
+        c.grid(KARDEX_XS, top, row_h, len(table))
+        for r, cells in enumerate(table):
+            for j, val in enumerate(cells):
+                if val:
+                    c.text(KARDEX_XS[j] + 2, top - row_h * r - 10, val[:48], 7)
+        c.text(PAGE_W - 110, 30, f"Pagina {p} de {total_pages}", 8)
+
+    c.new_page()
+    y = PAGE_H - 60
+    for line in ["PROMEDIOS POR PERIODO", "2019-1 88.50", "2019-2 *91,25", "2020-1 79.10",
+                 "PROMEDIO KARDEX 86.40", "CRÉDITOS APR: 312 REP: 8 INS: 36",
+                 "MATERIAS APR: 52 REP: 1 NMR: 0 INS: 6"]:
+        c.text(30, y, line, 9)
+        y -= 14
+    c.text(PAGE_W - 110, 30, f"Pagina {total_pages} de {total_pages}", 8)
+    c.save(path)
+    return rows
+
+
+# ------------------------ Plan oficial ------------------------
+OFI_COLS = ["Clave", "Materia", "Horas Teo.", "Horas Lab.", "Eje", "Tipo", "Créditos", "Req."]
+OFI_XS = [30, 70, 300, 345, 390, 460, 490, 530, 580]
+
+
+def plan_oficial_pdf(path: Path, n_subjects: int, rows_per_page: int = 35, seed: int = 11):
+    rows = plan_rows(n_subjects, seed)
+    acents = acentuacion_rows(rows)
+    chunks = [rows[i:i + rows_per_page] for i in range(0, len(rows), rows_per_page)] or [[]]
+    total = len(chunks) + 1
+    c = PdfCanvas()
+
+    def header(hoja: int) -> float:
+        y = PAGE_H - 40
+        for line in ["UNIVERSIDAD DE SONORA", "DIRECCIÓN DE SERVICIOS ESCOLARES",
+                     "Listado de Materias Oficial del Plan de Estudios",
+                     "PROGRAMA: INGENIERÍA EN SISTEMAS DE INFORMACIÓN 2182",
+                     "Mínimo de 393 créditos", f"Hoja : {hoja} de {total}"]:
+            c.text(30, y, line, 9)
+            y -= 13
+        return y - 6
+
+    for p, chunk in enumerate(chunks, start=1):
+        c.new_page()
+        top, row_h = header(p), 14
+        table = [OFI_COLS] + [[r["codigo"], r["nombre"], str(r["horas_teo"]), str(r["horas_lab"]),
+                               r["eje"], r["tipo"], str(r["creditos"]), ""] for r in chunk]
+        c.grid(OFI_XS, top, row_h, len(table))
+        for i, cells in enumerate(table):
+            for j, val in enumerate(cells):
+                if val:
+                    c.text(OFI_XS[j] + 2, top - row_h * i - 10, val[:44], 7)
+
+    c.new_page()
+    y = header(total)
+    c.text(30, y, "MATERIAS QUE CONFORMAN LAS ACENTUACIONES", 9)
+    y -= 18
+    for name, mats in acents:
+        c.text(30, y, name, 8)
+        y -= 12
+        for label, x in (("Clave", 30), ("Materia", 80), ("Créditos", 400)):
+            c.text(x, y, label, 7)
+        y -= 11
+        for m in mats:
+            c.text(30, y, m["codigo"], 7)
+            c.text(80, y, m["nombre"], 7)
+            c.text(400, y, str(m["creditos"]), 7)
+            y -= 11
+        y -= 6
+    c.save(path)
+    return rows, acents
+
+
+# ------------------------ Plan portal alumno ------------------------
+def plan_alumno_pdf(path: Path, n_subjects: int, rows_per_page: int = 40, seed: int = 11):
+    rows = plan_rows(n_subjects, seed)
+    chunks = [rows[i:i + rows_per_page] for i in range(0, len(rows), rows_per_page)] or [[]]
+    c = PdfCanvas()
+    for p, chunk in enumerate(chunks, start=1):
+        c.new_page()
+        y = PAGE_H - 40
+        for line in ["INGENIERÍA EN SISTEMAS DE INFORMACIÓN", "PLAN 2182",
+                     "Créditos Aprobados: 120 de 393", "Clave Materia Tipo Créditos"]:
+            c.text(30, y, line, 9)
+            y -= 14
+        for r in chunk:
+            c.text(30, y, r["codigo"].lstrip("0"), 7)
+            c.text(80, y, r["nombre"], 7)
+            c.text(420, y, r["tipo"], 7)
+            c.text(470, y, str(r["creditos"]), 7)
+            y -= 12
+    c.save(path)
+    return rows
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    kind, out = sys.argv[1], Path(sys.argv[2])
+    n = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+    gen = {"kardex": kardex_pdf, "oficial": plan_oficial_pdf, "alumno": plan_alumno_pdf}.get(kind)
+    if not gen:
+        print(__doc__)
+        sys.exit(1)
+    gen(out, n)
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Estadísticas de generación (cohorte) sobre la salida de kardex.py.
+
+Carga las materias y el resumen de muchos alumnos en arreglos de NumPy (una
+fila por materia cursada, claves factorizadas a enteros) y calcula los
+agregados con bincount, sin ciclos por alumno ni por fila:
+  - por CVE: intentos, aprobadas, reprobadas y tasa de aprobación;
+  - por CIC: promedio, desviación y distribución de calificaciones;
+  - por plan: histograma de avance en créditos de los alumnos.
+
+Calificación: la de parseGrade() en ingestaKardex.ts, aplicada a ORD y, si
+viene vacío, a E2 y luego a E1. Cada texto distinto se interpreta una sola vez.
+  número >= 60           -> aprobada        número < 60, REPRO/REPR, NP -> reprobada
+  AC/ACRED/ACRE, EQ      -> aprobada (sin calificación)
+  NR/NA, vacío, otro     -> no cuenta como intento
+Avance en créditos: CRÉDITOS APR del resumen; si el kárdex no lo trae, la suma
+de CR de las materias aprobadas (cada CVE una vez).
+
+Entrada: NDJSON de batch_parse.py, salidas JSON de kardex.py (archivos o
+carpetas) o la carpeta de columnar_export.py (kardex_*.parquet / .arrows).
+Si un expediente aparece varias veces se usa su último registro; los kárdex sin
+expediente cuentan como un alumno por documento ("path").
+
+Uso:
+  python cohort_stats.py <resultados.ndjson|carpeta|archivo.json ...> [--plan=2182]
+                         [--bins=0,60,70,80,90,101] [--credit-step=25]
+"""
+import sys, json, re
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PASS_GRADE = 60
+GRADE_BINS = (0, 60, 70, 80, 90, 101)  # [0,60) [60,70) ... [90,100]
+CREDIT_STEP = 25
+
+# Estatus (mismos nombres que en ingestaKardex.ts)
+ESTATUS = ["SIN_CALIFICAR", "ORDINARIO", "ACREDITADA", "NO_PRESENTÓ", "NO_REGISTRADA",
+           "REPROBADA", "EQUIVALENCIA", "OTRO"]
+SIN_CALIFICAR, ORDINARIO, ACREDITADA, NO_PRESENTO, NO_REGISTRADA, REPROBADA, EQUIVALENCIA, OTRO = range(len(ESTATUS))
+
+ACRED_RE = re.compile(r"(ACRE|ACRED|AC)")
+NON_DIGIT_RE = re.compile(r"[^\d]")
+
+
+def parse_grade(raw: str | None) -> tuple[float, int]:
+    """(calificación o NaN, estatus) de un texto de ORD/E1/E2, como parseGrade()."""
+    if not raw:
+        return np.nan, SIN_CALIFICAR
+    t = raw.strip().upper()
+    if ACRED_RE.search(t):
+        return np.nan, ACREDITADA
+    if t == "NP":
+        return np.nan, NO_PRESENTO
+    if t in ("NR", "NA"):
+        return np.nan, NO_REGISTRADA
+    if t in ("REPRO", "REPR"):
+        return np.nan, REPROBADA
+    if t == "EQ":
+        return np.nan, EQUIVALENCIA
+    digits = NON_DIGIT_RE.sub("", t)
+    if digits:
+        return float(int(digits)), ORDINARIO
+    return np.nan, OTRO
+
+
+def parse_grades(texts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """parse_grade() vectorizado: se interpreta cada valor distinto y se reparte por índice."""
+    codes, uniques = pd.factorize(np.asarray(texts, dtype=object), use_na_sentinel=False)
+    parsed = [parse_grade(u if isinstance(u, str) else None) for u in uniques]
+    grade = np.array([g for g, _ in parsed], dtype=np.float64)
+    status = np.array([s for _, s in parsed], dtype=np.int8)
+    return grade[codes], status[codes]
+
+
+def _credits(raw) -> int:
+    """Primer número de CR (como parseCreditos() en ingestaKardex.ts); 0 si no hay."""
+    m = re.search(r"\d+", str(raw))
+    return int(m.group()) if m else 0
+
+
+def _obj(values) -> np.ndarray:
+    """Columna de texto como arreglo object con "" en lugar de None."""
+    arr = np.array(values, dtype=object)
+    if len(arr):
+        arr[pd.isna(arr)] = ""
+    return arr
+
+
+def _factorize(values) -> tuple[np.ndarray, np.ndarray]:
+    """pd.factorize con None/NaN como un valor más ("")."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return codes, _obj(uniques)
+
+
+class Cohort:
+    """
+    Una fila por materia cursada (student, cve, cic, cr, grade, status) y una
+    por alumno (expediente, plan, creditos_apr del resumen o NaN).
+    cve / cic / plan son códigos enteros; los textos quedan en *_names.
+    """
+
+    def __init__(self, students: dict, rows: dict):
+        self.expediente = _obj(students["expediente"])
+        self.plan, self.plan_names = _factorize(students["plan"])
+        self.creditos_apr = np.asarray(students["creditos_apr"], dtype=np.float64)
+
+        self.student = np.asarray(rows["student"], dtype=np.int64)
+        self.cve, self.cve_names = _factorize(rows["CVE"])
+        self.cic, self.cic_names = _factorize(rows["CIC"])
+        first = np.unique(self.cve, return_index=True)[1] if len(self.cve) else np.empty(0, dtype=np.int64)
+        self.materia_names = _obj(np.asarray(rows["Materia"], dtype=object)[first])
+        codes, uniques = _factorize(rows["CR"])
+        self.cr = np.array([_credits(u) for u in uniques], dtype=np.int64)[codes] if len(codes) \
+            else np.empty(0, dtype=np.int64)
+
+        # ORD y, si viene vacío (SIN_CALIFICAR), E2 y luego E1
+        self.grade, self.status = parse_grades(rows["ORD"])
+        for col in ("E2", "E1"):
+            empty = self.status == SIN_CALIFICAR
+            if not empty.any():
+                break
+            grade, status = parse_grades(np.asarray(rows[col], dtype=object)[empty])
+            self.grade[empty], self.status[empty] = grade, status
+        self.passed = np.isin(self.status, (ACREDITADA, EQUIVALENCIA)) \
+            | ((self.status == ORDINARIO) & (self.grade >= PASS_GRADE))
+        self.failed = np.isin(self.status, (REPROBADA, NO_PRESENTO)) \
+            | ((self.status == ORDINARIO) & (self.grade < PASS_GRADE))
+
+    @property
+    def n_students(self) -> int:
+        return len(self.expediente)
+
+    # ------------------------ Construcción ------------------------
+    @classmethod
+    def from_records(cls, records, plan: str | None = None) -> "Cohort":
+        """Resultados de kardex.py (dicts); el último registro de cada expediente."""
+        latest: dict = {}
+        for n, rec in enumerate(records):
+            if not rec.get("ok"):
+                continue
+            alumno = rec.get("alumno") or {}
+            if plan is not None and alumno.get("plan") != plan:
+                continue
+            # sin expediente (cabecera vacía) cada documento es su propio alumno
+            latest[alumno.get("expediente") or rec.get("path") or f"#{n}"] = rec
+
+        students = {"expediente": [], "plan": [], "creditos_apr": []}
+        fields = ("CR", "CVE", "Materia", "E1", "E2", "ORD", "CIC")
+        pick = itemgetter(*fields)
+        flat: list[tuple] = []
+        counts = []
+        for key, rec in latest.items():
+            alumno = rec.get("alumno") or {}
+            apr = ((rec.get("resumen") or {}).get("creditos") or {}).get("APR")
+            students["expediente"].append(key)
+            students["plan"].append(alumno.get("plan"))
+            students["creditos_apr"].append(np.nan if apr is None else apr)
+            mats = rec.get("materias") or []
+            counts.append(len(mats))
+            try:
+                flat += list(map(pick, mats))
+            except KeyError:  # alguna fila sin todas las columnas: las faltantes quedan vacías
+                flat += [tuple(m.get(k) for k in fields) for m in mats]
+        table = np.array(flat, dtype=object).reshape(len(flat), len(fields))
+        rows = {"student": np.repeat(np.arange(len(counts)), counts),
+                **{k: table[:, i] for i, k in enumerate(fields)}}
+        return cls(students, rows)
+
+    @classmethod
+    def from_columnar(cls, directory: Path, plan: str | None = None) -> "Cohort":
+        """Tablas kardex_materias / kardex_resumen de columnar_export.py."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def read(name: str):
+            pq_path = directory / f"{name}.parquet"
+            if pq_path.exists():
+                return pq.read_table(pq_path)
+            with pa.OSFile(str(directory / f"{name}.arrows"), "rb") as fh:
+                return pa.ipc.open_stream(fh).read_all()
+
+        def doc_key(df):
+            exp = df["expediente"].astype(object)
+            return exp.where(exp.notna() & (exp != ""), df["path"].astype(object))
+
+        res = read("kardex_resumen").to_pandas()
+        res = res[res["ok"]]
+        if plan is not None:
+            res = res[res["plan"].astype(object) == plan]
+        # misma llave que from_records: el expediente, o el documento si no lo trae
+        res = res.assign(key=doc_key(res))
+        res = res.drop_duplicates("key", keep="last")
+        mats = read("kardex_materias").to_pandas()
+        mats = mats.assign(key=doc_key(mats))
+        # filas del documento elegido para cada alumno
+        keep = pd.MultiIndex.from_arrays([res["key"].astype(object), res["path"].astype(object)])
+        mats = mats[pd.MultiIndex.from_arrays([mats["key"].astype(object),
+                                               mats["path"].astype(object)]).isin(keep)]
+        student = pd.Index(res["key"].astype(object)).get_indexer(mats["key"].astype(object))
+        students = {"expediente": res["key"].astype(object).to_numpy(),
+                    "plan": res["plan"].astype(object).to_numpy(),
+                    "creditos_apr": res["creditos_apr"].astype("float64").to_numpy()}
+        rows = {"student": student, **{k: mats[k].astype(object).to_numpy()
+                                       for k in ("CR", "CVE", "Materia", "E1", "E2", "ORD", "CIC")}}
+        return cls(students, rows)
+
+    # ------------------------ Agregados ------------------------
+    def by_cve(self) -> list[dict]:
+        """Intentos, aprobadas, reprobadas y tasa de aprobación por clave de materia."""
+        n = len(self.cve_names)
+        passed = np.bincount(self.cve, weights=self.passed, minlength=n).astype(np.int64)
+        failed = np.bincount(self.cve, weights=self.failed, minlength=n).astype(np.int64)
+        tries = passed + failed
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(tries > 0, passed / tries, np.nan)
+        order = np.argsort(self.cve_names.astype(str), kind="stable")
+        return [{"CVE": self.cve_names[i], "Materia": self.materia_names[i], "intentos": int(tries[i]),
+                 "aprobadas": int(passed[i]), "reprobadas": int(failed[i]),
+                 "tasa_aprobacion": None if np.isnan(rate[i]) else round(float(rate[i]), 4)}
+                for i in order]
+
+    def by_cic(self, bins=GRADE_BINS) -> list[dict]:
+        """Promedio, desviación y distribución de calificaciones numéricas por ciclo."""
+        n = len(self.cic_names)
+        graded = ~np.isnan(self.grade)
+        cic, grade = self.cic[graded], self.grade[graded]
+        count = np.bincount(cic, minlength=n)
+        total = np.bincount(cic, weights=grade, minlength=n)
+        sq = np.bincount(cic, weights=grade * grade, minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            std = np.sqrt(np.maximum(sq / count - mean * mean, 0.0))
+
+        edges = np.asarray(bins, dtype=np.float64)
+        nb = len(edges) - 1
+        slot = np.digitize(grade, edges) - 1
+        inside = (slot >= 0) & (slot < nb)
+        hist = np.bincount(cic[inside] * nb + slot[inside], minlength=n * nb).reshape(n, nb)
+        labels = [f"{int(a)}-{int(b) - 1}" for a, b in zip(edges[:-1], edges[1:])]
+
+        order = np.argsort(self.cic_names.astype(str), kind="stable")
+        return [{"CIC": self.cic_names[i], "calificadas": int(count[i]),
+                 "promedio": None if count[i] == 0 else round(float(mean[i]), 2),
+                 "desviacion": None if count[i] == 0 else round(float(std[i]), 2),
+                 "distribucion": dict(zip(labels, hist[i].tolist()))}
+                for i in order]
+
+    def student_credits(self) -> np.ndarray:
+        """Créditos aprobados por alumno: resumen APR o, sin él, CR de cada CVE aprobada una vez."""
+        ok = self.passed
+        key = self.student[ok] * max(len(self.cve_names), 1) + self.cve[ok]
+        first = np.unique(key, return_index=True)[1]
+        summed = np.bincount(self.student[ok][first], weights=self.cr[ok][first], minlength=self.n_students)
+        return np.where(np.isnan(self.creditos_apr), summed, self.creditos_apr)
+
+    def credit_progress(self, step: int = CREDIT_STEP) -> dict:
+        """Histograma de créditos aprobados por plan, en intervalos de `step` créditos."""
+        credits = self.student_credits()
+        if not self.n_students:
+            return {}
+        slot = (credits // step).astype(np.int64)
+        nb = int(slot.max()) + 1
+        n_plans = len(self.plan_names)
+        hist = np.bincount(self.plan * nb + slot, minlength=n_plans * nb).reshape(n_plans, nb)
+        alumnos = np.bincount(self.plan, minlength=n_plans)
+        total = np.bincount(self.plan, weights=credits, minlength=n_plans)
+        out = {}
+        for p, name in enumerate(self.plan_names):
+            last = int(np.flatnonzero(hist[p]).max()) + 1 if alumnos[p] else 0
+            out[name or "?"] = {
+                "alumnos": int(alumnos[p]),
+                "promedio_creditos": round(float(total[p] / alumnos[p]), 2) if alumnos[p] else None,
+                "histograma": [{"desde": k * step, "hasta": (k + 1) * step - 1, "alumnos": int(hist[p, k])}
+                               for k in range(last)],
+            }
+        return out
+
+    def report(self, bins=GRADE_BINS, step: int = CREDIT_STEP) -> dict:
+        return {
+            "ok": True,
+            "alumnos": self.n_students,
+            "filas": len(self.student),
+            "por_cve": self.by_cve(),
+            "por_cic": self.by_cic(bins),
+            "avance_creditos": self.credit_progress(step),
+        }
+
+
+# ------------------------ Entrada ------------------------
+def iter_json_records(specs: list[str]):
+    """Registros de NDJSON / JSON sueltos / carpetas con .json o .ndjson."""
+    for spec in specs:
+        p = Path(spec)
+        files = sorted(list(p.rglob("*.json")) + list(p.rglob("*.ndjson"))) if p.is_dir() else [p]
+        for f in files:
+            with open(f, encoding="utf-8") as fh:
+                if f.suffix == ".ndjson":
+                    for line in fh:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue  # última línea truncada
+                else:
+                    yield json.load(fh)
+
+
+def load_cohort(specs: list[str], plan: str | None = None) -> Cohort:
+    """Carpeta de columnar_export.py si la hay; si no, registros JSON."""
+    if len(specs) == 1 and Path(specs[0]).is_dir() and any(
+            (Path(specs[0]) / f"kardex_resumen{ext}").exists() for ext in (".parquet", ".arrows")):
+        return Cohort.from_columnar(Path(specs[0]), plan)
+    return Cohort.from_records(iter_json_records(specs), plan)
+
+
+# ----------------------------- Main -----------------------------
+def main():
+    args = sys.argv[1:]
+    opts = {a.split("=", 1)[0]: (a.split("=", 1)[1] if "=" in a else "1") for a in args if a.startswith("--")}
+    specs = [a for a in args if not a.startswith("--")]
+    if not specs:
+        print(json.dumps({"ok": False, "error": "Uso: cohort_stats.py <resultados.ndjson|carpeta|archivo.json ...>"}))
+        sys.exit(1)
+    try:
+        bins = tuple(float(x) for x in opts["--bins"].split(",")) if "--bins" in opts else GRADE_BINS
+        step = int(opts.get("--credit-step", CREDIT_STEP))
+        cohort = load_cohort(specs, opts.get("--plan"))
+        out = cohort.report(bins, step)
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": f"{type(e).__name__}: {e}"}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps(out, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exporta resultados de batch_parse.py (NDJSON) a archivos columnares Arrow/Parquet
+para reportes institucionales.
+
+Uso:
+  python columnar_export.py resultados.ndjson --out-dir=DIR [--parser=kardex|plan] [--format=parquet|arrow]
+  (o directamente: batch_parse.py ... --columnar=DIR [--columnar-format=parquet|arrow])
+
+Por parser se escriben dos tablas:
+  kardex_materias  una fila por materia (expediente, CR, CVE, Materia, E1 ... B)
+  kardex_resumen   una fila por documento: cabecera + resumen (promedios, créditos)
+  plan_materias    una fila por materia del plan (y de cada acentuación)
+  plan_resumen     una fila por documento: datos del plan, origen, avisos
+Se unen por expediente (kardex) o por versión del plan; ambas traen además
+"path" para distinguir re-cargas del mismo alumno/plan.
+
+- Claves, periodos, nombres y demás columnas repetitivas van con codificación
+  de diccionario; los números como enteros/flotantes.
+- Se escribe por bloques de CHUNK_RECORDS documentos (un row group / record
+  batch por bloque): la memoria no crece con el tamaño del lote.
+- Si un archivo aparece varias veces en el NDJSON (corridas reanudadas,
+  reintentos) se usa su último registro, como en el manifest.
+"""
+import sys, json
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = pq = None
+
+CHUNK_RECORDS = 1000
+# "arrow" es el formato IPC de flujo (pa.ipc.open_stream): a diferencia del de
+# archivo admite diccionarios que crecen bloque a bloque (deltas)
+FORMATS = {"parquet": ".parquet", "arrow": ".arrows"}
+
+
+def _schemas() -> dict:
+    """parser -> (esquema de materias, esquema de resumen)."""
+    d = pa.dictionary(pa.int32(), pa.string())
+    kardex_materias = pa.schema([
+        ("expediente", d), ("path", d),
+        ("CR", pa.int8()), ("CVE", d), ("Materia", d),
+        ("E1", d), ("E2", d), ("ORD", d), ("REG", d),
+        ("CIC", d), ("I", d), ("R", d), ("B", d),
+    ])
+    kardex_resumen = pa.schema([
+        ("expediente", pa.string()), ("path", pa.string()), ("ok", pa.bool_()), ("error", pa.string()),
+        ("fecha", pa.string()), ("programa", d), ("plan", d), ("unidad", d),
+        ("alumno", pa.string()), ("estatus", d),
+        ("promedio_kardex", pa.float64()),
+        ("promedios", pa.map_(pa.string(), pa.float64())),
+        ("creditos_apr", pa.int32()), ("creditos_rep", pa.int32()), ("creditos_ins", pa.int32()),
+        ("materias_apr", pa.int32()), ("materias_rep", pa.int32()),
+        ("materias_nmr", pa.int32()), ("materias_ins", pa.int32()),
+        ("n_materias", pa.int32()),
+    ])
+    plan_materias = pa.schema([
+        ("version", d), ("path", d),
+        ("codigo", d), ("nombre", d), ("creditos", pa.int16()), ("tipo", d),
+        ("semestre", pa.int16()), ("acentuacion", d),
+    ])
+    plan_resumen = pa.schema([
+        ("version", pa.string()), ("path", pa.string()), ("ok", pa.bool_()), ("error", pa.string()),
+        ("nombre", pa.string()), ("origen", d), ("total_creditos", pa.int32()),
+        ("semestres_sugeridos", pa.int16()), ("n_materias", pa.int32()), ("n_acentuaciones", pa.int16()),
+        ("warnings", pa.list_(pa.string())),
+    ])
+    return {"kardex": (kardex_materias, kardex_resumen), "plan": (plan_materias, plan_resumen)}
+
+
+def _int(v):
+    try:
+        return int(v) if v is not None and v != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+# ------------------------ Registro -> filas ------------------------
+def kardex_rows(rec: dict) -> tuple[list[dict], dict]:
+    alumno = rec.get("alumno") or {}
+    resumen = rec.get("resumen") or {}
+    exp = alumno.get("expediente")
+    materias = [{"expediente": exp, "path": rec.get("path"), **m, "CR": _int(m.get("CR"))}
+                for m in rec.get("materias") or []]
+    promedios = dict(resumen.get("promedios") or {})
+    cred, mats = resumen.get("creditos") or {}, resumen.get("materias") or {}
+    head = {
+        "expediente": exp, "path": rec.get("path"), "ok": bool(rec.get("ok")), "error": rec.get("error"),
+        **{k: alumno.get(k) for k in ("fecha", "programa", "plan", "unidad", "alumno", "estatus")},
+        "promedio_kardex": promedios.pop("kardex", None),
+        "promedios": list(promedios.items()),
+        **{f"creditos_{k.lower()}": _int(cred.get(k)) for k in ("APR", "REP", "INS")},
+        **{f"materias_{k.lower()}": _int(mats.get(k)) for k in ("APR", "REP", "NMR", "INS")},
+        "n_materias": len(materias),
+    }
+    return materias, head
+
+
+def plan_rows(rec: dict) -> tuple[list[dict], dict]:
+    plan = rec.get("plan") or {}
+    version, path = plan.get("version"), rec.get("path")
+    materias = [{"version": version, "path": path, "codigo": m.get("codigo"), "nombre": m.get("nombre"),
+                 "creditos": _int(m.get("creditos")), "tipo": m.get("tipo"),
+                 "semestre": _int(m.get("semestre")), "acentuacion": None}
+                for m in rec.get("materias") or []]
+    for acent in rec.get("acentuaciones") or []:
+        materias += [{"version": version, "path": path, "codigo": m.get("codigo"), "nombre": m.get("nombre"),
+                      "creditos": _int(m.get("creditos")), "tipo": m.get("tipo"),
+                      "semestre": _int(m.get("semestre")), "acentuacion": acent.get("nombre")}
+                     for m in acent.get("materias") or []]
+    head = {
+        "version": version, "path": path, "ok": bool(rec.get("ok")), "error": rec.get("error"),
+        "nombre": plan.get("nombre"), "origen": rec.get("origen"),
+        "total_creditos": _int(plan.get("total_creditos")),
+        "semestres_sugeridos": _int(plan.get("semestres_sugeridos")),
+        "n_materias": len(rec.get("materias") or []),
+        "n_acentuaciones": len(rec.get("acentuaciones") or []),
+        "warnings": [str(w) for w in rec.get("warnings") or []],
+    }
+    return materias, head
+
+
+ROWS = {"kardex": kardex_rows, "plan": plan_rows}
+
+
+# ------------------------ Lectura del NDJSON ------------------------
+def iter_records(ndjson_path: Path):
+    """Registros del NDJSON, el último de cada "path"; tolera líneas truncadas."""
+    last: dict[str, int] = {}
+    with open(ndjson_path, encoding="utf-8") as fh:
+        for n, line in enumerate(fh):
+            try:
+                last[json.loads(line)["path"]] = n
+            except Exception:
+                continue
+    keep = set(last.values())
+    with open(ndjson_path, encoding="utf-8") as fh:
+        for n, line in enumerate(fh):
+            if n in keep:
+                yield json.loads(line)
+
+
+# ------------------------ Escritura ------------------------
+class _TableWriter:
+    def __init__(self, path: Path, schema, fmt: str):
+        self.schema = schema
+        if fmt == "parquet":
+            self._w = pq.ParquetWriter(str(path), schema, compression="zstd", use_dictionary=True)
+        else:
+            self._sink = pa.OSFile(str(path), "wb")
+            self._w = pa.ipc.new_stream(self._sink, schema,
+                                        options=pa.ipc.IpcWriteOptions(compression="zstd", emit_dictionary_deltas=True))
+
+    def write(self, rows: list[dict]) -> None:
+        if rows:
+            self._w.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self._w.close()
+        if hasattr(self, "_sink"):
+            self._sink.close()
+
+
+def export_ndjson(ndjson_path: Path, out_dir: Path, parser: str = "kardex", fmt: str = "parquet") -> dict:
+    """Escribe <out_dir>/<parser>_materias y <parser>_resumen; devuelve rutas ("archivos") y conteos."""
+    if pa is None:
+        raise RuntimeError("Instala pyarrow: pip install pyarrow")
+    if parser not in ROWS:
+        raise ValueError(f"Parser desconocido: {parser}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido: {fmt}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    mat_schema, head_schema = _schemas()[parser]
+    paths = {t: out_dir / f"{parser}_{t}{FORMATS[fmt]}" for t in ("materias", "resumen")}
+    writers = {"materias": _TableWriter(paths["materias"], mat_schema, fmt),
+               "resumen": _TableWriter(paths["resumen"], head_schema, fmt)}
+    counts = {"documentos": 0, "materias": 0}
+    to_rows = ROWS[parser]
+    try:
+        mats, heads = [], []
+        for rec in iter_records(ndjson_path):
+            m, h = to_rows(rec)
+            mats += m
+            heads.append(h)
+            if len(heads) >= CHUNK_RECORDS:
+                writers["materias"].write(mats)
+                writers["resumen"].write(heads)
+                counts["documentos"] += len(heads)
+                counts["materias"] += len(mats)
+                mats, heads = [], []
+        writers["materias"].write(mats)
+        writers["resumen"].write(heads)
+        counts["documentos"] += len(heads)
+        counts["materias"] += len(mats)
+    finally:
+        for w in writers.values():
+            w.close()
+    return {"archivos": {k: str(p) for k, p in paths.items()}, **counts}
+
+
+# ----------------------------- Main -----------------------------
+def main():
+    args = sys.argv[1:]
+    opts = {a.split("=", 1)[0]: (a.split("=", 1)[1] if "=" in a else "1") for a in args if a.startswith("--")}
+    inputs = [a for a in args if not a.startswith("--")]
+    if not inputs or "--out-dir" not in opts:
+        print(json.dumps({"ok": False, "error": "Uso: columnar_export.py resultados.ndjson --out-dir=DIR"}))
+        sys.exit(1)
+    try:
+        out = export_ndjson(Path(inputs[0]), Path(opts["--out-dir"]),
+                            opts.get("--parser", "kardex"), opts.get("--format", "parquet"))
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    print(json.dumps({"ok": True, **out}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sys, json, re, unicodedata
+import os, sys, json, re, hashlib, unicodedata, contextlib
 from pathlib import Path
 
+from parse_cache import cached_parse, code_fingerprint, cache_root, write_json_atomic
+from parse_profile import NO_PROFILE, profiled_parse
+from page_parallel import DEFAULT_MIN_PAGES, page_ranges, parallel_jobs, parallel_min_pages, run_ranges
+from memory_budget import UNBOUNDED, MemoryBudget, budget_from_args, release_page
+
+# Súbelo cuando cambie el formato de salida (la huella del código ya invalida la caché)
+PARSER_VERSION = "1"
+
 # ---------- Dependencias de extracción ----------
 try:
     import pdfplumber  # Para tablas (materias) y texto
@@ -19,6 +27,13 @@ except Exception:
     except Exception:
         pdfminer_extract_text = None
 
+# (Opcional) clasificación vectorizada de filas; sin pandas se usa el ciclo por fila
+try:
+    import numpy as np
+    import pandas as pd
+except Exception:
+    np = pd = None
+
 
 # ============================================================
 # Utilidades
@@ -45,19 +60,197 @@ def tofloat(num_s: str | None) -> float | None:
 
 
 # ============================================================
-# 1) TEXTO
+# 1) TEXTO (y tablas, en un solo recorrido)
 # ============================================================
-def read_text(path: Path) -> str:
+# ---------- Plantillas de región de tabla ----------
+# Todas las páginas del kárdex del sistema universitario comparten formato
+# (cabecera, tabla de materias, pie "Pagina X de Y"). De la 1a página se aprende
+# dónde está la tabla y en qué x caen sus columnas; con esa plantilla las demás
+# páginas (y los siguientes documentos con el mismo formato) se recortan a la
+# región de la tabla antes de buscarla, así pdfplumber no revisa los caracteres
+# de cabecera y márgenes por cada fila. Si la plantilla no cuadra, se usa la
+# detección en página completa.
+LAYOUTS_FILE = "kardex-layouts.json"
+TEMPLATE_PAD = 4.0   # pt de margen alrededor de la tabla aprendida
+COL_TOL = 2.0        # pt de tolerancia al comparar posiciones x de columnas
+
+
+class LayoutStore:
+    """Plantillas {huella: plantilla} en memoria, respaldadas por un JSON en el dir de caché."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self._data: dict | None = None
+
+    def _load(self) -> dict:
+        if self._data is None:
+            self._data = {}
+            if self.path is not None:
+                try:
+                    self._data = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    pass
+        return self._data
+
+    def get(self, fp: str) -> dict | None:
+        return self._load().get(fp)
+
+    def put(self, fp: str, tpl: dict) -> None:
+        data = self._load()
+        if data.get(fp) == tpl:
+            return
+        data[fp] = tpl
+        if self.path is not None:
+            with contextlib.suppress(OSError):
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(self.path, data)
+
+
+_layout_stores: dict[str, LayoutStore] = {}
+
+
+def layouts_from_args(argv: list[str]) -> LayoutStore | None:
+    """Almacén de plantillas (uno por directorio, reutilizado en modo --worker)."""
+    if "--no-layout-template" in argv or os.environ.get("KARDEX_LAYOUTS", "1") == "0":
+        return None
+    path = cache_root(argv) / LAYOUTS_FILE
+    return _layout_stores.setdefault(str(path), LayoutStore(path))
+
+
+def layout_fingerprint(page) -> str | None:
+    """Tamaño de página + x de las líneas verticales (divisiones de columnas)."""
+    xs = sorted({round(e["x0"]) for e in page.vertical_edges})
+    if len(xs) < 4:
+        return None
+    return f"{round(page.width)}x{round(page.height)}:" + ",".join(map(str, xs))
+
+
+def _column_xs(table) -> list[float]:
+    return [round(c.bbox[0], 1) for c in table.columns]
+
+
+def learn_template(page, tables: list) -> dict | None:
+    """Plantilla a partir de la tabla más grande de la 1a página."""
+    if not tables:
+        return None
+    t = max(tables, key=lambda t: (t.bbox[2] - t.bbox[0]) * (t.bbox[3] - t.bbox[1]))
+    x0, top, x1, _ = t.bbox
+    return {"x0": x0, "x1": x1, "top": top, "cols": _column_xs(t),
+            "size": [round(page.width), round(page.height)]}
+
+
+def _tables_with_template(page, tpl: dict, first: bool) -> list | None:
+    """
+    Tablas de la región de la plantilla, o None si no cuadra (otro tamaño de
+    página, sin tablas, columnas distintas o tabla cortada por el recorte).
+    En la 1a página se recorta también la cabecera; en las demás, solo márgenes.
+    """
+    if [round(page.width), round(page.height)] != tpl["size"]:
+        return None
+    bbox = (max(tpl["x0"] - TEMPLATE_PAD, 0), max(tpl["top"] - TEMPLATE_PAD, 0) if first else 0,
+            min(tpl["x1"] + TEMPLATE_PAD, page.width), page.height)
+    found = page.crop(bbox).find_tables()
+    if not found:
+        return None
+    for t in found:
+        # una tabla pegada al borde del recorte probablemente sigue fuera de él
+        if t.bbox[0] - bbox[0] < 1 or bbox[2] - t.bbox[2] < 1 or (bbox[1] > 0 and t.bbox[1] - bbox[1] < 1):
+            return None
+    main = max(found, key=lambda t: len(t.rows))
+    cols = _column_xs(main)
+    if len(cols) != len(tpl["cols"]) or any(abs(a - b) > COL_TOL for a, b in zip(cols, tpl["cols"])):
+        return None
+    return [t.extract() for t in found]
+
+
+def _read_page(page, tpl: dict | None, first: bool, prof=NO_PROFILE):
+    """({"text", "tables"}, tablas de la detección en página completa o None si bastó la plantilla)."""
+    with prof.stage("pdfplumber_text"):
+        text = page.extract_text() or ""
+    tables = found = None
+    if tpl is not None:
+        with prof.stage("pdfplumber_tables_cropped"):
+            tables = _tables_with_template(page, tpl, first)
+    if tables is None:
+        with prof.stage("pdfplumber_tables"):
+            found = page.find_tables()
+            tables = [t.extract() for t in found]  # == page.extract_tables()
+    return {"text": text, "tables": tables}, found
+
+
+def _read_first_page(page, layouts: LayoutStore | None, prof=NO_PROFILE):
+    """1a página: usa la plantilla de su huella o aprende una. Devuelve (página, plantilla)."""
+    fp = layout_fingerprint(page) if layouts is not None else None
+    tpl = layouts.get(fp) if fp else None
+    item, found = _read_page(page, tpl, True, prof)
+    if found is not None and fp:
+        tpl = learn_template(page, found)
+        if tpl is not None:
+            layouts.put(fp, tpl)
+    return item, tpl
+
+
+def _read_page_range(path_str: str, start: int, stop: int, tpl: dict | None) -> list[dict]:
+    """Se ejecuta en un proceso del pool: páginas [start, stop) con la plantilla ya aprendida."""
+    with pdfplumber.open(path_str) as pdf:
+        return [_read_page(pdf.pages[n], tpl, n == 0)[0] for n in range(start, stop)]
+
+
+def iter_pages(path: Path, prof=NO_PROFILE, layouts: LayoutStore | None = None,
+               budget: MemoryBudget = UNBOUNDED):
     """
-    Extrae texto del PDF. Primero pdfplumber; si sale muy corto,
-    intenta pdfminer para mayor continuidad de líneas.
+    Recorre el PDF una sola vez con pdfplumber y entrega, página por página,
+    su texto y sus tablas: {"text": str, "tables": [...]}.
+    Así los caracteres de cada página se parsean una vez y sirven para ambos.
+    Con `layouts`, las tablas se buscan en la región de la plantilla del formato.
+    Con el presupuesto de memoria activo, cada página se libera al terminarla.
     """
-    text = []
     with pdfplumber.open(str(path)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            text.append(page_text)
-    out = "\n".join(text)
+        tpl = None
+        for n, page in enumerate(pdf.pages):
+            if n == 0:
+                item, tpl = _read_first_page(page, layouts, prof)
+            else:
+                item, _ = _read_page(page, tpl, False, prof)
+            if budget.tight():
+                release_page(page)
+            yield item
+
+
+def read_pages(path: Path, prof=NO_PROFILE, layouts: LayoutStore | None = None,
+               jobs: int = 1, min_pages: int = DEFAULT_MIN_PAGES) -> list[dict]:
+    """
+    Todas las páginas en orden. Con jobs > 1 y al menos `min_pages` páginas, la
+    1a página se lee aquí (para aprender la plantilla) y el resto se reparte
+    entre procesos (ver page_parallel.py); el resultado es el mismo que en serie.
+    """
+    if jobs <= 1:
+        return list(iter_pages(path, prof, layouts))
+    with pdfplumber.open(str(path)) as pdf:
+        n_pages = len(pdf.pages)
+        if n_pages < max(min_pages, 2):
+            first = None
+        else:
+            first, tpl = _read_first_page(pdf.pages[0], layouts, prof)
+    if first is None:
+        return list(iter_pages(path, prof, layouts))
+
+    calls = [(str(path), a, b, tpl) for a, b in page_ranges(1, n_pages, jobs)]
+    with prof.stage("pdfplumber_pages_parallel"):
+        chunks = run_ranges(jobs, _read_page_range, calls)
+    if chunks is None:
+        chunks = [_read_page_range(*c) for c in calls]
+    return [first] + [p for chunk in chunks for p in chunk]
+
+
+def read_text(path: Path, pages: list[dict] | None = None) -> str:
+    """
+    Extrae texto del PDF. Primero pdfplumber (reutiliza `pages` si ya se leyó);
+    si sale muy corto, intenta pdfminer para mayor continuidad de líneas.
+    """
+    if pages is None:
+        pages = read_pages(path)
+    out = "\n".join(p["text"] for p in pages)
 
     # Fallback: si salió demasiado corto, intenta pdfminer
     if pdfminer_extract_text and len(out) < 100:
@@ -124,78 +317,186 @@ def extract_header(raw_text: str) -> dict:
 # ============================================================
 # 3) MATERIAS (vía tablas)
 # ============================================================
-def extract_subject_rows(path: Path) -> list:
+def extract_subject_rows(source: Path | list[dict]) -> list:
     """
     Extrae filas de materias leyendo las tablas de cada página.
+    `source` puede ser la ruta del PDF o el resultado de read_pages().
     Estructura esperada por fila:
       CR, CVE, MATERIA, E1, E2, ORD, REG, CIC, I, R, B
     - Heurísticas tolerantes (CR puede venir 1–2 dígitos, CVE 3–10 alfanum).
     - Deduplica por (CR, CVE, Materia, CIC).
     """
+    pages = read_pages(source) if isinstance(source, Path) else source
+
+    # Todas las filas de todas las páginas en una sola tabla columnar
+    raw = [row for page in pages for row in _raw_rows(page["tables"])]
+    if pd is not None and len(raw) >= VECTOR_MIN_ROWS:
+        return _classify_rows_vectorized(raw, dedup=True)
+    return dedup_rows(_classify_rows(raw), set())
+
+
+KARDEX_FIELDS = ["CR", "CVE", "Materia", "E1", "E2", "ORD", "REG", "CIC", "I", "R", "B"]
+CR_RE = re.compile(r"\d{1,2}")
+CVE_RE = re.compile(r"[A-Z0-9][A-Z0-9_-]{2,9}")
+# Debajo de esto el costo fijo de pandas no compensa (un kárdex típico trae ~60 filas)
+VECTOR_MIN_ROWS = 200
+
+
+def _raw_rows(tables: list) -> list:
+    """Filas crudas con al menos 3 celdas (CR, CVE, MATERIA)."""
+    return [row for t in tables for row in t if row and len(row) >= 3]
+
+
+def rows_from_tables(tables: list) -> list:
+    """Filas de materia válidas de las tablas de una página (sin deduplicar)."""
+    return _rows_from_raw(_raw_rows(tables))
+
+
+def _rows_from_raw(raw: list) -> list:
+    if pd is not None and len(raw) >= VECTOR_MIN_ROWS:
+        return _classify_rows_vectorized(raw, dedup=False)
+    return _classify_rows(raw)
+
+
+def _classify_rows_vectorized(raw: list, dedup: bool) -> list:
+    """
+    Misma lógica que _classify_rows, pero por columnas sobre una matriz de códigos:
+    - factoriza todas las celdas y normaliza (NFC + espacios) solo los valores
+      distintos: vacíos, CR, CIC y calificaciones se repiten muchísimo;
+    - valida CR/CVE/Materia con tablas booleanas indexadas por código;
+    - deduplica por (CR, CVE, Materia, CIC) sobre enteros, conservando la
+      primera aparición como el ciclo original.
+    """
+    width = len(KARDEX_FIELDS)
+    # filas de largo variable -> matriz (n, 11) rellenada con None y truncada
+    grid = pd.DataFrame(raw, dtype=object).reindex(columns=range(width)).to_numpy(dtype=object)
+
+    codes, uniques = pd.factorize(grid.ravel())  # None -> -1
+    cleaned = [normalize_spaces(nfc(u)) for u in uniques] + [""]  # el índice -1 cae en ""
+    ccodes, cuniques = pd.factorize(np.array(cleaned, dtype=object))
+    cells = ccodes[codes].reshape(len(raw), width)
+
+    vocab = list(cuniques)
+    cr_ok = np.fromiter((CR_RE.fullmatch(u) is not None for u in vocab), dtype=bool, count=len(vocab))
+    cve_ok = np.fromiter((CVE_RE.fullmatch(u) is not None for u in vocab), dtype=bool, count=len(vocab))
+    non_empty = np.fromiter((u != "" for u in vocab), dtype=bool, count=len(vocab))
+    cells = cells[cr_ok[cells[:, 0]] & cve_ok[cells[:, 1]] & non_empty[cells[:, 2]]]
+
+    if dedup and len(cells):
+        cells = cells[~pd.DataFrame(cells[:, [0, 1, 2, 7]]).duplicated(keep="first").to_numpy()]
+
+    # "" -> None, igual que `E1 or None` (CR/CVE/Materia nunca quedan vacíos aquí)
+    out_vals = np.array([u if u != "" else None for u in vocab], dtype=object)
+    return [dict(zip(KARDEX_FIELDS, r)) for r in out_vals[cells].tolist()]
+
+
+def _classify_rows(raw: list) -> list:
     materias = []
-    with pdfplumber.open(str(path)) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables() or []
-
-            for t in tables:
-                for row in t:
-                    if not row or len(row) < 3:
-                        continue
-
-                    # Limpia y normaliza celdas
-                    cells = [normalize_spaces(nfc(c or "")) for c in row]
-
-                    CR  = cells[0] if len(cells) > 0 else ""
-                    CVE = cells[1] if len(cells) > 1 else ""
-                    MAT = cells[2] if len(cells) > 2 else ""
-
-                    # Heurística: CR = 1–2 dígitos (p.ej. 6 o 06 o 12)
-                    if not re.fullmatch(r"\d{1,2}", CR):
-                        continue
-                    # CVE: 3–10 alfanum (algunas carreras usan guion bajo)
-                    if not re.fullmatch(r"[A-Z0-9][A-Z0-9_-]{2,9}", CVE):
-                        continue
-                    # Materia: no vacía
-                    if not MAT:
-                        continue
-
-                    E1  = cells[3]  if len(cells) > 3  else None
-                    E2  = cells[4]  if len(cells) > 4  else None
-                    ORD = cells[5]  if len(cells) > 5  else None
-                    REG = cells[6]  if len(cells) > 6  else None
-                    CIC = cells[7]  if len(cells) > 7  else None
-                    I   = cells[8]  if len(cells) > 8  else None
-                    R   = cells[9]  if len(cells) > 9  else None
-                    B   = cells[10] if len(cells) > 10 else None
-
-                    materias.append({
-                        "CR": CR,
-                        "CVE": CVE,
-                        "Materia": MAT,
-                        "E1": E1 or None,
-                        "E2": E2 or None,
-                        "ORD": ORD or None,
-                        "REG": REG or None,
-                        "CIC": CIC or None,
-                        "I": I or None,
-                        "R": R or None,
-                        "B": B or None,
-                    })
-
-    # Deduplicar por (CR, CVE, Materia, CIC)
-    seen, dedup = set(), []
-    for m in materias:
-        key = (m["CR"], m["CVE"], m["Materia"], m["CIC"])
+    for row in raw:
+        # Limpia y normaliza celdas
+        cells = [normalize_spaces(nfc(c or "")) for c in row]
+
+        CR  = cells[0] if len(cells) > 0 else ""
+        CVE = cells[1] if len(cells) > 1 else ""
+        MAT = cells[2] if len(cells) > 2 else ""
+
+        # Heurística: CR = 1–2 dígitos (p.ej. 6 o 06 o 12)
+        if not CR_RE.fullmatch(CR):
+            continue
+        # CVE: 3–10 alfanum (algunas carreras usan guion bajo)
+        if not CVE_RE.fullmatch(CVE):
+            continue
+        # Materia: no vacía
+        if not MAT:
+            continue
+
+        E1  = cells[3]  if len(cells) > 3  else None
+        E2  = cells[4]  if len(cells) > 4  else None
+        ORD = cells[5]  if len(cells) > 5  else None
+        REG = cells[6]  if len(cells) > 6  else None
+        CIC = cells[7]  if len(cells) > 7  else None
+        I   = cells[8]  if len(cells) > 8  else None
+        R   = cells[9]  if len(cells) > 9  else None
+        B   = cells[10] if len(cells) > 10 else None
+
+        materias.append({
+            "CR": CR,
+            "CVE": CVE,
+            "Materia": MAT,
+            "E1": E1 or None,
+            "E2": E2 or None,
+            "ORD": ORD or None,
+            "REG": REG or None,
+            "CIC": CIC or None,
+            "I": I or None,
+            "R": R or None,
+            "B": B or None,
+        })
+    return materias
+
+
+def row_key(m: dict) -> tuple:
+    """Identidad de una fila de materia: (CR, CVE, Materia, CIC)."""
+    return (m["CR"], m["CVE"], m["Materia"], m["CIC"])
+
+
+def dedup_rows(rows: list, seen: set) -> list:
+    """Deduplica incrementalmente: `seen` se comparte entre páginas."""
+    out = []
+    for m in rows:
+        key = row_key(m)
         if key in seen:
             continue
         seen.add(key)
-        dedup.append(m)
-    return dedup
+        out.append(m)
+    return out
 
 
 # ============================================================
 # 4) RESUMEN (PROMEDIO / CRÉDITOS / MATERIAS)
 # ============================================================
+SUMMARY_RADIUS = 800
+
+
+def _accent_tolerant(word: str) -> str:
+    """'CREDITOS' -> 'CR[EÉ]DITOS' (con re.I cubre mayúsculas y minúsculas)."""
+    classes = {"A": "[AÁ]", "E": "[EÉ]", "I": "[IÍ]", "O": "[OÓ]", "U": "[UÚÜ]"}
+    return "".join(classes.get(c, re.escape(c)) for c in word.upper())
+
+
+# Un solo patrón para todas las anclas del resumen y los promedios por periodo
+# (ej.: "2025-1   93.33" o "2025-1 *93,33"); se recorre el texto una vez.
+SUMMARY_ANCHORS = ("promedio", "kardex", "creditos", "materias")
+SUMMARY_SCAN_RE = re.compile(
+    "|".join(f"(?P<{a}>{_accent_tolerant(a)})" for a in SUMMARY_ANCHORS)
+    + r"|(?P<periodo>\d{4}-\d)\s+\*?(?P<valor>\d{1,3}[.,]\d{1,2})",
+    re.I,
+)
+DECIMAL_RE = re.compile(r"(\d{1,3}[.,]\d{1,2})")
+# Lookahead: cada etiqueta se busca de forma independiente (igual que un re.search por etiqueta)
+COUNT_RE = re.compile(r"(?=(APR|REP|NMR|INS)\D+(\d+))", re.I)
+
+
+def _scan_summary(text: str) -> tuple[dict, list]:
+    """Primera posición de cada ancla y promedios por periodo, en un solo recorrido del texto."""
+    anchors: dict[str, int] = {}
+    periodos: list = []
+    for m in SUMMARY_SCAN_RE.finditer(text):
+        if m.group("periodo"):
+            periodos.append((m.group("periodo"), m.group("valor")))
+        elif m.lastgroup not in anchors:
+            anchors[m.lastgroup] = m.start()
+    return anchors, periodos
+
+
+def _counts(block: str) -> dict:
+    """{"APR": n, "REP": n, ...}: primera aparición de cada etiqueta en el bloque."""
+    out: dict = {}
+    for m in COUNT_RE.finditer(block):
+        out.setdefault(m.group(1).upper(), int(m.group(2)))
+    return out
+
+
 def extract_summary(raw_text: str) -> dict:
     """
     Busca:
@@ -203,103 +504,321 @@ def extract_summary(raw_text: str) -> dict:
       - PROMEDIO global (si aparece en bloque de PROMEDIO / KARDEX).
       - CRÉDITOS APR/REP/INS (tolerante a 'CREDITOS' sin tilde).
       - MATERIAS APR/REP/NMR/INS.
+    Se recorre el documento completo: hay kárdex con promedios por periodo en
+    las primeras hojas, y cada ancla cuenta desde su primera aparición.
     """
     resumen: dict = {"promedios": {}, "creditos": {}, "materias": {}}
-
     cleaned = nfc(raw_text)
-    cleaned_noacc = strip_accents(cleaned).lower()
+    anchors, periodos = _scan_summary(cleaned)
 
-    def block_after(anchor: str, radius: int = 800) -> str | None:
-        """
-        Selecciona un bloque a partir de 'anchor' (acento-insensible) con un radio fijo.
-        """
-        i = cleaned_noacc.find(strip_accents(anchor).lower())
-        if i == -1:
-            return None
-        # ubicar índice real en 'cleaned' mediante conteo de caracteres
-        # (las longitudes coinciden porque strip_accents solo remueve marcas)
-        sub = cleaned[i:i + radius]
-        return sub
+    def block_after(anchor: str) -> str | None:
+        i = anchors.get(anchor)
+        return cleaned[i:i + SUMMARY_RADIUS] if i is not None else None
 
     # --- Promedios por periodo (pueden aparecer varios) ---
-    # Ej.: "2025-1   93.33" o "2025-1 *93,33"
-    for m in re.finditer(r"(\d{4}-\d)\s+\*?(\d{1,3}[.,]\d{1,2})", cleaned):
-        periodo = m.group(1)
-        val = tofloat(m.group(2))
+    for periodo, valor in periodos:
+        val = tofloat(valor)
         if val is not None:
             resumen["promedios"][periodo] = val
 
-    # Promedio global (busca en bloque 'PROMEDIO' y/o 'KARDEX')
-    prom_blk = block_after("PROMEDIO")
-    if prom_blk:
-        m = re.search(r"(\d{1,3}[.,]\d{1,2})", prom_blk)
+    # Promedio global (busca en bloque 'PROMEDIO' y, si no, 'KARDEX')
+    for anchor in ("promedio", "kardex"):
+        blk = block_after(anchor)
+        m = DECIMAL_RE.search(blk) if blk else None
         v = tofloat(m.group(1)) if m else None
         if v is not None:
             resumen["promedios"].setdefault("kardex", v)
-
-    kard_blk = block_after("KARDEX")
-    if kard_blk and "kardex" not in resumen["promedios"]:
-        m = re.search(r"(\d{1,3}[.,]\d{1,2})", kard_blk)
-        v = tofloat(m.group(1)) if m else None
-        if v is not None:
-            resumen["promedios"]["kardex"] = v
+            break
 
     # --- Créditos ---
-    # Soporta "CRÉDITOS" / "CREDITOS"
-    cred_blk = block_after("CRÉDITOS") or block_after("CREDITOS")
+    cred_blk = block_after("creditos")
     if cred_blk:
-        m_apr = re.search(r"(?i)APR\D+(\d+)", cred_blk, re.S)
-        m_rep = re.search(r"(?i)REP\D+(\d+)", cred_blk, re.S)
-        m_ins = re.search(r"(?i)INS\D+(\d+)", cred_blk, re.S)
-        if m_apr: resumen["creditos"]["APR"] = int(m_apr.group(1))
-        if m_rep: resumen["creditos"]["REP"] = int(m_rep.group(1))
-        if m_ins: resumen["creditos"]["INS"] = int(m_ins.group(1))
+        c = _counts(cred_blk)
+        resumen["creditos"].update({k: c[k] for k in ("APR", "REP", "INS") if k in c})
 
     # --- Materias ---
-    mat_blk = block_after("MATERIAS")
+    mat_blk = block_after("materias")
     if mat_blk:
-        m_apr2 = re.search(r"(?i)APR\D+(\d+)", mat_blk, re.S)
-        m_rep2 = re.search(r"(?i)REP\D+(\d+)", mat_blk, re.S)
-        m_nmr2 = re.search(r"(?i)NMR\D+(\d+)", mat_blk, re.S)
-        m_ins2 = re.search(r"(?i)INS\D+(\d+)", mat_blk, re.S)
-        if m_apr2: resumen["materias"]["APR"] = int(m_apr2.group(1))
-        if m_rep2: resumen["materias"]["REP"] = int(m_rep2.group(1))
-        if m_nmr2: resumen["materias"]["NMR"] = int(m_nmr2.group(1))
-        if m_ins2: resumen["materias"]["INS"] = int(m_ins2.group(1))
-
-    # Garantiza llaves presentes aunque estén vacías
-    resumen.setdefault("creditos", {})
-    resumen.setdefault("materias", {})
-    resumen.setdefault("promedios", {})
+        c = _counts(mat_blk)
+        resumen["materias"].update({k: c[k] for k in ("APR", "REP", "NMR", "INS") if k in c})
 
     return resumen
 
 
 # ============================================================
-# 5) CLI
+# 5) STREAMING (NDJSON por página)
+# ============================================================
+HEADER_PAGES = 8  # páginas con las que se intenta la cabecera temprana
+
+
+def stream_kardex(pdf_path: Path, emit, layouts: LayoutStore | None = None,
+                  budget: MemoryBudget = UNBOUNDED) -> None:
+    """
+    Emite eventos conforme avanza el documento, para que el backend empiece
+    a trabajar antes de que termine el parseo:
+      {"event": "alumno",   "alumno": {...}}                  en cuanto el texto de las primeras
+                                                              HEADER_PAGES páginas trae expediente
+      {"event": "materias", "page": N, "materias": [...]}      por página (ya deduplicadas)
+      {"event": "alumno",   "alumno": {...}}                  si no salió antes o al final cambió
+      {"event": "resumen",  "resumen": {...}}
+      {"event": "end",      "ok": true, "pages": N, "materias": total}
+    Las filas no se acumulan: solo se guarda el set de llaves ya vistas y el texto.
+    """
+    seen: set = set()
+    texts: list[str] = []
+    header = None
+    total = 0
+
+    for n, page in enumerate(iter_pages(pdf_path, layouts=layouts, budget=budget), start=1):
+        texts.append(page["text"])
+        # Misma extracción que el documento completo, sobre las páginas leídas
+        # hasta ahora (la cabecera de la 1a hoja sola puede no bastar)
+        if header is None and n <= HEADER_PAGES:
+            partial = extract_header(nfc("\n".join(texts)))
+            if partial.get("expediente"):
+                header = partial
+                emit({"event": "alumno", "alumno": header})
+
+        rows = dedup_rows(rows_from_tables(page["tables"]), seen)
+        total += len(rows)
+        emit({"event": "materias", "page": n, "materias": rows})
+
+    raw_text = read_text(pdf_path, [{"text": t} for t in texts])
+    full_header = extract_header(raw_text)
+    if full_header != header:
+        emit({"event": "alumno", "alumno": full_header})
+    emit({"event": "resumen", "resumen": extract_summary(raw_text)})
+    emit({"event": "end", "ok": True, "pages": len(texts), "materias": total})
+
+
+def read_bounded(pdf_path: Path, prof=NO_PROFILE, layouts: LayoutStore | None = None,
+                 budget: MemoryBudget = UNBOUNDED) -> tuple[list[str], list]:
+    """
+    Lectura en memoria acotada (ver memory_budget.py): en serie y sin juntar las
+    páginas. Las filas crudas se acumulan mientras el presupuesto no se active;
+    desde ahí (lo pendiente incluido) se reducen a filas de materia deduplicadas
+    en cuanto se leen. Devuelve (texto de cada página, materias), igual que
+    read_pages() + extract_subject_rows().
+    """
+    texts: list[str] = []
+    materias: list = []
+    pending: list = []
+    seen: set = set()
+    for page in iter_pages(pdf_path, prof, layouts, budget):
+        texts.append(page["text"])
+        pending += _raw_rows(page["tables"])
+        if budget.tight():
+            materias += dedup_rows(_rows_from_raw(pending), seen)
+            pending = []
+    return texts, materias + dedup_rows(_rows_from_raw(pending), seen)
+
+
+def _emit_line(obj: dict) -> None:
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+# ============================================================
+# 6) DELTA contra un parseo anterior (re-carga del mismo alumno)
+# ============================================================
+# El alumno vuelve a subir su kárdex cada semestre y casi siempre solo cambian
+# las filas del último CIC. Con --previous=RUTA (resultado anterior completo o
+# su huella, en archivo o como JSON en línea) se emite solo lo que cambió:
+#   {"ok": true, "expediente": "...", "delta": {
+#       "alumno":   {campo: valor nuevo | null si ya no viene},
+#       "resumen":  {campo: valor nuevo | null si ya no viene},
+#       "materias": {"added": [...], "changed": [...], "removed": [{CR, CVE, Materia, CIC}]},
+#       "unchanged": N},
+#    "fingerprint": {...}}        <- huella del resultado nuevo, para la próxima vez
+# Las filas se identifican con row_key() (la misma llave de la deduplicación).
+# Con --fingerprint la salida completa trae además su huella.
+FINGERPRINT_VERSION = 1
+ROW_KEY_FIELDS = ("CR", "CVE", "Materia", "CIC")
+
+
+def _digest(value) -> str:
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _row_id(m: dict) -> str:
+    return json.dumps(list(row_key(m)), ensure_ascii=False)
+
+
+def kardex_fingerprint(result: dict) -> dict:
+    """
+    Huella compacta de un resultado: un digest por campo de la cabecera, por campo
+    del resumen y por fila de materia. Alcanza para calcular el delta sin guardar
+    el parseo completo.
+    """
+    alumno = result.get("alumno") or {}
+    return {
+        "fingerprint": FINGERPRINT_VERSION,
+        "expediente": alumno.get("expediente"),
+        "alumno": {k: _digest(v) for k, v in alumno.items()},
+        "resumen": {k: _digest(v) for k, v in (result.get("resumen") or {}).items()},
+        "materias": {_row_id(m): _digest(m) for m in result.get("materias") or []},
+    }
+
+
+def load_previous(raw: str) -> dict:
+    """
+    Huella del parseo anterior a partir de --previous: ruta a un JSON o el JSON
+    mismo. Acepta una huella, una salida con "fingerprint" o un resultado completo.
+    """
+    if raw.lstrip().startswith("{"):
+        prev = json.loads(raw)
+    else:
+        with open(raw, encoding="utf-8") as fh:
+            prev = json.load(fh)
+    if not isinstance(prev, dict):
+        raise ValueError("el parseo anterior no es un objeto JSON")
+    if isinstance(prev.get("fingerprint"), int):
+        return prev
+    if isinstance(prev.get("fingerprint"), dict):
+        return prev["fingerprint"]
+    return kardex_fingerprint(prev)
+
+
+def _changed_fields(current: dict, now: dict, before: dict) -> dict:
+    out = {k: current[k] for k, h in now.items() if before.get(k) != h}
+    out.update({k: None for k in before if k not in now})
+    return out
+
+
+def kardex_delta(result: dict, prev: dict) -> dict:
+    """Delta de `result` contra la huella `prev` (ver load_previous())."""
+    fp = kardex_fingerprint(result)
+    if prev.get("fingerprint") != FINGERPRINT_VERSION:
+        return {**result, "fingerprint": fp, "delta": {"skipped": "Huella anterior de otra versión"}}
+    if prev.get("expediente") != fp["expediente"]:
+        return {**result, "fingerprint": fp,
+                "delta": {"skipped": f"EXPEDIENTE distinto ({prev.get('expediente')} -> {fp['expediente']})"}}
+
+    before = prev.get("materias") or {}
+    added, changed = [], []
+    for m in result["materias"]:
+        h = before.get(_row_id(m))
+        if h is None:
+            added.append(m)
+        elif h != fp["materias"][_row_id(m)]:
+            changed.append(m)
+    removed = [dict(zip(ROW_KEY_FIELDS, json.loads(rid))) for rid in before if rid not in fp["materias"]]
+
+    return {
+        "ok": True,
+        "expediente": fp["expediente"],
+        "delta": {
+            "alumno": _changed_fields(result.get("alumno") or {}, fp["alumno"], prev.get("alumno") or {}),
+            "resumen": _changed_fields(result.get("resumen") or {}, fp["resumen"], prev.get("resumen") or {}),
+            "materias": {"added": added, "changed": changed, "removed": removed},
+            "unchanged": len(result["materias"]) - len(added) - len(changed),
+        },
+        "fingerprint": fp,
+    }
+
+
+def with_delta(result: dict, args: list[str]) -> dict:
+    """Aplica --previous / --fingerprint a un resultado (ya salido de la caché)."""
+    prev_raw = next((a.split("=", 1)[1] for a in args if a.startswith("--previous=")), None)
+    if not result.get("ok") or (prev_raw is None and "--fingerprint" not in args):
+        return result
+    if prev_raw is None:
+        return {**result, "fingerprint": kardex_fingerprint(result)}
+    try:
+        prev = load_previous(prev_raw)
+    except (OSError, ValueError) as e:
+        return {**result, "fingerprint": kardex_fingerprint(result),
+                "delta": {"skipped": f"No se pudo leer el parseo anterior: {e}"}}
+    return kardex_delta(result, prev)
+
+
+# ============================================================
+# 7) CLI
 # ============================================================
+def parse_kardex(pdf_path: Path, prof=NO_PROFILE, layouts: LayoutStore | None = None,
+                 jobs: int = 1, min_pages: int = DEFAULT_MIN_PAGES, budget: MemoryBudget = UNBOUNDED) -> dict:
+    """
+    Ejecuta el pipeline completo y devuelve el dict que imprime main().
+    Con presupuesto de memoria (--low-memory / --max-rss-mb) se lee con read_bounded().
+    """
+    if budget.enabled:
+        texts, materias = prof.call("read_bounded", read_bounded, pdf_path, prof, layouts, budget)
+        raw_text = prof.call("read_text", read_text, pdf_path, [{"text": t} for t in texts])
+        alumno = prof.call("extract_header", extract_header, raw_text)
+    else:
+        pages = prof.call("read_pages", read_pages, pdf_path, prof, layouts, jobs, min_pages)
+        texts = [p["text"] for p in pages]
+        raw_text = prof.call("read_text", read_text, pdf_path, pages)
+        alumno = prof.call("extract_header", extract_header, raw_text)
+        materias = prof.call("extract_subject_rows", extract_subject_rows, pages)
+        del pages
+    resumen = prof.call("extract_summary", extract_summary, raw_text)
+
+    return {
+        "ok": True,
+        "alumno": alumno,
+        "materias": materias,
+        "resumen": resumen,
+    }
+
+
+def run(pdf_path: Path, args: list[str]) -> dict:
+    """
+    parse_kardex() detrás de la caché por contenido (ver parse_cache.py).
+    Con --profile se parsea siempre (sin caché) y se agregan "timings".
+    Con --previous / --fingerprint se entrega el delta / la huella (with_delta()).
+    """
+    layouts = layouts_from_args(args)
+    jobs, min_pages = parallel_jobs(args), parallel_min_pages(args)
+    budget = budget_from_args(args)
+    if "--profile" in args:
+        result = profiled_parse(args, pdf_path, lambda prof: parse_kardex(pdf_path, prof, layouts, jobs, min_pages, budget))
+    else:
+        version = f"{PARSER_VERSION}+{code_fingerprint(__file__)}"
+        result = cached_parse(args, "kardex", version, pdf_path, {},
+                              lambda: parse_kardex(pdf_path, layouts=layouts, jobs=jobs, min_pages=min_pages, budget=budget))
+    return with_delta(result, args)
+
+
+def handle_request(path: str, args: list[str]) -> dict:
+    """Atiende una petición del modo worker (misma salida que main())."""
+    pdf_path = Path(path)
+    if not pdf_path.exists():
+        return {"ok": False, "error": f"No existe el archivo: {pdf_path}"}
+    try:
+        return run(pdf_path, args)
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
 def main():
-    if len(sys.argv) < 2:
+    if "--worker" in sys.argv[1:]:
+        from parser_worker import serve
+        serve(handle_request, sys.argv[1:])
+        return
+
+    args = [a for a in sys.argv[1:] if a.startswith("--")]
+    paths = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not paths:
         print(json.dumps({"ok": False, "error": "PDF path missing"}, ensure_ascii=False))
         sys.exit(1)
 
-    pdf_path = Path(sys.argv[1])
+    pdf_path = Path(paths[0])
     if not pdf_path.exists():
         print(json.dumps({"ok": False, "error": f"No existe el archivo: {pdf_path}"}, ensure_ascii=False))
         sys.exit(1)
 
+    if "--stream" in args:
+        try:
+            stream_kardex(pdf_path, _emit_line, layouts_from_args(args), budget_from_args(args))
+        except Exception as e:
+            _emit_line({"event": "end", "ok": False, "error": str(e)})
+            sys.exit(1)
+        return
+
     try:
-        raw_text = read_text(pdf_path)
-        alumno = extract_header(raw_text)
-        materias = extract_subject_rows(pdf_path)
-        resumen = extract_summary(raw_text)
-
-        out = {
-            "ok": True,
-            "alumno": alumno,
-            "materias": materias,
-            "resumen": resumen,
-        }
+        out = run(pdf_path, args)
         print(json.dumps(out, ensure_ascii=False))
     except Exception as e:
         print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
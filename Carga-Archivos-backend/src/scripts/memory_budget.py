@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo de memoria acotada para PDFs muy grandes (kardex.py y plan_estudio.py).
+
+- pdfplumber guarda los objetos y caracteres de cada página mientras el PDF
+  sigue abierto: en modo acotado cada página se libera (release_page) en cuanto
+  se leyó.
+- Las tablas se reducen a filas compactas en cuanto salen (kardex: filas de
+  materia deduplicadas; plan: frames limpios con celdas internadas) y las
+  lecturas de Tabula/Camelot se hacen por bloques de páginas.
+- Con un techo de RSS el modo se activa solo: el documento se lee en serie y,
+  en cuanto el proceso pasa el techo (se mide entre páginas/bloques), el resto
+  se procesa acotado. Una vez activado ya no se desactiva en ese documento.
+- La salida es la misma con o sin el modo (no entra en la llave de la caché).
+
+Configuración (flags o variables de entorno):
+  --low-memory     / PARSER_LOW_MEMORY=1   (acotado desde la primera página)
+  --max-rss-mb=N   / PARSER_MAX_RSS_MB=N   (se activa al pasar N MB de RSS)
+"""
+import os, sys, gc
+
+# Páginas por lectura de Tabula/Camelot en modo acotado (cada llamada a
+# tabula-java sin jpype arranca una JVM: bloques de una página saldrían caros)
+CHUNK_PAGES = 4
+
+
+def _opt(argv: list[str], name: str) -> str | None:
+    return next((a.split("=", 1)[1] for a in argv if a.startswith(name + "=")), None)
+
+
+def current_rss() -> int | None:
+    """RSS actual en bytes (None si no hay cómo medirlo)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource  # sin /proc (macOS): el pico, no el actual; peca de precavido
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+class MemoryBudget:
+    def __init__(self, forced: bool = False, max_rss: int | None = None):
+        self.forced = forced
+        self.max_rss = max_rss
+        self.engaged = forced
+
+    @property
+    def enabled(self) -> bool:
+        """Hay modo acotado pedido o armado (aunque aún no se active)."""
+        return self.forced or bool(self.max_rss)
+
+    def tight(self) -> bool:
+        """True si hay que procesar acotado a partir de aquí."""
+        if not self.engaged and self.max_rss:
+            rss = current_rss()
+            if rss is not None and rss >= self.max_rss:
+                self.engaged = True
+                gc.collect()  # lo ya soltado se devuelve antes de seguir
+        return self.engaged
+
+
+UNBOUNDED = MemoryBudget()
+
+
+def budget_from_args(argv: list[str]) -> MemoryBudget:
+    forced = "--low-memory" in argv or os.environ.get("PARSER_LOW_MEMORY", "0") == "1"
+    raw_mb = _opt(argv, "--max-rss-mb") or os.environ.get("PARSER_MAX_RSS_MB")
+    try:
+        max_mb = float(raw_mb) if raw_mb else 0.0
+    except ValueError:
+        max_mb = 0.0
+    return MemoryBudget(forced, int(max_mb * 1024 * 1024) if max_mb > 0 else None)
+
+
+def release_page(page) -> None:
+    """Suelta los objetos, caracteres y el mapa de texto que pdfplumber guarda de la página."""
+    close = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+    if close is not None:
+        close()
+
+
+def page_chunks(pages: list[int], size: int = CHUNK_PAGES) -> list[list[int]]:
+    """[1..10] -> [[1..4], [5..8], [9, 10]]."""
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
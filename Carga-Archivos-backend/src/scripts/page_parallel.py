@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reparto de páginas de un mismo PDF entre procesos (kardex.py y plan_estudio.py).
+
+- Las páginas se dividen en rangos contiguos, uno por proceso, y los resultados
+  se juntan en orden de página: la salida es idéntica a la del recorrido serial.
+- Documentos con menos de --parallel-min-pages páginas se quedan en serie
+  (abrir el PDF en cada proceso cuesta más de lo que se gana).
+- El pool de procesos se reutiliza entre documentos (útil en modo --worker).
+- Si un proceso del pool muere, run_ranges() devuelve None y el llamador
+  hace el trabajo en serie.
+
+Configuración (flags o variables de entorno):
+  --parallel[=N]            / PARSER_PARALLEL=N     (sin N: todos los núcleos; 1: en serie)
+  --parallel-min-pages=N    / PARSER_PARALLEL_MIN_PAGES  (por defecto: 12)
+"""
+import os, sys, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+DEFAULT_MIN_PAGES = 12
+
+_pool: ProcessPoolExecutor | None = None
+_pool_key: tuple | None = None
+
+
+def _opt(argv: list[str], name: str) -> str | None:
+    return next((a.split("=", 1)[1] for a in argv if a.startswith(name + "=")), None)
+
+
+def parallel_jobs(argv: list[str]) -> int:
+    """Número de procesos pedido (1 = en serie)."""
+    raw = _opt(argv, "--parallel")
+    if raw is None:
+        raw = "0" if "--parallel" in argv else os.environ.get("PARSER_PARALLEL", "1")
+    try:
+        jobs = int(raw)
+    except ValueError:
+        return 1
+    if raw == "0" and "--parallel" in argv:
+        return os.cpu_count() or 1
+    return max(jobs, 1)
+
+
+def parallel_min_pages(argv: list[str]) -> int:
+    raw = _opt(argv, "--parallel-min-pages") or os.environ.get("PARSER_PARALLEL_MIN_PAGES")
+    try:
+        return int(raw) if raw else DEFAULT_MIN_PAGES
+    except ValueError:
+        return DEFAULT_MIN_PAGES
+
+
+def count_pages(path) -> int | None:
+    """Número de páginas sin extraer nada (None si no hay con qué leerlo)."""
+    try:
+        from PyPDF2 import PdfReader
+    except Exception:
+        PdfReader = None
+    try:
+        if PdfReader is not None:
+            return len(PdfReader(str(path)).pages)
+        import pdfplumber
+        with pdfplumber.open(str(path)) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return None
+
+
+def page_ranges(start: int, stop: int, jobs: int) -> list[tuple[int, int]]:
+    """Divide [start, stop) en a lo más `jobs` rangos contiguos de tamaño parejo."""
+    n = stop - start
+    if n <= 0:
+        return []
+    k = max(1, min(jobs, n))
+    base, extra = divmod(n, k)
+    out, a = [], start
+    for i in range(k):
+        b = a + base + (1 if i < extra else 0)
+        out.append((a, b))
+        a = b
+    return out
+
+
+def pages_spec(pages: list[int]) -> str:
+    """[1, 2, 3, 5] -> "1-3,5" (páginas 1-based, mismo formato de Tabula/Camelot)."""
+    runs: list[list[int]] = []
+    for p in sorted(set(pages)):
+        if runs and p == runs[-1][1] + 1:
+            runs[-1][1] = p
+        else:
+            runs.append([p, p])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in runs)
+
+
+def _jvm_started() -> bool:
+    jpype = sys.modules.get("jpype")
+    return bool(jpype and jpype.isJVMStarted())
+
+
+def _start_method() -> str | None:
+    """
+    fork es lo más barato, pero un proceso hijo de fork no hereda los hilos de
+    una JVM ya arrancada (Tabula vía jpype): en ese caso se usa spawn.
+    """
+    if _jvm_started() and "spawn" in multiprocessing.get_all_start_methods():
+        return "spawn"
+    return None  # el de la plataforma
+
+
+def _get_pool(jobs: int) -> ProcessPoolExecutor:
+    global _pool, _pool_key
+    key = (jobs, _start_method())
+    if _pool is None or _pool_key != key:
+        shutdown_pool()
+        ctx = multiprocessing.get_context(key[1]) if key[1] else None
+        _pool, _pool_key = ProcessPoolExecutor(max_workers=jobs, mp_context=ctx), key
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool, _pool_key = None, None
+
+
+def run_ranges(jobs: int, fn, calls: list[tuple]) -> list | None:
+    """
+    Ejecuta fn(*args) para cada tupla de `calls` en el pool y devuelve los
+    resultados en el mismo orden. None si el pool se rompió.
+    """
+    pool = _get_pool(jobs)
+    try:
+        futures = [pool.submit(fn, *args) for args in calls]
+        return [f.result() for f in futures]
+    except BrokenProcessPool:
+        shutdown_pool()
+        return None
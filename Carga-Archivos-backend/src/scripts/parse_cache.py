@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché en disco de resultados de parseo, compartida por kardex.py y plan_estudio.py.
+
+- Llave: sha256 del PDF + parser + versión del parser (constante + huella del
+  código fuente del script y de los módulos locales que importa, así un cambio
+  al parser o a un helper invalida solo) + opciones (--cont=N, --debug...).
+- Un archivo JSON por entrada: <dir>/<ab>/<llave>.json, escrito en un temporal y
+  publicado con os.replace (atómico), así varios workers pueden leer y escribir a la vez.
+- LRU por mtime: cada acierto "toca" el archivo; al pasar del tamaño máximo se
+  borran los más viejos. Un contador de bytes escritos (<dir>/.size) evita
+  recorrer el directorio en cada escritura: solo se recorre cuando el contador
+  pasa del máximo, y ahí se recalibra. Solo un proceso desaloja a la vez.
+
+Configuración (flags o variables de entorno):
+  --cache-dir=RUTA      / PARSER_CACHE_DIR     (por defecto: <tmp>/carga-archivos-parse-cache)
+  --cache-max-mb=N      / PARSER_CACHE_MAX_MB  (por defecto: 256)
+  --no-cache            / PARSER_CACHE=0
+  --sha256=HEX          hash ya calculado por el backend (evita releer el PDF)
+"""
+import os, ast, json, hashlib, tempfile, contextlib
+from pathlib import Path
+
+try:
+    import fcntl  # no existe en Windows: ahí el desalojo simplemente no se serializa
+except Exception:
+    fcntl = None
+
+DEFAULT_MAX_MB = 256
+EVICT_TARGET = 0.9  # al desalojar, bajar al 90% del máximo para no hacerlo en cada escritura
+SIZE_FILE = ".size"  # bytes escritos desde el último recorrido (aproximado hacia arriba)
+
+
+def sha256_file(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+_code_fp: dict[str, str] = {}
+
+
+def local_modules(source_file: str) -> list[Path]:
+    """El script y los módulos de su mismo directorio que importa (recursivo), ordenados."""
+    root = Path(source_file).resolve()
+    found: dict[str, Path] = {}
+    pending = [root]
+    while pending:
+        path = pending.pop()
+        if path.name in found:
+            continue
+        found[path.name] = path
+        try:
+            tree = ast.parse(path.read_bytes())
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [a.name for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                dep = root.parent / f"{name.split('.')[0]}.py"
+                if dep.is_file():
+                    pending.append(dep)
+    return sorted(found.values())
+
+
+def code_fingerprint(source_file: str) -> str:
+    """Huella corta del código del parser y sus helpers locales (una vez por proceso)."""
+    if source_file not in _code_fp:
+        h = hashlib.sha256()
+        for path in local_modules(source_file):
+            h.update(path.name.encode("utf-8") + b"\0")
+            h.update(path.read_bytes() + b"\0")
+        _code_fp[source_file] = h.hexdigest()[:12]
+    return _code_fp[source_file]
+
+
+def _opt(argv: list[str], name: str) -> str | None:
+    return next((a.split("=", 1)[1] for a in argv if a.startswith(name + "=")), None)
+
+
+def write_json_atomic(path: Path, value) -> None:
+    """Escribe en un temporal del mismo directorio y publica con os.replace."""
+    fd, tmp = tempfile.mkstemp(dir=Path(path).parent, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(value, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+class ParseCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(parser: str, version: str, content_hash: str, options: dict) -> str:
+        raw = json.dumps([parser, version, content_hash, options], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        p = self._path(key)
+        try:
+            with open(p, encoding="utf-8") as fh:
+                value = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(p)  # marca de uso para el LRU
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(p, value)
+        if self._grow(p.stat().st_size) > self.max_bytes:
+            self.evict()
+
+    @contextlib.contextmanager
+    def _locked(self, name: str, blocking: bool = True):
+        """Lock de archivo en <dir>/<name>; produce False si no bloqueante y ya estaba tomado."""
+        with open(self.root / name, "a") as lock:
+            if fcntl:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except OSError:
+                    yield False
+                    return
+            yield True
+
+    def _grow(self, size: int) -> float:
+        """Suma `size` al contador de bytes y devuelve el total (inf si no había contador)."""
+        counter = self.root / SIZE_FILE
+        with self._locked(".size.lock"):
+            try:
+                total = int(counter.read_text()) + size
+            except (OSError, ValueError):
+                return float("inf")  # caché sin contador: el desalojo lo calibra
+            with contextlib.suppress(OSError):
+                counter.write_text(str(total))
+            return total
+
+    def _set_size(self, total: int) -> None:
+        with self._locked(".size.lock"), contextlib.suppress(OSError):
+            (self.root / SIZE_FILE).write_text(str(total))
+
+    def _entries(self):
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if e.name.endswith(".json") and not e.name.startswith(".tmp-"):
+                    with contextlib.suppress(FileNotFoundError):
+                        st = e.stat()
+                        yield e.path, st.st_size, st.st_mtime
+
+    def evict(self) -> None:
+        """Recorre el directorio, borra los más viejos si pasa del máximo y recalibra el contador."""
+        with self._locked(".evict.lock", blocking=False) as acquired:
+            if not acquired:
+                return  # otro proceso ya está desalojando
+            entries = list(self._entries())
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                target = self.max_bytes * EVICT_TARGET
+                for path, size, _ in sorted(entries, key=lambda e: e[2]):
+                    with contextlib.suppress(OSError):
+                        os.unlink(path)
+                        total -= size
+                    if total <= target:
+                        break
+            self._set_size(total)
+
+
+def cache_root(argv: list[str]) -> Path:
+    """Directorio de caché (también lo usan otros artefactos aprendidos, p.ej. plantillas)."""
+    return Path(_opt(argv, "--cache-dir") or os.environ.get("PARSER_CACHE_DIR")
+                or os.path.join(tempfile.gettempdir(), "carga-archivos-parse-cache"))
+
+
+def cache_from_args(argv: list[str]) -> ParseCache | None:
+    if "--no-cache" in argv or os.environ.get("PARSER_CACHE", "1") == "0":
+        return None
+    root = cache_root(argv)
+    raw_mb = _opt(argv, "--cache-max-mb") or os.environ.get("PARSER_CACHE_MAX_MB")
+    try:
+        max_mb = float(raw_mb) if raw_mb else DEFAULT_MAX_MB
+    except ValueError:
+        max_mb = DEFAULT_MAX_MB
+    try:
+        return ParseCache(root, int(max_mb * 1024 * 1024))
+    except OSError:
+        return None  # sin permisos / disco de solo lectura: parsear sin caché
+
+
+def cached_parse(argv: list[str], parser: str, version: str, path: Path, options: dict, compute) -> dict:
+    """
+    Devuelve el resultado cacheado para (PDF, parser, versión, opciones) o llama a
+    compute() y guarda el resultado si salió ok. Un fallo de la caché nunca
+    impide el parseo.
+    """
+    cache = cache_from_args(argv)
+    if cache is None:
+        return compute()
+
+    try:
+        content_hash = _opt(argv, "--sha256") or sha256_file(path)
+        key = cache.make_key(parser, version, content_hash.lower(), options)
+        hit = cache.get(key)
+    except OSError:
+        return compute()
+    if hit is not None:
+        return hit
+
+    result = compute()
+    if result.get("ok"):
+        with contextlib.suppress(OSError):
+            cache.put(key, result)
+    return result
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Medición por etapa para kardex.py y plan_estudio.py (flag --profile).
+
+Agrega a la salida un objeto "timings":
+  {
+    "stages": { "<etapa>": {"wall_s": 0.12, "cpu_s": 0.11, "calls": 1}, ... },
+    "total":  {"wall_s": ..., "cpu_s": ...},
+    "peak_rss_mb": 143.2,
+    "profile_dump": "/ruta/archivo-20250921-101500.prof"   # solo con --profile-dump=DIR
+  }
+
+Notas:
+- CPU es tiempo de este proceso; lo que corre en otro proceso (JVM de Tabula en
+  modo subprocess, Ghostscript de Camelot) aparece solo en wall.
+- peak_rss_mb es el pico del proceso completo; en modo --worker acumula el de
+  documentos anteriores.
+"""
+import os, sys, time, cProfile, contextlib
+from pathlib import Path
+
+try:
+    import resource
+except Exception:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float | None:
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KiB; macOS, bytes
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+class Profiler:
+    """Acumula wall/CPU por etapa. Si enabled=False, stage() no mide nada."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: dict[str, dict] = {}
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        self.dump_path: str | None = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            st = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            st["wall_s"] += time.perf_counter() - w0
+            st["cpu_s"] += time.process_time() - c0
+            st["calls"] += 1
+
+    def call(self, name: str, fn, *args, **kwargs):
+        with self.stage(name):
+            return fn(*args, **kwargs)
+
+    def report(self) -> dict:
+        out = {
+            "stages": {
+                k: {"wall_s": round(v["wall_s"], 6), "cpu_s": round(v["cpu_s"], 6), "calls": v["calls"]}
+                for k, v in self.stages.items()
+            },
+            "total": {
+                "wall_s": round(time.perf_counter() - self._t0, 6),
+                "cpu_s": round(time.process_time() - self._c0, 6),
+            },
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if self.dump_path:
+            out["profile_dump"] = self.dump_path
+        return out
+
+
+NO_PROFILE = Profiler(enabled=False)
+
+
+def _opt(argv: list[str], name: str) -> str | None:
+    return next((a.split("=", 1)[1] for a in argv if a.startswith(name + "=")), None)
+
+
+def profiled_parse(argv: list[str], pdf_path: Path, compute) -> dict:
+    """
+    Ejecuta compute(prof) midiendo etapas y agrega "timings" al resultado.
+    Con --profile-dump=DIR guarda además un volcado cProfile por documento
+    (ábrelo con `python -m pstats` o snakeviz).
+    """
+    prof = Profiler()
+    dump_dir = _opt(argv, "--profile-dump")
+    cp = cProfile.Profile() if dump_dir else None
+
+    if cp:
+        cp.enable()
+    try:
+        result = compute(prof)
+    finally:
+        if cp:
+            cp.disable()
+            os.makedirs(dump_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            prof.dump_path = str(Path(dump_dir) / f"{Path(pdf_path).stem}-{stamp}-{os.getpid()}.prof")
+            cp.dump_stats(prof.dump_path)
+
+    result["timings"] = prof.report()
+    return result
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo "worker" compartido por kardex.py y plan_estudio.py.
+
+Mantiene el proceso vivo (pdfplumber, pdfminer, pandas, tabula ya importados)
+y atiende peticiones JSON por línea:
+
+  petición:  {"id": 1, "path": "/ruta/archivo.pdf", "args": ["--debug"]}
+  respuesta: {"id": 1, "result": { ...misma salida que main()... }}
+
+Transportes:
+  - stdin/stdout (por defecto): una petición por línea, una respuesta por línea.
+  - socket Unix (--socket=/ruta.sock): mismo protocolo por conexión.
+
+Peticiones especiales:
+  {"id": 1, "cmd": "ping"}      -> {"id": 1, "result": {"ok": true, "pong": true}}
+  {"id": 1, "cmd": "shutdown"}  -> responde y termina el proceso.
+"""
+import sys, json, os, contextlib, traceback
+
+
+def _handle_line(line: str, handler) -> tuple[dict | None, bool]:
+    """Procesa una línea del protocolo. Devuelve (respuesta, seguir_vivo)."""
+    line = line.strip()
+    if not line:
+        return None, True
+    try:
+        req = json.loads(line)
+    except Exception as e:
+        return {"id": None, "result": {"ok": False, "error": f"Petición inválida: {e}"}}, True
+
+    rid = req.get("id")
+    cmd = req.get("cmd")
+    if cmd == "ping":
+        return {"id": rid, "result": {"ok": True, "pong": True, "pid": os.getpid()}}, True
+    if cmd == "shutdown":
+        return {"id": rid, "result": {"ok": True}}, False
+
+    path = req.get("path")
+    args = [str(a) for a in (req.get("args") or [])]
+    if not path:
+        return {"id": rid, "result": {"ok": False, "error": "PDF path missing"}}, True
+
+    # Cualquier print accidental de las librerías no debe ensuciar el protocolo
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            result = handler(path, args)
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        result = {"ok": False, "error": str(e)}
+    return {"id": rid, "result": result}, True
+
+
+def serve_stdio(handler) -> None:
+    out = sys.stdout
+    for line in sys.stdin:
+        resp, alive = _handle_line(line, handler)
+        if resp is not None:
+            out.write(json.dumps(resp, ensure_ascii=False) + "\n")
+            out.flush()
+        if not alive:
+            break
+
+
+def serve_socket(sock_path: str, handler) -> None:
+    import socketserver
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                resp, alive = _handle_line(raw.decode("utf-8"), handler)
+                if resp is not None:
+                    self.wfile.write((json.dumps(resp, ensure_ascii=False) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                if not alive:
+                    # shutdown() bloquea si se llama desde el mismo hilo que serve_forever
+                    import threading
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(sock_path)
+    with socketserver.UnixStreamServer(sock_path, _Handler) as srv:
+        try:
+            srv.serve_forever()
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(sock_path)
+
+
+def serve(handler, argv: list[str]) -> None:
+    """Entrada del modo worker: elige transporte según --socket=RUTA."""
+    sock = next((a.split("=", 1)[1] for a in argv if a.startswith("--socket=")), None)
+    if sock:
+        serve_socket(sock, handler)
+    else:
+        serve_stdio(handler)
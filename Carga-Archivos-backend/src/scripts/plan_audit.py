@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auditoría masiva de avance: kárdex de toda una generación contra su plan de estudios.
+
+Uso:
+  python plan_audit.py --planes=<planes.ndjson|carpeta|plan.json ...> <kárdex: ndjson|carpeta|json ...>
+                       [--plan=2182] [--out=avance.parquet|avance.ndjson] [--conciliar]
+
+- Planes: salida de plan_estudio.py (materias + acentuaciones). Por versión se
+  arma un índice una sola vez: código normalizado (normalize_code) -> posición,
+  con tipo, créditos y pertenencia a cada acentuación. Si hay varios PDFs de la
+  misma versión se prefiere el OFICIAL (trae acentuaciones), si no el último.
+- Kárdex: salida de kardex.py, cargada con cohort_stats.Cohort (misma regla de
+  aprobada). Cada CVE distinta se normaliza y se busca en el índice una sola vez;
+  luego todas las filas aprobadas de los alumnos de esa versión se marcan de
+  golpe en una matriz alumnos x materias del plan. El costo es lineal en el
+  número de filas del kárdex, sin consultas por alumno.
+- --conciliar: las CVE que no están en el plan se concilian por nombre (y
+  clave) contra las materias del plan con subject_match.SubjectIndex, una vez
+  por CVE distinta; sirve cuando la clave del kárdex viene mal o cambió.
+- Resultado: una fila por alumno con obligatorias faltantes, créditos de
+  optativas, avance de cada acentuación y materias aprobadas fuera del plan.
+"""
+import sys, json
+from pathlib import Path
+
+import numpy as np
+
+from cohort_stats import iter_json_records, load_cohort
+from plan_codes import normalize_code, normalize_tipo
+from subject_match import MIN_CONFIDENCE, SubjectIndex
+
+
+class PlanIndex:
+    """Materias de una versión del plan como arreglos, con índice código -> posición."""
+
+    def __init__(self, record: dict):
+        plan = record.get("plan") or {}
+        self.version = plan.get("version")
+        self.total_creditos = plan.get("total_creditos") or 0
+        self.code_id: dict[str, int] = {}
+        self.codes: list[str] = []
+        self.names: list[str] = []
+        tipos: list[str] = []
+        creditos: list[int] = []
+
+        def add(m: dict, tipo: str) -> int:
+            code = normalize_code(m.get("codigo"))
+            if not code:
+                return -1
+            if code not in self.code_id:
+                self.code_id[code] = len(self.codes)
+                self.codes.append(code)
+                self.names.append(m.get("nombre") or "")
+                tipos.append(tipo)
+                creditos.append(int(m.get("creditos") or 0))
+            return self.code_id[code]
+
+        for m in record.get("materias") or []:
+            add(m, normalize_tipo(m.get("tipo")))
+        # Las materias de acentuación que no vienen en la malla cuentan como optativas
+        self.acentuaciones: list[tuple[str, np.ndarray]] = []
+        for acent in record.get("acentuaciones") or []:
+            ids = {add(m, "OPT") for m in acent.get("materias") or []} - {-1}
+            self.acentuaciones.append((acent.get("nombre"), np.array(sorted(ids), dtype=np.int64)))
+
+        self.obligatoria = np.array([t == "OBL" for t in tipos], dtype=bool)
+        self.creditos = np.array(creditos, dtype=np.int64)
+        self._names_index: SubjectIndex | None = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def lookup(self, codes) -> np.ndarray:
+        """Posición en el plan de cada código ya normalizado (-1 si no es del plan)."""
+        return np.array([self.code_id.get(c, -1) for c in codes], dtype=np.int64)
+
+    def reconcile(self, names, codes, min_confidence: float = MIN_CONFIDENCE) -> np.ndarray:
+        """Posición en el plan por nombre + clave (subject_match), -1 si no concilia."""
+        if self._names_index is None:
+            self._names_index = SubjectIndex(zip(self.codes, self.names, ["plan"] * len(self.codes)))
+        out = np.full(len(names), -1, dtype=np.int64)
+        for i, (name, code) in enumerate(zip(names, codes)):
+            m = self._names_index.match(name, code, min_confidence)
+            if m is not None:
+                out[i] = self.code_id[m["codigo"]]
+        return out
+
+
+def load_plans(specs: list[str]) -> dict[str, PlanIndex]:
+    """versión -> índice; se prefiere el PDF OFICIAL de cada versión."""
+    chosen: dict[str, dict] = {}
+    for rec in iter_json_records(specs):
+        version = (rec.get("plan") or {}).get("version")
+        if not rec.get("ok") or not version or version == "N/A":
+            continue
+        prev = chosen.get(version)
+        if prev is None or rec.get("origen") == "OFICIAL" or prev.get("origen") != "OFICIAL":
+            chosen[version] = rec
+    return {v: PlanIndex(rec) for v, rec in chosen.items()}
+
+
+def audit(cohort, plans: dict[str, PlanIndex], reconcile: bool = False) -> list[dict]:
+    """Tabla de avance, una fila por alumno de `cohort` (cohort_stats.Cohort)."""
+    # Cada CVE distinta de la generación se normaliza una sola vez
+    norm_cve = [normalize_code(c) for c in cohort.cve_names]
+    # id de cada CVE por código normalizado ('6000' y '06000' son la misma materia);
+    # las que no normalizan a nada se distinguen por su texto
+    _, norm_id = np.unique(np.array([c or f"\0{raw}" for c, raw in zip(norm_cve, cohort.cve_names)], dtype=str),
+                           return_inverse=True)
+    n_norm = max(int(norm_id.max()) + 1 if len(norm_id) else 0, 1)
+    row_plan = cohort.plan[cohort.student]
+    out: list[dict | None] = [None] * cohort.n_students
+
+    for p, version in enumerate(cohort.plan_names):
+        members = np.flatnonzero(cohort.plan == p)
+        idx = plans.get(version)
+        if idx is None:
+            for s in members:
+                out[s] = {"expediente": cohort.expediente[s], "plan": version or None, "plan_encontrado": False}
+            continue
+
+        local = np.full(cohort.n_students, -1, dtype=np.int64)
+        local[members] = np.arange(len(members))
+        cve_pos = idx.lookup(norm_cve)  # CVE distinta -> posición en este plan
+        if reconcile:
+            unknown = np.flatnonzero(cve_pos < 0)
+            cve_pos[unknown] = idx.reconcile(cohort.materia_names[unknown], [norm_cve[c] for c in unknown])
+
+        rows = cohort.passed & (row_plan == p)
+        st, pos = local[cohort.student[rows]], cve_pos[cohort.cve[rows]]
+        in_plan = pos >= 0
+        done = np.zeros((len(members), len(idx)), dtype=bool)
+        done[st[in_plan], pos[in_plan]] = True
+
+        # aprobadas fuera del plan (cada código normalizado una vez por alumno)
+        outside_keys = np.unique(st[~in_plan] * n_norm + norm_id[cohort.cve[rows][~in_plan]])
+        outside = np.bincount(outside_keys // n_norm, minlength=len(members))
+
+        missing = idx.obligatoria & ~done
+        optativas = done & ~idx.obligatoria
+        creditos_plan = done @ idx.creditos
+        creditos_opt = optativas @ idx.creditos
+        acent_done = [(name, done[:, ids].sum(axis=1), len(ids)) for name, ids in idx.acentuaciones]
+        codes = np.array(idx.codes, dtype=object)
+
+        for i, s in enumerate(members):
+            acents = [{"nombre": name, "aprobadas": int(n[i]), "total": total, "completa": bool(total and n[i] == total)}
+                      for name, n, total in acent_done]
+            faltantes = codes[missing[i]].tolist()
+            out[s] = {
+                "expediente": cohort.expediente[s],
+                "plan": version,
+                "plan_encontrado": True,
+                "creditos_plan": int(creditos_plan[i]),
+                "total_creditos": idx.total_creditos,
+                "avance": round(int(creditos_plan[i]) / idx.total_creditos, 4) if idx.total_creditos else None,
+                "obligatorias_faltantes": faltantes,
+                "n_obligatorias_faltantes": len(faltantes),
+                "optativas_aprobadas": int(optativas[i].sum()),
+                "creditos_optativos": int(creditos_opt[i]),
+                "acentuaciones": acents,
+                "acentuacion_completa": next((a["nombre"] for a in acents if a["completa"]), None),
+                "fuera_del_plan": int(outside[i]),
+            }
+    return out
+
+
+def write_table(rows: list[dict], path: Path) -> None:
+    """.parquet (pyarrow) o NDJSON."""
+    if path.suffix == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.Table.from_pylist(rows), str(path), compression="zstd")
+        return
+    with open(path, "w", encoding="utf-8") as fh:
+        for r in rows:
+            fh.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+# ----------------------------- Main -----------------------------
+def main():
+    args = sys.argv[1:]
+    opts = {a.split("=", 1)[0]: (a.split("=", 1)[1] if "=" in a else "1") for a in args if a.startswith("--")}
+    specs = [a for a in args if not a.startswith("--")]
+    if not specs or "--planes" not in opts:
+        print(json.dumps({"ok": False, "error": "Uso: plan_audit.py --planes=<planes> <kárdex ...>"}))
+        sys.exit(1)
+    try:
+        plans = load_plans(opts["--planes"].split(","))
+        cohort = load_cohort(specs, opts.get("--plan"))
+        rows = audit(cohort, plans, reconcile="--conciliar" in opts)
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": f"{type(e).__name__}: {e}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    summary = {"ok": True, "alumnos": len(rows), "planes": sorted(plans),
+               "sin_plan": sum(not r["plan_encontrado"] for r in rows)}
+    if "--out" in opts:
+        write_table(rows, Path(opts["--out"]))
+        print(json.dumps({**summary, "out": opts["--out"]}, ensure_ascii=False))
+    else:
+        print(json.dumps({**summary, "avance": rows}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
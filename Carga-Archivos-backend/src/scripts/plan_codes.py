@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalización de claves y tipos de materia, compartida por plan_estudio.py,
+subject_match.py y plan_audit.py. Solo usa la biblioteca estándar: quien la
+importa no carga los extractores de tablas (Tabula, Camelot, pdfplumber).
+"""
+import re
+
+
+def normalize_code(raw: str) -> str:
+    """
+    '4110.0' -> '04110', '121.0' -> '00121', '6881.0' -> '06881'
+    Si ya trae 5+ dígitos, no padear.
+    """
+    if raw is None:
+        return ""
+    m = re.match(r"^\s*(\d+)(?:\.0)?\s*$", str(raw))
+    if not m:
+        # A veces viene pegado con texto; intenta extraer primer bloque dígitos
+        mm = re.search(r"\b(\d{2,6})\b", str(raw))
+        if not mm:
+            return ""
+        num = mm.group(1)
+    else:
+        num = m.group(1)
+    if len(num) < 5:
+        num = num.zfill(5)
+    return num
+
+
+def normalize_tipo(val: str) -> str:
+    v = (val or "").upper().replace("*", "")
+    if v in ("OPT", "ELE", "SEL"):
+        return "OPT"
+    return "OBL" if v == "OBL" else (v or "OBL")
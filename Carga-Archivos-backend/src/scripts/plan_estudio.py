@@ -10,6 +10,15 @@ Parser unificado de Plan de Estudios (UNISON – ISI)
 
 Uso:
   python plan_estudio.py <ruta.pdf> [--debug] [--cont=N]
+  python plan_estudio.py --worker [--socket=/ruta.sock]   (ver parser_worker.py)
+  Caché por contenido: [--sha256=HEX] [--cache-dir=RUTA] [--cache-max-mb=N] [--no-cache]
+  Medición por etapa:  [--profile] [--profile-dump=DIR]   (ver parse_profile.py)
+  Páginas en paralelo: [--parallel[=N]] [--parallel-min-pages=N]   (ver page_parallel.py)
+  Memoria acotada:     [--low-memory] [--max-rss-mb=N]   (ver memory_budget.py)
+  Texto base:          [--text-pages=N]   hojas leídas para origen/versión/créditos
+                       (primeras N-1 + la última; 0 = todas; se amplía si no alcanza)
+  Tabula: con jpype instalado (pip install jpype1) usa una sola JVM por proceso;
+  sin él, cada lectura lanza `java` aparte (ver tabula_backend()).
 
 Salida (JSON):
 {
@@ -21,18 +30,30 @@ Salida (JSON):
     { nombre: "DESARROLLO WEB", materias: [{codigo, nombre, creditos?}] }, ...
   ],
   warnings: [...],
-  debug?: { extractor, frames_detected, row_text_examples: [...] }
+  debug?: { extractor, extractor_modes, text_pages, page_groups, quality, attempts, frames_detected, row_text_examples: [...] }
 }
 """
 try:
     from pdfminer.high_level import extract_text as pdfminer_extract_text
+    from pdfminer.layout import LAParams
 except Exception:
-    pdfminer_extract_text = None
+    pdfminer_extract_text = LAParams = None
 
-import sys, json, re
+import os, sys, json, re, inspect, functools, importlib.util
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+from parse_cache import cached_parse, code_fingerprint
+from parse_profile import NO_PROFILE, profiled_parse
+from page_parallel import (DEFAULT_MIN_PAGES, count_pages, page_ranges, pages_spec,
+                           parallel_jobs, parallel_min_pages, run_ranges)
+from memory_budget import UNBOUNDED, MemoryBudget, budget_from_args, page_chunks
+from plan_codes import normalize_code, normalize_tipo
+
+# Súbelo cuando cambie el formato de salida (la huella del código ya invalida la caché)
+PARSER_VERSION = "1"
+
 # ---- Dependencias opcionales (no truenan si no están) ----
 try:
     import tabula
@@ -68,49 +89,84 @@ def to_int_strict(s, default=None):
         return default
 
 
-def normalize_code(raw: str) -> str:
+def read_page_texts(path: Path, pages: list[int] | None = None) -> list[str]:
     """
-    '4110.0' -> '04110', '121.0' -> '00121', '6881.0' -> '06881'
-    Si ya trae 5+ dígitos, no padear.
+    Texto por página: intenta primero pdfminer (mejor layout), luego PyPDF2.
+    `pages`: índices 0-based en orden ascendente (None = todas).
     """
-    if raw is None:
-        return ""
-    m = re.match(r"^\s*(\d+)(?:\.0)?\s*$", str(raw))
-    if not m:
-        # A veces viene pegado con texto; intenta extraer primer bloque dígitos
-        mm = re.search(r"\b(\d{2,6})\b", str(raw))
-        if not mm:
-            return ""
-        num = mm.group(1)
-    else:
-        num = m.group(1)
-    if len(num) < 5:
-        num = num.zfill(5)
-    return num
-
-
-def read_text_basic(path: Path) -> str:
-    """Texto crudo: intenta primero pdfminer (mejor layout), luego PyPDF2."""
     # 1) pdfminer (si está disponible)
     if pdfminer_extract_text:
         try:
-            t = pdfminer_extract_text(str(path)) or ""
+            t = pdfminer_extract_text(str(path), page_numbers=pages) or ""
             if t.strip():
-                return t
+                return t.split("\f")[:-1]  # pdfminer cierra cada página con \f
         except Exception:
             pass
     # 2) PyPDF2 como respaldo
-    text = ""
     if not PdfReader:
-        return text
+        return []
     try:
         reader = PdfReader(str(path))
-        for p in reader.pages:
-            t = p.extract_text() or ""
-            text += t + "\n"
+        idx = range(len(reader.pages)) if pages is None else pages
+        return [(reader.pages[i].extract_text() or "") + "\n" for i in idx]
     except Exception:
-        pass
-    return text
+        return []
+
+
+def join_pages(page_texts: list[str | None]) -> str:
+    """Texto de las páginas leídas, cada una terminada en form feed (como pdfminer)."""
+    return "".join(t + "\f" for t in page_texts if t is not None)
+
+
+def read_text_basic(path: Path) -> str:
+    """Texto crudo de todo el documento. Cada página termina en form feed."""
+    return join_pages(read_page_texts(path))
+
+
+# Clasificación y datos del plan solo necesitan encabezados (se repiten en cada
+# hoja) y la última hoja (acentuaciones). Se lee un presupuesto de páginas y se
+# amplía a todo el documento solo si con eso no alcanza (ver parse_plan()).
+TEXT_PAGES_DEFAULT = 3  # las primeras N-1 hojas + la última; 0 = documento completo
+
+
+def parse_text_pages_arg(argv) -> int:
+    """Lee --text-pages=N (o PLAN_TEXT_PAGES): presupuesto de hojas para el texto base."""
+    raw = next((a.split("=", 1)[1] for a in argv if a.startswith("--text-pages=")), None) \
+        or os.environ.get("PLAN_TEXT_PAGES")
+    return to_int_strict(raw, TEXT_PAGES_DEFAULT) if raw is not None else TEXT_PAGES_DEFAULT
+
+
+def read_text_budget(path: Path, budget: int) -> list[str | None]:
+    """
+    Texto por página leyendo a lo más `budget` hojas: las primeras budget-1 y la
+    última. Las no leídas quedan en None. Con budget <= 0 o un documento que ya
+    cabe en el presupuesto se lee todo.
+    """
+    n_pages = count_pages(path) if budget > 0 else None
+    if not n_pages or n_pages <= budget:
+        return list(read_page_texts(path))
+    pages = list(range(budget - 1)) + [n_pages - 1]
+    texts = read_page_texts(path, pages)
+    if len(texts) != len(pages):
+        return list(read_page_texts(path))  # no se pudo alinear: documento completo
+    out: list[str | None] = [None] * n_pages
+    for i, t in zip(pages, texts):
+        out[i] = t
+    return out
+
+
+def widen_text(path: Path, page_texts: list[str | None]) -> list[str | None]:
+    """Completa las páginas que read_text_budget() dejó sin leer."""
+    missing = [i for i, t in enumerate(page_texts) if t is None]
+    if not missing:
+        return page_texts
+    texts = read_page_texts(path, missing)
+    if len(texts) != len(missing):
+        return list(read_page_texts(path))
+    out = list(page_texts)
+    for i, t in zip(missing, texts):
+        out[i] = t
+    return out
 
 
 
@@ -149,87 +205,452 @@ def detect_origen(text: str) -> str:
     return "DESCONOCIDO"
 
 
+# ----------------- Pre-escaneo por página -----------------
+# Señales baratas sobre el texto que ya se leyó: qué páginas traen la tabla de
+# materias y cuáles las acentuaciones. Tabula/Camelot corren solo sobre esas
+# páginas (portadas y hojas sin tabla se saltan) y los frames de la hoja de
+# acentuaciones llegan marcados a su parser en lugar de adivinarse por columnas.
+ACENT_TITLE = "MATERIAS QUE CONFORMAN LAS ACENTUACIONES"
+PAGE_CODE_RE = re.compile(r"^\s*\d{3,6}(?:\.0)?\b", re.M)           # clave al inicio de renglón
+PAGE_HEADER_RE = re.compile(r"\bCLAVE\b[\s\S]*?\bMATERIA\b|\bMATERIA\b[\s\S]*?\bCLAVE\b", re.I)
+MALLA_HEADER_RE = re.compile(r"\bHORAS\s+(?:TEO|LAB)\.|\bTIPO\b", re.I)  # la hoja de acentuaciones no los trae
+MIN_PAGE_CODES = 3
+
+
+def scan_pages(page_texts: list[str | None]) -> list[str | None] | None:
+    """
+    Clasifica cada página (texto de read_text_budget(); None = no leída):
+    - "malla": tabla de materias (encabezado Clave/Materia o varias claves al inicio de renglón);
+    - "acent": la hoja con "MATERIAS QUE CONFORMAN LAS ACENTUACIONES" y las siguientes
+      con claves pero sin encabezado de malla;
+    - "mixta": malla y acentuaciones en la misma hoja (ahí se sigue adivinando por columnas);
+    - "sin_texto": no leída y después de las acentuaciones (se lee sin marcar); una no
+      leída antes de la hoja de acentuaciones cuenta como "malla";
+    - None: sin tabla.
+    Devuelve None si no hay texto o ninguna página trae tabla.
+    """
+    acent_at = next((i for i, page in enumerate(page_texts) if page is not None and ACENT_TITLE in page.upper()),
+                    len(page_texts))
+    kinds: list[str | None] = []
+    in_acent = False
+    for i, page in enumerate(page_texts):
+        if page is None:
+            kinds.append("malla" if i < acent_at else "sin_texto")
+            continue
+        codes = len(PAGE_CODE_RE.findall(page))
+        has_table = codes >= MIN_PAGE_CODES or (codes > 0 and PAGE_HEADER_RE.search(page) is not None)
+        has_malla = MALLA_HEADER_RE.search(page) is not None
+        if ACENT_TITLE in page.upper():
+            in_acent = True
+            kinds.append("mixta" if has_malla else "acent")
+        elif not has_table:
+            kinds.append(None)
+        elif in_acent and not has_malla:
+            kinds.append("acent")
+        else:
+            kinds.append("malla")
+    return kinds if any(kinds) else None
+
+
+def page_groups(kinds: list[str | None] | None, route_acent: bool) -> list[tuple[str | None, list[int]]] | None:
+    """
+    Agrupa las páginas con tabla (1-based) en tramos consecutivos de la misma
+    sección, en orden de página: [("malla", [1, 2]), ("acent", [4])].
+    Sin route_acent (portal de alumnos) todo va en un solo grupo sin sección.
+    None = leer todo el documento (sin pre-escaneo).
+    """
+    if not kinds:
+        return None
+    groups: list[tuple[str | None, list[int]]] = []
+    for page, kind in enumerate(kinds, start=1):
+        if kind is None:
+            continue
+        seccion = kind if route_acent and kind in ("malla", "acent") else None
+        if groups and groups[-1][0] == seccion:
+            groups[-1][1].append(page)
+        else:
+            groups.append((seccion, [page]))
+    return groups
+
+
+# ----------------- Limpieza de frames (vectorizada) -----------------
+def clean_cells(cells: np.ndarray) -> np.ndarray:
+    """
+    norm() + "nan"/vacío/NaN -> "" sobre una matriz de celdas convertidas a str
+    (con pandas 3, astype(str) deja los NaN como NaN). Se limpia cada valor distinto una sola vez (encabezados, tipos, créditos y
+    celdas vacías se repiten muchísimo) y se reconstruye la matriz por índice.
+    """
+    codes, uniques = pd.factorize(cells.ravel(), use_na_sentinel=False)
+    u = pd.Series(uniques, dtype=object)
+    cleaned = (u.str.replace("\xa0", " ", regex=False)
+                .str.replace("\u200b", "", regex=False)
+                .str.replace("\ufeff", "", regex=False)
+                .str.strip())
+    cleaned = cleaned.where(u.notna() & (u != "") & (u.str.lower() != "nan"), "")
+    return cleaned.to_numpy(dtype=object)[codes].reshape(cells.shape)
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Mismo resultado que astype(str).map(norm...) columna por columna, en una pasada."""
+    raw = df.astype(str).to_numpy(dtype=object)
+    return pd.DataFrame(clean_cells(raw), index=df.index, columns=df.columns, dtype=object)
+
+
+def stack_frames(frames) -> pd.DataFrame:
+    """
+    Todos los frames en uno solo, limpio, con columnas posicionales 0..N-1
+    (los más angostos se rellenan con "") y la columna "frame" con el índice
+    del frame de origen. En attrs quedan "headers" (encabezados normalizados
+    de cada frame) y "widths" (su número de columnas).
+    """
+    width = max((df.shape[1] for df in frames), default=0)
+    blocks, ids = [], []
+    for k, df in enumerate(frames):
+        raw = np.full((len(df), width), "", dtype=object)
+        raw[:, :df.shape[1]] = df.astype(str).to_numpy(dtype=object)
+        blocks.append(raw)
+        ids.append(np.full(len(df), k))
+    cells = clean_cells(np.vstack(blocks)) if blocks else np.empty((0, width), dtype=object)
+    stack = pd.DataFrame(cells, dtype=object)
+    stack.insert(0, "frame", np.concatenate(ids) if ids else np.empty(0, dtype=int))
+    stack.attrs["headers"] = [[norm(str(c).upper()) for c in df.columns] for df in frames]
+    stack.attrs["widths"] = [df.shape[1] for df in frames]
+    return stack
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Frame ya limpio reducido a lo que usan los parsers: celdas internadas (encabezados,
+    tipos y créditos repetidos quedan una sola vez en memoria), índice por rango y attrs.
+    """
+    cells = [sys.intern(c) if isinstance(c, str) else c for c in df.to_numpy(dtype=object).ravel().tolist()]
+    out = pd.DataFrame(np.array(cells, dtype=object).reshape(df.shape), columns=df.columns, dtype=object)
+    out.attrs.update(df.attrs)
+    return out
+
+
+def frame_rows(stack: pd.DataFrame) -> list[list]:
+    """Filas de cada frame de stack_frames() como listas de celdas (sin Series por fila)."""
+    cells = stack.drop(columns="frame").to_numpy(dtype=object).tolist()
+    ids = stack["frame"].to_numpy()
+    out: list[list] = [[] for _ in stack.attrs["widths"]]
+    for k, row in zip(ids.tolist(), cells):
+        out[k].append(row[:stack.attrs["widths"][k]])
+    return out
+
+
 # ----------------- Extracción de tablas -----------------
-def try_tabula_frames(path: Path):
-    """Intenta Tabula en lattice y stream; devuelve lista de DataFrames normalizados."""
-    frames = []
+def _fix_tabula_cols(df: pd.DataFrame) -> pd.DataFrame:
+    # Normaliza valores -> string y limpia nan
+    df2 = clean_frame(df)
+    # Si headers "Unnamed" o vacíos: usar primera fila como encabezado real
+    has_unnamed = any(str(c).lower().startswith("unnamed") for c in df2.columns)
+    empty_headers = any(not str(c).strip() for c in df2.columns)
+    if (has_unnamed or empty_headers) and len(df2) > 0:
+        new_cols = [str(x).strip().upper() for x in list(df2.iloc[0])]
+        if any(new_cols):
+            df2 = df2.iloc[1:].reset_index(drop=True)
+            df2.columns = new_cols
+    else:
+        df2.columns = [str(c).strip().upper() for c in df2.columns]
+    return df2
+
+
+# Con jpype (tabula-py >= 2.8) la JVM vive dentro del proceso: arranca en la
+# primera lectura y se reutiliza para ambos modos y todos los documentos (en
+# modo --worker, durante toda la vida del worker). Sin jpype, tabula-py lanza
+# un `java -jar` por llamada.
+TABULA_MODES = {
+    "lattice": {"lattice": True, "stream": False, "guess": False},
+    "stream": {"lattice": False, "stream": True, "guess": True},
+}
+
+
+@functools.lru_cache(maxsize=None)
+def tabula_backend() -> str | None:
+    """'jpype' (una JVM por proceso), 'subprocess' (una JVM por llamada) o None sin Tabula."""
     if not tabula:
-        return frames
+        return None
+    if "force_subprocess" in inspect.signature(tabula.read_pdf).parameters \
+            and importlib.util.find_spec("jpype") is not None:
+        return "jpype"
+    return "subprocess"
 
-    def _fix_cols(df: pd.DataFrame) -> pd.DataFrame:
-        df2 = df.copy()
-        # Normaliza valores -> string y limpia nan
-        for c in df2.columns:
-            df2[c] = df2[c].astype(str).map(lambda x: norm(x) if x and x.lower() != "nan" else "")
-        # Si headers "Unnamed" o vacíos: usar primera fila como encabezado real
-        has_unnamed = any(str(c).lower().startswith("unnamed") for c in df2.columns)
-        empty_headers = any(not str(c).strip() for c in df2.columns)
-        if (has_unnamed or empty_headers) and len(df2) > 0:
-            new_cols = [str(x).strip().upper() for x in list(df2.iloc[0])]
-            if any(new_cols):
-                df2 = df2.iloc[1:].reset_index(drop=True)
-                df2.columns = new_cols
-        else:
-            df2.columns = [str(c).strip().upper() for c in df2.columns]
-        return df2
 
-    # 1) LATTICE
-    try:
-        dfs_lattice = tabula.read_pdf(
-            str(path), pages="all", multiple_tables=True, lattice=True, stream=False, guess=False
-        )
-        for df in dfs_lattice or []:
-            frames.append(_fix_cols(df))
-    except Exception:
-        pass
+def read_tabula(path_str: str, pages: str = "all", modes=("lattice", "stream"), prof=NO_PROFILE) -> dict:
+    """
+    Lee las mismas páginas en varios modos con la misma sesión de JVM.
+    Devuelve {modo: [frames normalizados]}; un modo que falla queda en [].
+    """
+    extra = {"force_subprocess": False} if tabula_backend() == "jpype" else {}
+    out = {}
+    for mode in modes:
+        frames = []
+        try:
+            with prof.stage(f"tabula_{mode}"):
+                dfs = tabula.read_pdf(path_str, pages=pages, multiple_tables=True, **TABULA_MODES[mode], **extra)
+            for df in dfs or []:
+                frames.append(_fix_tabula_cols(df))
+        except Exception:
+            pass
+        out[mode] = frames
+    return out
+
 
-    # 2) STREAM
+def _tabula_read(path_str: str, pages: str, mode: str) -> list:
+    """Frames normalizados de Tabula en un modo ("lattice" | "stream"); [] si falla."""
+    return read_tabula(path_str, pages, (mode,))[mode]
+
+
+def _camelot_df(t) -> pd.DataFrame:
+    df = t.df.copy()
+    # primera fila como header
+    df.columns = [str(c).strip() for c in df.iloc[0]]
+    df = df.iloc[1:].copy().reset_index(drop=True)
+    df.columns = [str(c).strip().upper() for c in df.columns]
+    return clean_frame(df)
+
+
+def _camelot_read(path_str: str, pages: str, flavor: str) -> list:
+    """Frames normalizados de Camelot en un flavor ("lattice" | "stream"); [] si falla."""
     try:
-        dfs_stream = tabula.read_pdf(
-            str(path), pages="all", multiple_tables=True, lattice=False, stream=True, guess=True
-        )
-        for df in dfs_stream or []:
-            frames.append(_fix_cols(df))
+        tables = camelot.read_pdf(path_str, pages=pages, flavor=flavor)
+        return [_camelot_df(t) for t in tables]
     except Exception:
-        pass
+        return []
 
-    return frames
 
+def _frames_by_pages(read, path: Path, modes: tuple, jobs: int, min_pages: int, prof, stage: str,
+                     pages: list[int] | None = None):
+    """
+    Con jobs > 1 y suficientes páginas, reparte cada modo por rangos de páginas
+    entre procesos. El orden es el del camino serial: todos los frames del 1er
+    modo (en orden de página) y luego los del 2o. None si no conviene/no se pudo.
+    `pages`: solo esas páginas (1-based); None = todas.
+    """
+    if jobs <= 1:
+        return None
+    if pages is None:
+        n_pages = count_pages(path)
+        pages = list(range(1, n_pages + 1)) if n_pages else []
+    if len(pages) < max(min_pages, 2):
+        return None
+    calls = [(str(path), pages_spec(pages[a:b]), mode) for mode in modes for a, b in page_ranges(0, len(pages), jobs)]
+    with prof.stage(stage):
+        chunks = run_ranges(jobs, read, calls)
+    return None if chunks is None else [df for chunk in chunks for df in chunk]
+
+
+def try_tabula_frames(path: Path, prof=NO_PROFILE, jobs: int = 1, min_pages: int = DEFAULT_MIN_PAGES,
+                      modes=("lattice", "stream"), pages: list[int] | None = None):
+    """
+    Intenta Tabula en los modos dados (lattice y stream); devuelve lista de DataFrames normalizados.
+    `pages`: solo esas páginas (1-based); None = todas.
+    """
+    if not tabula:
+        return []
+    frames = _frames_by_pages(_tabula_read, path, modes, jobs, min_pages, prof, "tabula_parallel", pages)
+    if frames is not None:
+        return frames
 
-def try_camelot_frames(path: Path):
-    """Camelot como respaldo (si está disponible)."""
-    frames = []
+    # 1) LATTICE, 2) STREAM (misma JVM)
+    by_mode = read_tabula(str(path), pages_spec(pages) if pages else "all", modes, prof)
+    return [df for mode in modes for df in by_mode[mode]]
+
+
+def try_camelot_frames(path: Path, prof=NO_PROFILE, jobs: int = 1, min_pages: int = DEFAULT_MIN_PAGES,
+                       modes=("lattice", "stream"), pages: list[int] | None = None):
+    """Camelot como respaldo (si está disponible). `pages` como en try_tabula_frames()."""
     if not camelot:
+        return []
+    frames = _frames_by_pages(_camelot_read, path, modes, jobs, min_pages, prof, "camelot_parallel", pages)
+    if frames is not None:
         return frames
 
-    def _df_from_table(t):
-        df = t.df.copy()
-        # primera fila como header
-        df.columns = [str(c).strip() for c in df.iloc[0]]
-        df = df.iloc[1:].copy().reset_index(drop=True)
-        df.columns = [str(c).strip().upper() for c in df.columns]
-        for c in df.columns:
-            df[c] = df[c].astype(str).map(lambda x: norm(x) if x and x.lower() != "nan" else "")
-        return df
+    frames = []
+    for flavor in modes:
+        with prof.stage(f"camelot_{flavor}"):
+            frames += _camelot_read(str(path), pages_spec(pages) if pages else "all", flavor)
+    return frames
 
-    try:
-        tables = camelot.read_pdf(str(path), pages="all", flavor="lattice")
-        frames += [_df_from_table(t) for t in tables]
-    except Exception:
-        pass
-    try:
-        tables = camelot.read_pdf(str(path), pages="all", flavor="stream")
-        frames += [_df_from_table(t) for t in tables]
-    except Exception:
-        pass
+
+def read_page_groups(reader, path: Path, groups, prof, jobs: int, min_pages: int, modes: tuple,
+                     budget: MemoryBudget = UNBOUNDED) -> list:
+    """
+    Corre `reader` (try_tabula_frames / try_camelot_frames) sobre cada grupo de
+    page_groups() y marca sus frames con attrs["seccion"] ("malla" | "acent").
+    Sin grupos lee el documento completo, como antes.
+    Con presupuesto de memoria se lee por bloques (read_chunked()).
+    """
+    if budget.enabled:
+        return read_chunked(reader, path, groups, prof, min_pages, modes, budget)
+    if not groups:
+        return reader(path, prof, jobs, min_pages, modes)
+    frames = []
+    for seccion, pages in groups:
+        for df in reader(path, prof, jobs, min_pages, modes, pages):
+            if seccion:
+                df.attrs["seccion"] = seccion
+            frames.append(df)
     return frames
 
 
+def read_chunked(reader, path: Path, groups, prof, min_pages: int, modes: tuple, budget: MemoryBudget) -> list:
+    """
+    Memoria acotada (ver memory_budget.py): cada grupo se lee en serie, en bloques
+    de páginas y en el mismo orden que la lectura completa (modo por modo, página
+    por página), así de Tabula/Camelot solo vive un bloque a la vez. Con el
+    presupuesto activo cada frame se compacta en cuanto sale.
+    """
+    if not groups:
+        n_pages = count_pages(path)
+        if not n_pages:
+            return read_page_groups(reader, path, groups, prof, 1, min_pages, modes)
+        groups = [(None, list(range(1, n_pages + 1)))]
+    frames = []
+    for seccion, pages in groups:
+        for mode in modes:
+            for chunk in page_chunks(pages):
+                for df in reader(path, prof, 1, min_pages, (mode,), chunk):
+                    if budget.tight():
+                        df = compact_frame(df)
+                    if seccion:
+                        df.attrs["seccion"] = seccion
+                    frames.append(df)
+    return frames
+
+
+# ----------------- Escalamiento de extractores -----------------
+# Del más barato al más caro. Cada paso se suma a los frames ya leídos con el
+# mismo extractor (lattice + stream, como siempre) y se detiene en cuanto la
+# calidad alcanza; si ninguno alcanza se queda el de mejor calificación.
+EXTRACTION_STEPS = [("tabula", "lattice"), ("tabula", "stream"), ("camelot", "lattice"), ("camelot", "stream")]
+MIN_ROWS_OK = 5        # materias válidas mínimas para dar por buena una extracción
+COVERAGE_OK = 0.9      # créditos extraídos / total de créditos del plan (parse_plan_info)
+
+
+def score_extraction(materias, acentuaciones, total: int, acent_expected: bool) -> dict:
+    """
+    Calidad de una extracción:
+    - rows: materias con (codigo, nombre, creditos) válidos;
+    - coverage: suma de sus créditos contra el total del texto (None si el texto no lo trae);
+    - acentuaciones / acent_ok: cuántas salieron y si hay las que el texto anuncia;
+    - good: suficientes filas, cobertura y acentuaciones si el texto las anuncia.
+    """
+    creditos = sum(m["creditos"] for m in materias)
+    coverage = round(min(creditos / total, 1.0), 3) if total else None
+    acent_ok = bool(acentuaciones) or not acent_expected
+    good = len(materias) >= MIN_ROWS_OK \
+        and (coverage is None or coverage >= COVERAGE_OK) \
+        and acent_ok
+    return {"rows": len(materias), "creditos": creditos, "coverage": coverage,
+            "acentuaciones": len(acentuaciones), "acent_ok": acent_ok, "good": good}
+
+
+def _score_key(score: dict) -> tuple:
+    # Sin ninguna "good", la que trae las acentuaciones anunciadas gana aunque
+    # empate en cobertura (lattice suele dar solo la malla)
+    return (score["good"], score["acent_ok"], score["coverage"] or 0.0, score["rows"], score["acentuaciones"])
+
+
+def _acent_score(parsed) -> dict:
+    """Calidad de la sección de acentuaciones: cuántas y con cuántas materias."""
+    acents = parsed[1]
+    rows = sum(len(a.get("materias") or []) for a in acents)
+    return {"rows": rows, "creditos": 0, "coverage": None, "acentuaciones": len(acents),
+            "acent_ok": bool(acents), "good": bool(acents) and rows >= MIN_ROWS_OK}
+
+
+def extract_with_escalation(path: Path, parse, total: int, acent_expected: bool, prof=NO_PROFILE,
+                            jobs: int = 1, min_pages: int = DEFAULT_MIN_PAGES, groups=None,
+                            budget: MemoryBudget = UNBOUNDED, seed: dict | None = None) -> dict:
+    """
+    Recorre EXTRACTION_STEPS; `parse(frames)` devuelve (materias, acentuaciones, debug_rows).
+    `groups` (page_groups()) limita la lectura a las páginas con tabla. Si trae
+    malla y acentuaciones, cada sección se escala y califica por separado (lattice
+    suele leer bien la malla y nada de la hoja de acentuaciones) y se juntan los
+    mejores frames de cada una en una sola extracción.
+    `budget`: memoria acotada (read_chunked()).
+    `seed`: candidata previa (p.ej. la de solo texto) que compite con la misma
+    calificación; en empate se queda ella.
+    Devuelve la mejor extracción: extractor, modos, frames, resultado, calificación e intentos.
+    """
+    def score_all(parsed):
+        return score_extraction(parsed[0], parsed[1], total, acent_expected)
+
+    if not groups or not {"malla", "acent"} <= {sec for sec, _ in groups}:
+        return _escalate(path, parse, score_all, prof, jobs, min_pages, groups, budget, seed)
+
+    malla = _escalate(path, parse, lambda parsed: score_extraction(parsed[0], [], total, False), prof, jobs,
+                      min_pages, [g for g in groups if g[0] != "acent"], budget)
+    acent = _escalate(path, parse, _acent_score, prof, jobs, min_pages,
+                      [g for g in groups if g[0] == "acent"], budget)
+    frames = malla["frames"] + acent["frames"]
+    parsed = parse(list(frames))
+    extractors = list(dict.fromkeys(s["extractor"] for s in (malla, acent) if s["frames"])) or [malla["extractor"]]
+    merged = {
+        "extractor": "+".join(extractors),
+        "modes": list(dict.fromkeys(malla["modes"] + acent["modes"])),
+        "frames": frames,
+        "parsed": parsed,
+        "score": score_all(parsed),
+        "attempts": [{"seccion": "malla", **a} for a in malla["attempts"]]
+                    + [{"seccion": "acent", **a} for a in acent["attempts"]],
+    }
+    if seed is not None and _score_key(seed["score"]) >= _score_key(merged["score"]):
+        return {**seed, "attempts": merged["attempts"]}
+    return merged
+
+
+def _escalate(path: Path, parse, score_of, prof, jobs: int, min_pages: int, groups, budget: MemoryBudget,
+              seed: dict | None = None) -> dict:
+    """Un recorrido de EXTRACTION_STEPS sobre `groups`, calificado con `score_of(parsed)`."""
+    readers = {"tabula": (tabula, try_tabula_frames), "camelot": (camelot, try_camelot_frames)}
+    by_extractor: dict[str, list] = {}
+    read_modes: dict[str, list] = {}
+    best, attempts = seed, []
+    extractor = "tabula"
+    for extractor, mode in EXTRACTION_STEPS:
+        lib, reader = readers[extractor]
+        if not lib:
+            continue
+        new = prof.call(f"try_{extractor}_frames", read_page_groups, reader, path, groups, prof, jobs, min_pages,
+                        (mode,), budget)
+        frames = by_extractor.setdefault(extractor, [])
+        frames += new
+        read_modes.setdefault(extractor, []).append(mode)
+        if not new:
+            attempts.append({"extractor": extractor, "mode": mode, "frames": len(frames), "skipped": "sin frames nuevos"})
+            continue
+        parsed = parse(list(frames))
+        score = score_of(parsed)
+        attempts.append({"extractor": extractor, "mode": mode, "frames": len(frames), **score})
+        if best is None or _score_key(score) > _score_key(best["score"]):
+            best = {"extractor": extractor, "modes": list(read_modes[extractor]), "frames": list(frames), "parsed": parsed, "score": score}
+        if score["good"]:
+            break
+
+    if best is None:
+        parsed = parse([])
+        best = {"extractor": extractor, "modes": [], "frames": [], "parsed": parsed, "score": score_of(parsed)}
+    best["attempts"] = attempts
+    return best
+
+
 # -------------- Parsers (Alumno vs Oficial) --------------
 COD_RE = re.compile(r"\b\d{2,6}\b")
 TIPO_RE = re.compile(r"^(OBL|OPT|ELE|SEL|\*?OBL|\*?OPT)$", re.I)
 
-MAX_CONT_LINES = int((next((a.split("=")[1] for a in sys.argv[1:] if a.startswith("--cont=")), "2")))
+def parse_cont_arg(argv, default: int = 2) -> int:
+    """Lee --cont=N (líneas de continuación permitidas para nombres partidos)."""
+    raw = next((a.split("=")[1] for a in argv if a.startswith("--cont=")), None)
+    return to_int_strict(raw, default) if raw is not None else default
+
+
+MAX_CONT_LINES = parse_cont_arg(sys.argv[1:])
+
+
+UNNAMED_RE = re.compile(r"Unnamed:\s*\d+", re.I)
 
 
 def is_small_credit(s) -> bool:
@@ -237,28 +658,83 @@ def is_small_credit(s) -> bool:
     return v is not None and 1 <= v <= 30
 
 
-def parse_frames_portal_alumno(frames, want_debug=False):
+# ---- Tokenizador de renglones (compartido por los parsers de frames) ----
+# Un solo finditer por renglón. Cada dígito cae en un token "code" (lo mismo que
+# \b\d+(?:\.0)?\b) o "num" (dígitos pegados a letras); el primer OBL/OPT/ELE/SEL
+# y las letras se marcan al pasar. Las máquinas de estados consultan el registro
+# en lugar de volver a buscar con regex sobre el mismo renglón.
+LINE_TOKEN_RE = re.compile(
+    r"(?P<code>\b\d+(?:\.0)?\b)"
+    r"|(?P<num>\d+)"
+    r"|(?P<tipo>\b(?i:OBL|OPT|ELE|SEL)\b)"
+    r"|(?P<word>[A-Za-zÁÉÍÓÚÑáéíóúñ](?:[A-Za-zÁÉÍÓÚÑáéíóúñ]|\s(?!(?i:OBL|OPT|ELE|SEL)\b))*)"  # palabras y espacios de un tirón
+)
+
+
+class LineTokens:
+    """Renglón escaneado una vez: spans de números, del primer tipo y si trae letras."""
+    __slots__ = ("line", "nums", "tipo", "has_letters")
+
+    def __init__(self, line: str):
+        nums: list[tuple[int, int, bool]] = []  # (inicio, fin, es_code) en orden
+        tipo, letters = None, False
+        for m in LINE_TOKEN_RE.finditer(line):
+            g = m.lastindex  # 1 code, 2 num, 3 tipo, 4 word
+            if g <= 2:
+                a, b = m.span()
+                nums.append((a, b, g == 1))
+            else:
+                letters = True
+                if g == 3 and tipo is None:
+                    tipo = m.span()
+        self.line, self.nums, self.tipo, self.has_letters = line, nums, tipo, letters
+
+    def text(self, span: tuple[int, int]) -> str:
+        return self.line[span[0]:span[1]]
+
+    def first_code(self) -> tuple[int, int] | None:
+        """Primer \\b\\d+(?:\\.0)?\\b (con el .0 incluido)."""
+        return next(((a, b) for a, b, code in self.nums if code), None)
+
+    def clave(self) -> tuple[int, int] | None:
+        """Primer \\b\\d{2,6}\\b: la parte entera de un code de 2 a 6 dígitos."""
+        for a, b, code in self.nums:
+            if code:
+                dot = self.line.find(".", a, b)
+                end = b if dot < 0 else dot
+                if 2 <= end - a <= 6:
+                    return a, end
+        return None
+
+    def num_after(self, pos: int) -> tuple[int, int] | None:
+        """Primer número que empieza en `pos` o después."""
+        return next(((a, b) for a, b, _ in self.nums if a >= pos), None)
+
+    def last_run(self) -> tuple[int, int] | None:
+        """Última corrida de dígitos del renglón (en "4110.0" es el "0")."""
+        if not self.nums:
+            return None
+        a, b, _ = self.nums[-1]
+        dot = self.line.rfind(".", a, b)
+        return (a if dot < 0 else dot + 1), b
+
+
+def parse_frames_portal_alumno(frames, want_debug=False, max_cont=None):
     """
     Reusa la máquina de estados previa (pegado de líneas) porque los PDFs
     del portal de alumnos suelen venir con filas fragmentadas.
     """
-    # 1) Aplanar en líneas limpias
+    # 1) Aplanar en líneas limpias (todas las filas de todos los frames, en orden)
     lines = []
     debug_rows = []
-    for df in frames:
-        if df.empty:
-            continue
-        df = df.loc[~(df == "").all(axis=1)]
-        if df.empty:
-            continue
-        for _, row in df.iterrows():
-            toks = [norm(str(row.iloc[j])) for j in range(df.shape[1])]
-            toks = [t for t in toks if t and not re.fullmatch(r"Unnamed:\s*\d+", t, re.I)]
-            line = re.sub(r"\s{2,}", " ", " ".join(toks)).strip()
-            if line:
-                lines.append(line)
-                if want_debug and len(debug_rows) < 12:
-                    debug_rows.append(line)
+    stack = stack_frames(frames)
+    for row in stack.drop(columns="frame").to_numpy(dtype=object).tolist():
+        toks = [t for t in row if t and not UNNAMED_RE.fullmatch(t)]
+        line = re.sub(r"\s{2,}", " ", " ".join(toks)).strip()
+        if line:
+            lines.append(line)
+            if want_debug and len(debug_rows) < 12:
+                debug_rows.append(line)
 
     materias = []
     pre_name_buffer: list[str] = []
@@ -267,21 +743,23 @@ def parse_frames_portal_alumno(frames, want_debug=False):
     def has_letters(s: str) -> bool:
         return re.search(r"[A-Za-zÁÉÍÓÚÑáéíóúñ]", s) is not None
 
+    # Cada línea se escanea una sola vez (también cuando se mira como continuación)
+    tokens = [LineTokens(line) for line in lines]
+
     while i < len(lines):
-        line = lines[i]
+        line, tk = lines[i], tokens[i]
 
-        m_code = re.search(r"\b\d+(?:\.0)?\b", line)
+        m_code = tk.first_code()
         code_token = None
         if m_code:
-            digits = re.sub(r"\D", "", m_code.group(0))
-            if 2 <= len(digits) <= 6:
-                code_token = m_code.group(0)
+            if 2 <= len(tk.text(m_code).replace(".", "")) <= 6:
+                code_token = tk.text(m_code)
 
-        m_type = re.search(r"\b(OBL|OPT|ELE|SEL)\b", line, re.I)
-        type_token = m_type.group(1).upper() if m_type else None
+        m_type = tk.tipo
+        type_token = tk.text(m_type).upper() if m_type else None
 
         # Solo texto → acumula como pre-nombre
-        if not code_token and not type_token and has_letters(line):
+        if not code_token and not type_token and tk.has_letters:
             pre_name_buffer.append(line)
             i += 1
             continue
@@ -290,8 +768,8 @@ def parse_frames_portal_alumno(frames, want_debug=False):
             codigo = normalize_code(code_token)
 
             # ----- nombre inline (entre código y tipo; o después del código si no hay tipo)
-            end_code_pos = m_code.end()
-            inline_segment = line[end_code_pos:m_type.start()] if m_type else line[end_code_pos:]
+            end_code_pos = m_code[1]
+            inline_segment = line[end_code_pos:m_type[0]] if m_type else line[end_code_pos:]
             inline_name = norm(inline_segment)
             use_inline = has_letters(inline_name) and len(inline_name) >= 4
 
@@ -301,13 +779,12 @@ def parse_frames_portal_alumno(frames, want_debug=False):
             # ---- créditos
             creditos = None
             if tipo:
-                m_num_after = re.search(r"\d+(?:\.\d+)?", line[m_type.end():])
+                m_num_after = tk.num_after(m_type[1])
                 if m_num_after:
-                    creditos = to_int_strict(m_num_after.group(0), None)
+                    creditos = to_int_strict(tk.text(m_num_after), None)
             if creditos is None:
-                m_any = re.search(r"\d+(?:\.\d+)?", line)
-                if m_any:
-                    cand = to_int_strict(m_any.group(0), None)
+                if tk.nums:
+                    cand = to_int_strict(tk.text(tk.nums[0][:2]), None)
                     if is_small_credit(cand):
                         creditos = cand
 
@@ -323,15 +800,15 @@ def parse_frames_portal_alumno(frames, want_debug=False):
                 if pre_name_buffer:
                     name_parts.extend(pre_name_buffer)
                 pre_used = True
-                take_continuation = MAX_CONT_LINES
+                take_continuation = MAX_CONT_LINES if max_cont is None else max_cont
 
             # continuaciones (solo si NO hubo inline)
             while take_continuation > 0 and (i + 1) < len(lines):
-                nxt = lines[i + 1]
-                nxt_has_code = re.search(r"\b\d+(?:\.0)?\b", nxt) is not None
-                nxt_has_type = re.search(r"\b(OBL|OPT|ELE|SEL)\b", nxt, re.I) is not None
-                if (not nxt_has_code) and (not nxt_has_type) and has_letters(nxt):
-                    name_parts.append(nxt)
+                nxt = tokens[i + 1]
+                nxt_has_code = nxt.first_code() is not None
+                nxt_has_type = nxt.tipo is not None
+                if (not nxt_has_code) and (not nxt_has_type) and nxt.has_letters:
+                    name_parts.append(nxt.line)
                     i += 1  # consume la línea de continuación
                     take_continuation -= 1
                 else:
@@ -353,7 +830,7 @@ def parse_frames_portal_alumno(frames, want_debug=False):
             continue
 
         # línea con tipo pero sin código → ignora; limpia prebuffer si no hay letras
-        if not has_letters(line):
+        if not tk.has_letters:
             pre_name_buffer = []
         i += 1
 
@@ -390,13 +867,6 @@ OFI_COL_MAP = {
 ACENT_TITLE_RE = re.compile(r"^\s*MATERIAS QUE CONFORMAN LAS ACENTUACIONES\s*$", re.I)
 
 
-def normalize_tipo(val: str) -> str:
-    v = (val or "").upper().replace("*", "")
-    if v in ("OPT", "ELE", "SEL"):
-        return "OPT"
-    return "OBL" if v == "OBL" else (v or "OBL")
-
-
 def parse_frames_oficial(frames, text_full: str, want_debug=False):
     """
     Intenta leer tablas por columnas. Algunas páginas se parten en 2 tablas;
@@ -414,10 +884,13 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
     if "MATERIAS QUE CONFORMAN LAS ACENTUACIONES" in (text_full or "").upper():
         acent_mode = True
 
-    # 2) Procesar frames
-    for df in frames:
+    # 2) Procesar frames (limpios de una vez; filas como listas, sin iterrows)
+    stack = stack_frames(frames)
+    rows_by_frame = frame_rows(stack)
+    for k, df in enumerate(frames):
         if df.empty:
             continue
+        rows = rows_by_frame[k]
 
         # Heurística: si el frame parece una tabla de acentuaciones (dos columnas: clave/materia/creditos),
         # la marcamos aparte. Buscamos títulos de bloque como "DESARROLLO WEB", "COMPUTACIÓN MÓVIL", etc.
@@ -428,25 +901,23 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
         looks_acents = ("CLAVE" in header_str and "MATERIA" in header_str and "CRÉDIT" in header_str) \
                        or ("CLAVE" in header_str and "MATERIA" in header_str and "CREDIT" in header_str)
 
-        # También si el DataFrame es de 2-3 columnas y muchas filas de “codigo nombre numero”
-        if acent_mode and (looks_acents or (len(df.columns) in (2, 3))):
+        # También si el DataFrame es de 2-3 columnas y muchas filas de “codigo nombre numero”.
+        # Con pre-escaneo por página (scan_pages) la sección ya viene marcada y no se adivina.
+        seccion = df.attrs.get("seccion")
+        if seccion == "acent" or (seccion is None and acent_mode and (looks_acents or (len(df.columns) in (2, 3)))):
             # Intenta extraer pares (codigo, nombre, creditos?)
             # Primero detecta si hay títulos de acentuación (líneas en MAYÚSCULAS sin código)
-            # Normaliza columnas a texto
-            d = df.copy()
-            d.columns = [norm(str(c).upper()) for c in d.columns]
-            for c in d.columns:
-                d[c] = d[c].astype(str).map(lambda x: norm(x))
-
             # Construcción lineal por filas
-            for _, row in d.iterrows():
-                row_vals = [norm(str(v)) for v in row.tolist()]
+            for row_vals in rows:
                 line = " ".join([v for v in row_vals if v]).strip()
-                if not line:
+                if not line or OFI_PAGE_HEADER_RE.match(line):  # encabezado de hoja, no es acentuación
                     continue
 
+                tk = LineTokens(line)
+                mc = tk.clave()
+
                 # título de acentuación (sin códigos)
-                if not re.search(r"\b\d{2,6}\b", line) and line.isupper() and len(line) <= 40:
+                if not mc and line.isupper() and len(line) <= 40:
                     # Cierra bloque anterior
                     if acent_actual and acent_actual["materias"]:
                         acentuaciones.append(acent_actual)
@@ -455,16 +926,16 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
                     continue
 
                 # buscar código y nombre (+ crédito opcional al final)
-                mc = re.search(r"\b(\d{2,6})\b", line)
                 if mc:
-                    codigo = normalize_code(mc.group(1))
+                    codigo = normalize_code(tk.text(mc))
                     # nombre: quita el código inicial y posible entero al final
                     tail_credit = None
-                    tmp = re.sub(r"^\s*\b\d{2,6}\b\s*", "", line)
-                    m_last_int = re.search(r"(\d+)\s*$", tmp)
-                    if m_last_int:
-                        tail_credit = to_int_strict(m_last_int.group(1), None)
-                        tmp = tmp[:m_last_int.start()].strip()
+                    start = len(line) - len(line[mc[1]:].lstrip()) if mc[0] == 0 else 0
+                    tmp = line[start:]
+                    m_last_int = tk.last_run()
+                    if m_last_int and m_last_int[1] == len(line) and m_last_int[0] >= start:
+                        tail_credit = to_int_strict(tk.text(m_last_int), None)
+                        tmp = line[start:m_last_int[0]].strip()
                     nombre = norm(tmp)
                     if acent_actual is None:
                         acent_actual = {"nombre": "ACENTUACIÓN", "materias": []}
@@ -476,23 +947,20 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
             continue  # no mezclar con materias “normales” de la malla
 
         # Si no es acentuación, parseo de malla normal
-        # 2.1 Normaliza columnas y crea un mapeo flexible
-        df2 = df.copy()
-        df2.columns = [norm(str(c).upper()) for c in df2.columns]
-        for c in df2.columns:
-            df2[c] = df2[c].astype(str).map(lambda x: norm(x) if x and x.lower() != "nan" else "")
+        # 2.1 Mapeo flexible de columnas (por posición) a partir de los encabezados normalizados
+        headers = stack.attrs["headers"][k]
 
         # Intentar encontrar columnas clave por aproximación
-        col_codigo = next((c for c in df2.columns if re.search(r"\bCLAVE\b|\bCVE\b", c)), None)
-        col_nombre = next((c for c in df2.columns if "MATERIA" in c), None)
-        col_tipo   = next((c for c in df2.columns if "TIPO" in c), None)
-        col_cred   = next((c for c in df2.columns if "CRÉDIT" in c or "CREDIT" in c), None)
+        col_codigo = next((i for i, c in enumerate(headers) if re.search(r"\bCLAVE\b|\bCVE\b", c)), None)
+        col_nombre = next((i for i, c in enumerate(headers) if "MATERIA" in c), None)
+        col_tipo   = next((i for i, c in enumerate(headers) if "TIPO" in c), None)
+        col_cred   = next((i for i, c in enumerate(headers) if "CRÉDIT" in c or "CREDIT" in c), None)
 
         # A veces Tabula separa “Clave Materia Tipo Créditos …” en una sola cadena por fila.
-        if not any([col_codigo, col_nombre, col_tipo, col_cred]):
+        if all(c is None for c in (col_codigo, col_nombre, col_tipo, col_cred)):
             # Intento por filas “pegadas”
-            for _, row in df2.iterrows():
-                row_vals = [v for v in row.tolist() if v]
+            for row in rows:
+                row_vals = [v for v in row if v]
                 line = " ".join(row_vals)
                 if want_debug and len(debug_rows) < 12:
                     debug_rows.append(line)
@@ -501,16 +969,15 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
                 if not line or "UNIVERSIDAD DE SONORA" in up or "HOJA : " in up:
                     continue
                 # Patrón: "<codigo> <nombre...> <tipo> <creditos>"
-                m_code = re.search(r"\b(\d{2,6})\b", line)
-                m_tipo = re.search(r"\b(OBL|OPT|ELE|SEL)\b", line, re.I)
-                m_cred = re.search(r"(\d{1,2})(?!.*\d)", line)  # último entero chico
+                tk = LineTokens(line)
+                m_code, m_tipo, m_cred = tk.clave(), tk.tipo, tk.last_run()
                 if not m_code or not m_tipo or not m_cred:
                     continue
-                codigo = normalize_code(m_code.group(1))
-                tipo = normalize_tipo(m_tipo.group(1))
-                creditos = to_int_strict(m_cred.group(1), None)
+                codigo = normalize_code(tk.text(m_code))
+                tipo = normalize_tipo(tk.text(m_tipo))
+                creditos = to_int_strict(line[max(m_cred[0], m_cred[1] - 2):m_cred[1]], None)  # último entero chico
                 # nombre: entre código y tipo
-                nombre_seg = line[m_code.end():m_tipo.start()]
+                nombre_seg = line[m_code[1]:m_tipo[0]]
                 nombre = norm(nombre_seg)
                 if codigo and nombre and is_small_credit(creditos):
                     materias.append({
@@ -523,11 +990,11 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
             continue
 
         # 2.2 Parseo columna a columna
-        for _, row in df2.iterrows():
-            raw_codigo = row[col_codigo] if col_codigo else ""
-            raw_nombre = row[col_nombre] if col_nombre else ""
-            raw_tipo   = row[col_tipo] if col_tipo else ""
-            raw_cred   = row[col_cred] if col_cred else ""
+        for row in rows:
+            raw_codigo = row[col_codigo] if col_codigo is not None else ""
+            raw_nombre = row[col_nombre] if col_nombre is not None else ""
+            raw_tipo   = row[col_tipo] if col_tipo is not None else ""
+            raw_cred   = row[col_cred] if col_cred is not None else ""
 
             # Filtrado de encabezados/ruido
             line_join = " ".join([raw_codigo, raw_nombre, raw_tipo, raw_cred]).upper()
@@ -566,7 +1033,24 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
     if acent_mode and 'acent_actual' in locals() and acent_actual and acent_actual["materias"]:
         acentuaciones.append(acent_actual)
 
-    # Deduplicar por código (con preferencia por OBL si hay conflicto)
+    materias = dedup_oficial(materias)
+
+    # Debug sample
+    if want_debug:
+        # agrega algunas filas ejemplo si no se recolectaron arriba
+        for rows in rows_by_frame:
+            if len(debug_rows) >= 12:
+                break
+            for row in rows:
+                if len(debug_rows) >= 12:
+                    break
+                debug_rows.append(" | ".join(row))
+
+    return materias, acentuaciones, debug_rows
+
+
+def dedup_oficial(materias):
+    """Deduplica por código (con preferencia por OBL si hay conflicto)."""
     by_code = {}
     for m in materias:
         if m["codigo"] in by_code:
@@ -576,20 +1060,85 @@ def parse_frames_oficial(frames, text_full: str, want_debug=False):
                 by_code[m["codigo"]] = m
         else:
             by_code[m["codigo"]] = m
-    materias = list(by_code.values())
+    return list(by_code.values())
+
+
+# ---- OFICIAL solo con texto (sin Tabula/Camelot) ----
+# El listado oficial es regular: "<clave> <materia> <h.teo> <h.lab> <eje> <tipo> <créditos> [req...]".
+# Con pdfminer agrupando por renglón (char_margin grande, sin flujo de cajas)
+# cada fila de la tabla sale en una sola línea y se parsea sin extraer tablas.
+OFI_ROW_RE = re.compile(
+    r"^(\d{2,6})\s+(.+?)\s+(\d{1,2})\s+(\d{1,2})\s+([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ ]*?)\s+\*?(OBL|OPT|ELE|SEL)\s+(\d{1,2})\b",
+    re.I,
+)
+ACENT_ROW_RE = re.compile(r"^(\d{2,6})\s+(.+?)(?:\s+(\d{1,2}))?$")
+OFI_PAGE_HEADER_RE = re.compile(
+    r"^(UNIVERSIDAD DE SONORA|DIRECCI[ÓO]N DE SERVICIOS ESCOLARES|LISTADO DE MATERIAS|PROGRAMA:"
+    r"|M[ÍI]NIMO DE|HOJA\s*:|CLAVE\s+MATERIA)",
+    re.I,
+)
+
+
+def read_text_rows(path: Path) -> str:
+    """Texto con una línea por renglón visual (las celdas de una fila quedan juntas)."""
+    if not pdfminer_extract_text or not LAParams:
+        return ""
+    try:
+        return pdfminer_extract_text(str(path), laparams=LAParams(char_margin=100, boxes_flow=None)) or ""
+    except Exception:
+        return ""
 
-    # Debug sample
-    if want_debug:
-        # agrega algunas filas ejemplo si no se recolectaron arriba
-        for df in frames:
-            if len(debug_rows) >= 12:
-                break
-            for _, row in df.iterrows():
-                if len(debug_rows) >= 12:
-                    break
-                debug_rows.append(" | ".join([norm(str(v)) for v in row.tolist()]))
 
-    return materias, acentuaciones, debug_rows
+def parse_text_oficial(text_rows: str):
+    """
+    Materias y acentuaciones del listado oficial a partir de las líneas de
+    read_text_rows(); misma salida que parse_frames_oficial (sin debug_rows).
+    """
+    materias, acentuaciones = [], []
+    acent_mode, acent_actual = False, None
+
+    for raw in text_rows.splitlines():
+        line = norm(raw)
+        if not line or OFI_PAGE_HEADER_RE.match(line):
+            continue
+        if ACENT_TITLE_RE.match(line):
+            acent_mode = True
+            continue
+
+        if not acent_mode:
+            m = OFI_ROW_RE.match(line)
+            if m:
+                creditos = to_int_strict(m.group(7), None)
+                if is_small_credit(creditos):
+                    materias.append({
+                        "codigo": normalize_code(m.group(1)),
+                        "nombre": norm(m.group(2)),
+                        "creditos": int(creditos),
+                        "tipo": "OPT" if normalize_tipo(m.group(6)) == "OPT" else "OBL",
+                        "semestre": None
+                    })
+            continue
+
+        # título de acentuación (sin códigos)
+        if not re.search(r"\b\d{2,6}\b", line) and line.isupper() and len(line) <= 40:
+            if acent_actual and acent_actual["materias"]:
+                acentuaciones.append(acent_actual)
+            acent_actual = {"nombre": line, "materias": []}
+            continue
+        m = ACENT_ROW_RE.match(line)
+        if m:
+            if acent_actual is None:
+                acent_actual = {"nombre": "ACENTUACIÓN", "materias": []}
+            tail_credit = to_int_strict(m.group(3), None) if m.group(3) else None
+            acent_actual["materias"].append({
+                "codigo": normalize_code(m.group(1)),
+                "nombre": norm(m.group(2)),
+                **({"creditos": int(tail_credit)} if tail_credit else {})
+            })
+
+    if acent_actual and acent_actual["materias"]:
+        acentuaciones.append(acent_actual)
+    return dedup_oficial(materias), acentuaciones
 
 
 # -------------- Limpieza / Info del plan --------------
@@ -679,50 +1228,69 @@ def sanitize_materias(mats):
 
 
 # ----------------------------- Main -----------------------------
-def main():
-    debug = any(a == "--debug" for a in sys.argv[1:])
-    if len(sys.argv) < 2:
-        print(json.dumps({"ok": False, "error": "Uso: plan_estudio.py <archivo.pdf> [--debug]"}))
-        return
-
-    pdf_path = None
-    for a in sys.argv[1:]:
-        if not a.startswith("--"):
-            pdf_path = a
-            break
-    if not pdf_path:
-        print(json.dumps({"ok": False, "error": "Falta ruta del PDF"}))
-        return
-
-    path = Path(pdf_path)
-    if not path.exists():
-        print(json.dumps({"ok": False, "error": f"No existe {path}"}))
-        return
-
-    # Texto base (para origen, versión y total créditos)
-    text = read_text_basic(path)
-    origen = detect_origen(text)
-
-    # Frames por Tabula; si no, Camelot
-    frames = try_tabula_frames(path)
-    extractor = "tabula"
-    if not frames:
-        frames = try_camelot_frames(path)
-        extractor = "camelot"
-
-    materias, debug_rows = [], []
-    acentuaciones = []
-
+def parse_plan(path: Path, debug: bool = False, max_cont: int | None = None, prof=NO_PROFILE,
+               jobs: int = 1, min_pages: int = DEFAULT_MIN_PAGES, text_pages: int = TEXT_PAGES_DEFAULT,
+               budget: MemoryBudget = UNBOUNDED) -> dict:
+    """Pipeline completo para un PDF; devuelve el dict que imprime main()."""
+    # Texto base (para origen, versión y total créditos), con presupuesto de hojas
+    page_texts = prof.call("read_text_budget", read_text_budget, path, text_pages)
+    text = join_pages(page_texts)
+    origen = prof.call("detect_origen", detect_origen, text)
+    version, total = prof.call("parse_plan_info", parse_plan_info, text)
+
+    # Con esas hojas no alcanzó: documento completo
+    if None in page_texts and (origen == "DESCONOCIDO" or version == "N/A"):
+        page_texts = prof.call("widen_text", widen_text, path, page_texts)
+        text = join_pages(page_texts)
+        origen = prof.call("detect_origen", detect_origen, text)
+        version, total = prof.call("parse_plan_info", parse_plan_info, text)
+
+    text_full, scan_texts = text, page_texts
     if origen == "OFICIAL":
-        materias, acentuaciones, debug_rows = parse_frames_oficial(frames, text_full=text, want_debug=debug)
+        def parse(frames):
+            return prof.call("parse_frames_oficial", parse_frames_oficial, frames, text_full=text_full, want_debug=debug)
+        acent_expected = ACENT_TITLE in (text or "").upper()
     else:
         # Portal alumno o desconocido → usa el parser de “pegado de líneas”
-        materias, debug_rows = parse_frames_portal_alumno(frames, want_debug=debug)
-
-    materias = sanitize_materias(materias)
-    version, total = parse_plan_info(text)
-
-    result = {
+        def parse(frames):
+            materias, debug_rows = prof.call("parse_frames_portal_alumno", parse_frames_portal_alumno,
+                                             frames, want_debug=debug, max_cont=max_cont)
+            return materias, [], debug_rows
+        acent_expected = False
+
+    # OFICIAL: primero solo texto (sin JVM); tablas si la calidad no alcanza, y
+    # el resultado del texto compite con ellas
+    chosen, text_attempt, text_best = None, None, None
+    if origen == "OFICIAL":
+        rows_text = prof.call("read_text_rows", read_text_rows, path)
+        # El texto por renglón cubre todo el documento: de ahí salen el título de
+        # acentuaciones y el pre-escaneo aunque el texto base venga acotado
+        if rows_text.strip():
+            text_full, scan_texts = text + rows_text, rows_text.split("\f")[:-1]
+            acent_expected = ACENT_TITLE in text_full.upper()
+        mats_t, acents_t = prof.call("parse_text_oficial", parse_text_oficial, rows_text)
+        score = score_extraction(mats_t, acents_t, total, acent_expected)
+        text_attempt = {"extractor": "text", "mode": "rows", "frames": 0, **score}
+        text_best = {"extractor": "text", "modes": ["rows"], "frames": [], "score": score,
+                     "parsed": (mats_t, acents_t, rows_text.splitlines()[:12] if debug else [])}
+        if score["good"]:
+            chosen = {**text_best, "attempts": [text_attempt]}
+
+    # Extractores del más barato al más caro, hasta que la calidad alcance,
+    # solo sobre las páginas con tabla (acentuaciones marcadas en el oficial)
+    groups = None
+    if chosen is None:
+        groups = prof.call("scan_pages", lambda: page_groups(scan_pages(scan_texts), origen == "OFICIAL"))
+        chosen = extract_with_escalation(path, parse, total, acent_expected, prof, jobs, min_pages, groups, budget,
+                                         seed=text_best)
+        if text_attempt:
+            chosen["attempts"].insert(0, text_attempt)
+    extractor, frames = chosen["extractor"], chosen["frames"]
+    materias, acentuaciones, debug_rows = chosen["parsed"]
+
+    materias = prof.call("sanitize_materias", sanitize_materias, materias)
+
+    return {
         "ok": bool(materias),
         "plan": {
             "nombre": "Ingeniería en Sistemas de Información",
@@ -736,10 +1304,71 @@ def main():
         "warnings": [] if materias else [f"No se detectaron materias con {extractor}."],
         "debug": {
             "extractor": extractor,
+            "extractor_modes": chosen["modes"],
+            "text_pages": [sum(t is not None for t in page_texts), len(page_texts)],
+            "page_groups": [{"seccion": sec, "paginas": pages} for sec, pages in groups] if groups else None,
+            "quality": chosen["score"],
+            "attempts": chosen["attempts"],
             "frames_detected": len(frames),
             "row_text_examples": debug_rows
         } if debug else None
     }
+
+
+def run(path: Path, args: list[str]) -> dict:
+    """
+    parse_plan() detrás de la caché por contenido (ver parse_cache.py).
+    Con --profile se parsea siempre (sin caché) y se agregan "timings".
+    """
+    debug = "--debug" in args
+    max_cont = parse_cont_arg(args)
+    jobs, min_pages = parallel_jobs(args), parallel_min_pages(args)
+    text_pages = parse_text_pages_arg(args)
+    budget = budget_from_args(args)
+    if "--profile" in args:
+        return profiled_parse(args, path, lambda prof: parse_plan(path, debug=debug, max_cont=max_cont, prof=prof,
+                                                                  jobs=jobs, min_pages=min_pages, text_pages=text_pages,
+                                                                  budget=budget))
+    version = f"{PARSER_VERSION}+{code_fingerprint(__file__)}"
+    options = {"debug": debug, "cont": max_cont, "text_pages": text_pages}
+    return cached_parse(args, "plan_estudio", version, path, options,
+                        lambda: parse_plan(path, debug=debug, max_cont=max_cont, jobs=jobs, min_pages=min_pages,
+                                           text_pages=text_pages, budget=budget))
+
+
+def handle_request(path: str, args: list[str]) -> dict:
+    """Atiende una petición del modo worker; `args` usa los mismos flags que la CLI."""
+    p = Path(path)
+    if not p.exists():
+        return {"ok": False, "error": f"No existe {p}"}
+    return run(p, args)
+
+
+def main():
+    if "--worker" in sys.argv[1:]:
+        from parser_worker import serve
+        serve(handle_request, sys.argv[1:])
+        return
+
+    if len(sys.argv) < 2:
+        print(json.dumps({"ok": False, "error": "Uso: plan_estudio.py <archivo.pdf> [--debug]"}))
+        return
+
+    pdf_path = None
+    for a in sys.argv[1:]:
+        if not a.startswith("--"):
+            pdf_path = a
+            break
+    if not pdf_path:
+        print(json.dumps({"ok": False, "error": "Falta ruta del PDF"}))
+        return
+
+    path = Path(pdf_path)
+    if not path.exists():
+        print(json.dumps({"ok": False, "error": f"No existe {path}"}))
+        return
+
+    result = run(path, sys.argv[1:])
     print(json.dumps(result, ensure_ascii=False))
 
 
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chequeos de regresión de los parsers (kardex.py, plan_estudio.py) y de los
+scripts de lote y análisis (batch_parse.py, cohort_stats.py, plan_audit.py,
+subject_match.py), sobre PDFs y registros sintéticos: casos que ya se rompieron
+alguna vez y deben seguir bien.
+
+Uso:
+  python regression_checks.py [--only=nombre,nombre]
+
+Imprime {"ok": bool, "checks": [{name, ok, detail}]} y sale con 1 si alguno falla.
+Los chequeos de planes necesitan Tabula o Camelot para leer tablas; sin ninguno
+se marcan "skipped". La caché de parseo no se usa (cada chequeo parsea de nuevo).
+"""
+import sys, os, json, time, tempfile, contextlib, io, subprocess
+from pathlib import Path
+
+import kardex
+import plan_estudio
+import bench_pdfs
+import parse_cache
+import batch_parse
+import cohort_stats
+import columnar_export
+import plan_audit
+
+CHECKS = {}
+
+
+def check(fn):
+    CHECKS[fn.__name__] = fn
+    return fn
+
+
+class Skip(Exception):
+    pass
+
+
+def _quiet(fn, *args, **kwargs):
+    """tabula-py / camelot imprimen avisos por stdout."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+# ------------------------ Caché ------------------------
+@check
+def cache_fingerprint_covers_helpers(work: Path) -> str:
+    """La huella del parser incluye los helpers locales que importa."""
+    for script in (kardex.__file__, plan_estudio.__file__):
+        names = {p.name for p in parse_cache.local_modules(script)}
+        missing = {"page_parallel.py", "memory_budget.py", "parse_cache.py"} - names
+        assert not missing, f"{Path(script).name}: faltan {sorted(missing)}"
+    return "ok"
+
+
+@check
+def cache_evicts_by_counter(work: Path) -> str:
+    """El desalojo recorre el directorio solo cuando el contador pasa del máximo."""
+    root, scans = work / "cache", []
+    evict = parse_cache.ParseCache.evict
+    for i in range(40):
+        cache = parse_cache.ParseCache(root, 20_000)
+        cache.evict = lambda c=cache: (scans.append(1), evict(c))
+        cache.put(f"{i:064x}", {"ok": True, "x": "a" * 1000})
+    total = sum(size for _, size, _ in cache._entries())
+    assert total <= 20_000, f"{total} bytes en caché"
+    assert len(scans) < 40 / 2, f"{len(scans)} recorridos en 40 escrituras"
+    return f"{len(scans)} recorridos en 40 escrituras"
+
+
+# ------------------------ Lotes ------------------------
+CRASHING = {"f3.pdf", "f7.pdf"}
+
+
+def _crashing_parse(path: Path) -> dict:
+    """Parser de prueba para batch_parse: mata su proceso con los de CRASHING."""
+    if path.name in CRASHING:
+        time.sleep(0.01)
+        os._exit(1)
+    time.sleep(0.2)  # que sigan en vuelo cuando el otro tumba el pool
+    return {"ok": True}
+
+
+@check
+def batch_isolates_crashing_file(work: Path) -> str:
+    """Un worker que muere solo marca como fallido al archivo que lo tumba; los
+    que estaban en vuelo con él se reintentan y salen bien."""
+    folder = work / "lote"
+    folder.mkdir()
+    for i in range(12):
+        (folder / f"f{i}.pdf").write_bytes(b"%PDF-1.4\n")
+    batch_parse.PARSERS["crash"] = (Path(__file__).stem, "_crashing_parse")
+    out = work / "lote.ndjson"
+    stats = batch_parse.run_batch(batch_parse.collect_inputs([str(folder)]), out,
+                                  work / "lote.manifest", parser="crash", jobs=3)
+    failed = sorted(Path(json.loads(l)["path"]).name for l in out.read_text().splitlines()
+                    if not json.loads(l)["ok"])
+    assert failed == sorted(CRASHING), f"fallidos: {failed}"
+    assert stats["parsed"] == 10 and stats["failed"] == 2, f"stats: {stats}"
+    return f"fallidos: {failed}"
+
+
+# ------------------------ Cohortes ------------------------
+@check
+def cohort_loaders_agree(work: Path) -> str:
+    """NDJSON y tablas de columnar_export.py dan el mismo report(), también con
+    kárdex sin expediente (cabecera vacía) y re-cargas del mismo alumno."""
+    if columnar_export.pa is None:
+        raise Skip("sin pyarrow")
+    ndjson = work / "cohorte.ndjson"
+    with open(ndjson, "w", encoding="utf-8") as fh:
+        for i in range(12):
+            exp = None if i % 5 == 2 or i % 7 == 3 else f"2200{i % 6:05d}"
+            cves = [f"{6800 + (i * 3 + k) % 9}" for k in range(5 + i % 4)]
+            mats = [{"CR": "5", "CVE": cve, "Materia": f"MATERIA {cve}", "E1": "", "E2": "",
+                     "ORD": str(50 + (i * 7 + k * 11) % 50), "CIC": f"202{k % 3}-{1 + k % 2}"} for k, cve in enumerate(cves)]
+            rec = {"path": f"/lote/k{i}.pdf", "ok": True, "error": None, "alumno": {"expediente": exp, "plan": "2182"} if exp else {},
+                   "materias": mats, "resumen": {"creditos": {"APR": 20 + i} if i % 2 else {}}}
+            fh.write(json.dumps(rec) + "\n")
+    base = cohort_stats.Cohort.from_records(cohort_stats.iter_json_records([str(ndjson)])).report()
+    for fmt in ("parquet", "arrow"):
+        out = work / f"cohorte_{fmt}"
+        columnar_export.export_ndjson(ndjson, out, "kardex", fmt)
+        got = cohort_stats.Cohort.from_columnar(out).report()
+        assert got == base, f"{fmt}: {got['alumnos']} alumnos / {got['filas']} filas " \
+                            f"(NDJSON: {base['alumnos']} / {base['filas']})"
+    return f"{base['alumnos']} alumnos, {base['filas']} filas"
+
+
+@check
+def audit_outside_by_normalized_code(work: Path) -> str:
+    """fuera_del_plan cuenta cada código normalizado una vez: '9999' y ' 9999',
+    '6000' y '06000' son la misma materia; dos claves ilegibles distintas no."""
+    plan = plan_audit.PlanIndex({"plan": {"version": "2182", "total_creditos": 10},
+                                 "materias": [{"codigo": "6801", "nombre": "A", "creditos": 5, "tipo": "OBL"}]})
+    cves = ["6801", "9999", " 9999", "6000", "06000", "X", "Y"]
+    rec = {"ok": True, "alumno": {"expediente": "220000001", "plan": "2182"},
+           "materias": [{"CR": "5", "CVE": c, "Materia": f"M{i}", "E1": "", "E2": "", "ORD": "90", "CIC": "2020-1"}
+                        for i, c in enumerate(cves)]}
+    row = plan_audit.audit(cohort_stats.Cohort.from_records([rec]), {"2182": plan})[0]
+    assert row["fuera_del_plan"] == 4, f"fuera_del_plan: {row['fuera_del_plan']}"
+    return "ok"
+
+
+# ------------------------ Conciliación ------------------------
+@check
+def subject_match_imports_light(work: Path) -> str:
+    """subject_match.py y plan_audit.py no cargan plan_estudio ni sus extractores."""
+    heavy = ("plan_estudio", "tabula", "camelot", "pdfplumber")
+    code = f"import sys, subject_match, plan_audit; print([m for m in {heavy!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent,
+                         capture_output=True, text=True, check=True).stdout.strip()
+    assert out == "[]", f"cargados: {out}"
+    return "ok"
+
+
+# ------------------------ Kárdex ------------------------
+@check
+def summary_periods_on_early_pages(work: Path) -> str:
+    """Promedios por periodo repartidos entre las primeras y las últimas hojas:
+    salen todos y el promedio global es el de la primera ancla PROMEDIO."""
+    pages = [["UNIVERSIDAD DE SONORA", "PROMEDIOS POR PERIODO", "2019-1 85.50", "2019-2 *90,10"],
+             ["CR CVE MATERIA"] * 20,
+             ["CR CVE MATERIA"] * 20,
+             ["PROMEDIOS POR PERIODO", "2020-1 88.20", "2020-2 91.00", "PROMEDIO KARDEX 88.20",
+              "CRÉDITOS APR: 200 REP: 8 INS: 30", "MATERIAS APR: 40 REP: 1 NMR: 0 INS: 5"],
+             ["Pagina 5 de 5"]]
+    c = bench_pdfs.PdfCanvas()
+    for lines in pages:
+        c.new_page()
+        for i, line in enumerate(lines):
+            c.text(30, bench_pdfs.PAGE_H - 40 - 14 * i, line, 9)
+    pdf = work / "kardex_periodos.pdf"
+    c.save(pdf)
+    resumen = kardex.parse_kardex(pdf)["resumen"]
+    expected = {"2019-1": 85.5, "2019-2": 90.1, "2020-1": 88.2, "2020-2": 91.0, "kardex": 85.5}
+    assert resumen["promedios"] == expected, f"promedios: {resumen['promedios']}"
+    assert resumen["creditos"] == {"APR": 200, "REP": 8, "INS": 30}, f"créditos: {resumen['creditos']}"
+    return "ok"
+
+
+@check
+def stream_emits_header_early(work: Path) -> str:
+    """--stream: la cabecera (con expediente) sale antes de terminar las páginas
+    y, si ya salió completa, no se repite al final."""
+    pdf = work / "kardex_stream.pdf"
+    bench_pdfs.kardex_pdf(pdf, 240)
+    events = []
+    kardex.stream_kardex(pdf, events.append)
+    alumnos = [i for i, ev in enumerate(events) if ev["event"] == "alumno"]
+    last_page = max(i for i, ev in enumerate(events) if ev["event"] == "materias")
+    assert alumnos, "sin evento alumno"
+    first = events[alumnos[0]]["alumno"]
+    assert first.get("expediente"), f"cabecera temprana sin expediente: {first}"
+    assert alumnos[0] < last_page, "la cabecera salió hasta el final"
+    assert first == kardex.parse_kardex(pdf)["alumno"] or len(alumnos) == 2, "cabecera distinta sin corrección"
+    return f"alumno en el evento {alumnos[0]} de {len(events)}"
+
+
+# ------------------------ Planes ------------------------
+@check
+def oficial_keeps_acentuaciones(work: Path) -> str:
+    """Plan oficial corto (40 materias) cuya cobertura no llega a "good": la
+    extracción elegida debe traer las acentuaciones de la hoja 3."""
+    if not (plan_estudio.tabula or plan_estudio.camelot):
+        raise Skip("sin Tabula ni Camelot")
+    pdf = work / "oficial_40.pdf"
+    _, acents = bench_pdfs.plan_oficial_pdf(pdf, 40)
+    expected = [name for name, mats in acents if mats]
+    out = _quiet(plan_estudio.parse_plan, pdf)
+    got = [a["nombre"] for a in out.get("acentuaciones") or []]
+    assert len(out["materias"]) == 40, f"materias: {len(out['materias'])}"
+    assert got == expected, f"acentuaciones: {got} (esperadas {expected})"
+    return f"{len(got)} acentuaciones"
+
+
+@check
+def text_attempt_competes(work: Path) -> str:
+    """El resultado de solo texto que no llega a "good" no se descarta: compite
+    con las tablas y, si ninguna lo supera, es el que sale."""
+    if not (plan_estudio.tabula or plan_estudio.camelot):
+        raise Skip("sin Tabula ni Camelot")
+    pdf = work / "oficial_40.pdf"
+    if not pdf.exists():
+        bench_pdfs.plan_oficial_pdf(pdf, 40)
+    mats, acents = plan_estudio.parse_text_oficial(plan_estudio.read_text_rows(pdf))
+    score = plan_estudio.score_extraction(mats, acents, 393, True)
+    seed = {"extractor": "text", "modes": ["rows"], "frames": [], "score": score, "parsed": (mats, acents, [])}
+    # tablas que nunca superan al texto
+    best = _quiet(plan_estudio.extract_with_escalation, pdf, lambda frames: ([], [], []), 393, True, seed=seed)
+    assert not score["good"], "el texto ya es \"good\": el caso no aplica"
+    assert best["extractor"] == "text", f"ganó {best['extractor']}"
+    return f"texto: {score['rows']} materias, {score['acentuaciones']} acentuaciones"
+
+
+@check
+def page_groups_merge_sections(work: Path) -> str:
+    """Con malla y acentuaciones en grupos de páginas distintos, la extracción
+    por tablas (sin la de texto) trae ambas aunque lattice solo lea la malla."""
+    if not (plan_estudio.tabula or plan_estudio.camelot):
+        raise Skip("sin Tabula ni Camelot")
+    pdf = work / "oficial_40.pdf"
+    _, acents = bench_pdfs.plan_oficial_pdf(pdf, 40)
+    rows_text = plan_estudio.read_text_rows(pdf)
+    groups = plan_estudio.page_groups(plan_estudio.scan_pages(rows_text.split("\f")[:-1]), True)
+    assert [sec for sec, _ in groups] == ["malla", "acent"], f"grupos: {groups}"
+
+    def parse(frames):
+        return plan_estudio.parse_frames_oficial(frames, text_full=rows_text)
+    best = _quiet(plan_estudio.extract_with_escalation, pdf, parse, 393, True, groups=groups)
+    got = [a["nombre"] for a in best["parsed"][1]]
+    expected = [name for name, mats in acents if mats]
+    assert len(best["parsed"][0]) == 40, f"materias: {len(best['parsed'][0])}"
+    assert got == expected, f"acentuaciones: {got} (esperadas {expected}) con {best['extractor']} {best['modes']}"
+    return f"{best['extractor']} {best['modes']}"
+
+
+@check
+def score_key_prefers_acentuaciones(work: Path) -> str:
+    """Empate en cobertura: gana la extracción con las acentuaciones anunciadas."""
+    mats = [{"codigo": f"{i:05d}", "nombre": "X", "creditos": 5} for i in range(10)]
+    malla = plan_estudio.score_extraction(mats, [], 100, True)
+    completa = plan_estudio.score_extraction(mats, [{"nombre": "A", "materias": []}], 100, True)
+    assert plan_estudio._score_key(completa) > plan_estudio._score_key(malla)
+    return "ok"
+
+
+# ----------------------------- Main -----------------------------
+def main():
+    opts = {a.split("=", 1)[0]: (a.split("=", 1)[1] if "=" in a else "1") for a in sys.argv[1:] if a.startswith("--")}
+    only = set(opts["--only"].split(",")) if "--only" in opts else None
+    results = []
+    with tempfile.TemporaryDirectory(prefix="regression-") as tmp:
+        for name, fn in CHECKS.items():
+            if only and name not in only:
+                continue
+            try:
+                results.append({"name": name, "ok": True, "detail": fn(Path(tmp))})
+            except Skip as e:
+                results.append({"name": name, "ok": True, "skipped": str(e)})
+            except Exception as e:
+                results.append({"name": name, "ok": False, "detail": f"{type(e).__name__}: {e}"})
+    ok = all(r["ok"] for r in results)
+    print(json.dumps({"ok": ok, "checks": results}, ensure_ascii=False, indent=1))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
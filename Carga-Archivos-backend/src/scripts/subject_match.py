@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conciliación de materias contra un catálogo con índice de n-gramas de caracteres.
+
+Los nombres que salen de parse_frames_portal_alumno / sanitize_materias no
+siempre coinciden con el catálogo (guiones partidos, artículos perdidos,
+renglones de continuación truncados) y la clave a veces viene mal por el
+respaldo de normalize_code. Cada renglón se resuelve a su mejor entrada del
+catálogo con una confianza en [0, 1].
+
+- Catálogo: materias (y acentuaciones) de plan_estudio.py más los pares
+  CVE/Materia de kardex.py; una entrada por (clave, nombre normalizado).
+- Nombre normalizado: mayúsculas sin acentos, sin puntuación ni artículos
+  (DE, LA, EL, ...). Si coincide exacto con una entrada, no se busca más (si
+  el nombre lo comparten varias claves y ninguna es la del renglón, la
+  confianza se reparte entre ellas).
+- Índice invertido trigrama -> ids de entrada (arreglos de NumPy), armado una
+  vez. Cada búsqueda junta las listas de sus trigramas y cuenta coincidencias
+  con np.unique sobre esas listas: el costo es O(P log P), con P la suma de
+  sus longitudes (las entradas que comparten algún trigrama), sin arreglos del
+  tamaño del catálogo. Un trigrama muy común (' IN', 'ION') alarga P; en el
+  peor caso P crece con el catálogo.
+- Similitud de nombre: promedio de Dice y del coeficiente de traslape (este
+  último tolera nombres truncados). Si la clave del renglón coincide con la de
+  la entrada se suma CODE_BONUS.
+
+Uso:
+  python subject_match.py --catalogo=<planes/kárdex: ndjson|carpeta|json ...> <entrada: ndjson|carpeta|json ...>
+                          [--min-confianza=0.5]
+  La entrada son salidas de plan_estudio.py o kardex.py; se imprime el mejor
+  candidato de cada materia.
+"""
+import sys, json, re, time, unicodedata
+
+import numpy as np
+
+from cohort_stats import iter_json_records
+from plan_codes import normalize_code
+
+NGRAM = 3
+STOPWORDS = frozenset({"DE", "DEL", "LA", "LAS", "EL", "LOS", "Y", "E", "EN", "A", "AL"})
+CODE_BONUS = 0.25      # la clave coincide: refuerza un nombre parecido
+MIN_CONFIDENCE = 0.5   # debajo de esto no se concilia
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]+")
+
+
+def normalize_name(raw: str | None) -> str:
+    """'Programación  Orientada a Obje- tos' -> 'PROGRAMACION ORIENTADA OBJE TOS'."""
+    s = unicodedata.normalize("NFKD", str(raw or "").upper())
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(w for w in _NON_ALNUM_RE.sub(" ", s).split() if w not in STOPWORDS)
+
+
+def ngrams(name: str, n: int = NGRAM) -> set[str]:
+    """Trigramas del nombre normalizado, con bordes (' PR', 'TOS ')."""
+    padded = f" {name} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class SubjectIndex:
+    """Catálogo de materias indexado por nombre normalizado, trigramas y clave."""
+
+    def __init__(self, entries):
+        self.codes: list[str] = []
+        self.names: list[str] = []
+        self.sources: list[str] = []
+        self._keys: dict[tuple[str, str], int] = {}
+        self._exact: dict[str, list[int]] = {}
+        self._by_code: dict[str, list[int]] = {}
+        postings: dict[str, list[int]] = {}
+        sizes: list[int] = []
+
+        for code, name, source in entries:
+            code, key = normalize_code(code), normalize_name(name)
+            if not key or (code, key) in self._keys:
+                continue
+            i = self._keys[(code, key)] = len(self.codes)
+            self.codes.append(code)
+            self.names.append(name)
+            self.sources.append(source)
+            self._exact.setdefault(key, []).append(i)
+            if code:
+                self._by_code.setdefault(code, []).append(i)
+            grams = ngrams(key)
+            sizes.append(len(grams))
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._sizes = np.array(sizes, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @classmethod
+    def from_records(cls, records) -> "SubjectIndex":
+        """Registros de plan_estudio.py (materias + acentuaciones) y kardex.py (CVE/Materia)."""
+        def entries():
+            for rec in records:
+                if not rec.get("ok", True):
+                    continue
+                if "plan" in rec:
+                    src = f"plan {(rec.get('plan') or {}).get('version')}"
+                    for m in rec.get("materias") or []:
+                        yield m.get("codigo"), m.get("nombre"), src
+                    for acent in rec.get("acentuaciones") or []:
+                        for m in acent.get("materias") or []:
+                            yield m.get("codigo"), m.get("nombre"), src
+                else:
+                    for m in rec.get("materias") or []:
+                        yield m.get("CVE"), m.get("Materia"), "kardex"
+        return cls(entries())
+
+    def _entry(self, i: int, confidence: float, method: str) -> dict:
+        return {"codigo": self.codes[i], "nombre": self.names[i], "fuente": self.sources[i],
+                "confianza": round(float(confidence), 4), "metodo": method}
+
+    def match(self, name: str | None, code: str | None = None, min_confidence: float = MIN_CONFIDENCE) -> dict | None:
+        """Mejor entrada del catálogo para (nombre, clave); None si ninguna alcanza min_confidence."""
+        key, code = normalize_name(name), normalize_code(code)
+        exact = self._exact.get(key)
+        if exact:
+            same = [i for i in exact if self.codes[i] == code]
+            if same:
+                return self._entry(same[0], 1.0, "exacto")
+            # mismo nombre con varias claves y ninguna es la del renglón: ambiguo
+            confidence = 1.0 / len(exact)
+            return self._entry(exact[0], confidence, "exacto") if confidence >= min_confidence else None
+
+        by_code = self._by_code.get(code, []) if code else []
+        grams = ngrams(key) if key else set()
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        if not lists and not by_code:
+            return None
+
+        best, confidence, q = -1, 0.0, len(grams)
+        if lists:
+            cand, counts = np.unique(np.concatenate(lists), return_counts=True)
+            overlap, sizes = counts.astype(np.float64), self._sizes[cand]
+            sim = (2 * overlap / (q + sizes) + overlap / np.minimum(q, sizes)) / 2
+            k = int(np.argmax(sim))
+            best, confidence = int(cand[k]), float(sim[k])
+        # las entradas con la misma clave (pocas) compiten con su bono, compartan o no trigramas
+        for i in by_code:
+            pos = int(np.searchsorted(cand, i)) if lists else 0
+            c = float(counts[pos]) if lists and pos < len(cand) and cand[pos] == i else 0.0
+            size = self._sizes[i]
+            s = ((2 * c / (q + size) + c / min(q, size)) / 2 if c else 0.0) + CODE_BONUS
+            if s > confidence:
+                best, confidence = i, s
+
+        confidence = min(confidence, 1.0)
+        if best < 0 or confidence < min_confidence:
+            return None
+        return self._entry(best, confidence, "ngram+clave" if self.codes[best] == code and code else "ngram")
+
+
+def iter_rows(records):
+    """(nombre, clave) de cada materia en salidas de plan_estudio.py o kardex.py."""
+    for rec in records:
+        if "plan" in rec:
+            for m in rec.get("materias") or []:
+                yield m.get("nombre"), m.get("codigo")
+            for acent in rec.get("acentuaciones") or []:
+                for m in acent.get("materias") or []:
+                    yield m.get("nombre"), m.get("codigo")
+        else:
+            for m in rec.get("materias") or []:
+                yield m.get("Materia"), m.get("CVE")
+
+
+# ----------------------------- Main -----------------------------
+def main():
+    args = sys.argv[1:]
+    opts = {a.split("=", 1)[0]: (a.split("=", 1)[1] if "=" in a else "1") for a in args if a.startswith("--")}
+    specs = [a for a in args if not a.startswith("--")]
+    if not specs or "--catalogo" not in opts:
+        print(json.dumps({"ok": False, "error": "Uso: subject_match.py --catalogo=<planes/kárdex> <entrada ...>"}))
+        sys.exit(1)
+    try:
+        min_conf = float(opts.get("--min-confianza", MIN_CONFIDENCE))
+        index = SubjectIndex.from_records(iter_json_records(opts["--catalogo"].split(",")))
+        rows = list(iter_rows(iter_json_records(specs)))
+        t0 = time.perf_counter()
+        matches = [index.match(name, code, min_conf) for name, code in rows]
+        elapsed = time.perf_counter() - t0
+    except Exception as e:
+        print(json.dumps({"ok": False, "error": f"{type(e).__name__}: {e}"}, ensure_ascii=False))
+        sys.exit(1)
+
+    out = [{"nombre": name, "codigo": code, "catalogo": m} for (name, code), m in zip(rows, matches)]
+    print(json.dumps({
+        "ok": True,
+        "catalogo": len(index),
+        "materias": len(rows),
+        "sin_conciliar": sum(m is None for m in matches),
+        "us_por_busqueda": round(elapsed / max(len(rows), 1) * 1e6, 1),
+        "conciliacion": out,
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import type { ChildProcess } from "node:child_process";
+import type { Request, Response } from "express";
+import os from "node:os";
+import { workerPoolEnabled, workerPoolSize } from "./pythonWorkerPool";
+
+// Cola de trabajos de parseo (kardex.py / plan_estudio.py), compartida por ambos parsers.
+// - Límite fijo de trabajos simultáneos: una ráfaga de cargas espera aquí en vez de
+//   lanzar un proceso Python por archivo y saturar la CPU. Con el pool de workers el
+//   límite es su tamaño por script, así que un trabajo "activo" siempre tiene un
+//   worker libre (no espera en la FIFO del pool, que ignora la prioridad).
+// - Prioridad: las cargas interactivas pasan antes que las re-importaciones masivas
+//   (FIFO dentro de cada prioridad).
+// - Timeout por trabajo y cancelación: el trabajo recibe un AbortSignal y al abortarse
+//   mata su proceso Python (killChild). El cupo se libera cuando el proceso termina.
+// - stats(): profundidad de la cola, trabajos activos y tiempos de espera (monitoreo).
+
+export type ParserJobPriority = "interactive" | "bulk";
+
+export type ParserJobOptions = {
+    priority?: ParserJobPriority;
+    timeoutMs?: number; // 0 = sin límite
+    signal?: AbortSignal; // cancelación externa (p.ej. el cliente cerró la conexión)
+    label?: string;
+};
+
+export class ParserJobError extends Error {
+    constructor(message: string, readonly code: "TIMEOUT" | "CANCELLED") {
+        super(message);
+        this.name = "ParserJobError";
+    }
+}
+
+type QueuedJob = {
+    task: (signal: AbortSignal) => Promise<any>;
+    priority: ParserJobPriority;
+    timeoutMs: number;
+    signal?: AbortSignal;
+    label: string;
+    enqueuedAt: number;
+    resolve: (v: any) => void;
+    reject: (e: Error) => void;
+    onQueuedAbort?: () => void;
+};
+
+const WAIT_SAMPLES = 200; // tiempos de espera recientes para promedio / percentiles
+const KILL_GRACE_MS = 3000;
+
+export class ParserJobQueue {
+    private queues: Record<ParserJobPriority, QueuedJob[]> = { interactive: [], bulk: [] };
+    private running = 0;
+    private counters = { completed: 0, failed: 0, timedOut: 0, cancelled: 0 };
+    private waits: number[] = [];
+    private maxWaitMs = 0;
+
+    constructor(readonly concurrency: number, readonly defaultTimeoutMs: number) {}
+
+    run<T>(task: (signal: AbortSignal) => Promise<T>, opts: ParserJobOptions = {}): Promise<T> {
+        return new Promise<T>((resolve, reject) => {
+            if (opts.signal?.aborted) {
+                this.counters.cancelled++;
+                return reject(new ParserJobError(`Parseo cancelado (${opts.label ?? "job"})`, "CANCELLED"));
+            }
+            const job: QueuedJob = {
+                task,
+                priority: opts.priority ?? "interactive",
+                timeoutMs: opts.timeoutMs ?? this.defaultTimeoutMs,
+                signal: opts.signal,
+                label: opts.label ?? "job",
+                enqueuedAt: Date.now(),
+                resolve,
+                reject,
+            };
+            if (job.signal) {
+                job.onQueuedAbort = () => this.cancelQueued(job);
+                job.signal.addEventListener("abort", job.onQueuedAbort, { once: true });
+            }
+            this.queues[job.priority].push(job);
+            this.pump();
+        });
+    }
+
+    stats() {
+        const sorted = [...this.waits].sort((a, b) => a - b);
+        const pct = (p: number) => (sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))] : 0);
+        const queued = [...this.queues.interactive, ...this.queues.bulk];
+        const now = Date.now();
+        return {
+            concurrency: this.concurrency,
+            running: this.running,
+            queued: queued.length,
+            queuedByPriority: { interactive: this.queues.interactive.length, bulk: this.queues.bulk.length },
+            oldestQueuedMs: queued.length ? now - Math.min(...queued.map((j) => j.enqueuedAt)) : 0,
+            waitMs: {
+                avg: sorted.length ? Math.round(sorted.reduce((a, b) => a + b, 0) / sorted.length) : 0,
+                p50: pct(0.5),
+                p95: pct(0.95),
+                max: this.maxWaitMs,
+                samples: sorted.length,
+            },
+            ...this.counters,
+        };
+    }
+
+    private cancelQueued(job: QueuedJob) {
+        const q = this.queues[job.priority];
+        const idx = q.indexOf(job);
+        if (idx === -1) return; // ya arrancó: lo atiende start()
+        q.splice(idx, 1);
+        this.counters.cancelled++;
+        job.reject(new ParserJobError(`Parseo cancelado en cola (${job.label})`, "CANCELLED"));
+    }
+
+    private pump() {
+        while (this.running < this.concurrency) {
+            const job = this.queues.interactive.shift() ?? this.queues.bulk.shift();
+            if (!job) return;
+            this.start(job);
+        }
+    }
+
+    private start(job: QueuedJob) {
+        if (job.signal && job.onQueuedAbort) job.signal.removeEventListener("abort", job.onQueuedAbort);
+        this.recordWait(Date.now() - job.enqueuedAt);
+        this.running++;
+
+        // Timeout o cancelación: se rechaza de inmediato y se aborta el trabajo;
+        // el cupo se libera cuando la tarea termina (su proceso ya fue matado).
+        const ac = new AbortController();
+        let settled = false;
+        const settle = (fn: () => void) => {
+            if (settled) return;
+            settled = true;
+            fn();
+        };
+        const abort = (code: "TIMEOUT" | "CANCELLED") => {
+            if (settled) return;
+            if (code === "TIMEOUT") this.counters.timedOut++;
+            else this.counters.cancelled++;
+            const msg = code === "TIMEOUT"
+                ? `Parseo excedió ${job.timeoutMs} ms (${job.label})`
+                : `Parseo cancelado (${job.label})`;
+            settle(() => job.reject(new ParserJobError(msg, code)));
+            ac.abort();
+        };
+        const timer = job.timeoutMs > 0 ? setTimeout(() => abort("TIMEOUT"), job.timeoutMs) : null;
+        const onCancel = () => abort("CANCELLED");
+        job.signal?.addEventListener("abort", onCancel, { once: true });
+
+        const finish = () => {
+            if (timer) clearTimeout(timer);
+            job.signal?.removeEventListener("abort", onCancel);
+            this.running--;
+            this.pump();
+        };
+
+        Promise.resolve()
+            .then(() => job.task(ac.signal))
+            .then(
+                (v) => settle(() => {
+                    this.counters.completed++;
+                    job.resolve(v);
+                }),
+                (e) => settle(() => {
+                    this.counters.failed++;
+                    job.reject(e);
+                })
+            )
+            .then(finish, finish);
+    }
+
+    private recordWait(ms: number) {
+        this.waits.push(ms);
+        if (this.waits.length > WAIT_SAMPLES) this.waits.shift();
+        if (ms > this.maxWaitMs) this.maxWaitMs = ms;
+    }
+}
+
+// Mata un proceso hijo: SIGTERM y, si no sale a tiempo, SIGKILL.
+export function killChild(child: ChildProcess, graceMs = KILL_GRACE_MS) {
+    if (child.exitCode !== null || child.signalCode !== null) return;
+    child.kill("SIGTERM");
+    const t = setTimeout(() => {
+        if (child.exitCode === null && child.signalCode === null) child.kill("SIGKILL");
+    }, graceMs);
+    child.once("exit", () => clearTimeout(t));
+}
+
+// ---- Configuración por entorno ----
+// PY_JOB_CONCURRENCY=N   trabajos de parseo simultáneos (por defecto: núcleos, o el
+//                        tamaño del pool de workers si está activo; nunca más que ese
+//                        tamaño: para subirlo, PY_WORKER_POOL_SIZE).
+// PY_JOB_TIMEOUT_MS=N    límite por trabajo en ms (por defecto: 180000; 0 = sin límite).
+const DEFAULT_TIMEOUT_MS = 180_000;
+
+function envInt(name: string, fallback: number, min: number): number {
+    const n = parseInt(String(process.env[name] ?? ""), 10);
+    return !Number.isNaN(n) && n >= min ? n : fallback;
+}
+
+function jobConcurrency(): number {
+    if (!workerPoolEnabled()) return envInt("PY_JOB_CONCURRENCY", os.cpus().length || 1, 1);
+    const poolSize = workerPoolSize();
+    return Math.min(envInt("PY_JOB_CONCURRENCY", poolSize, 1), poolSize);
+}
+
+let queue: ParserJobQueue | null = null;
+
+export function getParserQueue(): ParserJobQueue {
+    if (!queue) {
+        queue = new ParserJobQueue(
+            jobConcurrency(),
+            envInt("PY_JOB_TIMEOUT_MS", DEFAULT_TIMEOUT_MS, 0)
+        );
+    }
+    return queue;
+}
+
+// Opciones de trabajo para una petición HTTP: ?bulk=1 (o X-Prioridad: bulk) la manda
+// detrás de las cargas interactivas, y si el cliente corta la conexión antes de la
+// respuesta el parseo se cancela.
+export function parserJobOptions(req: Request, res: Response): ParserJobOptions {
+    const bulk = String(req.query.bulk ?? "0") === "1"
+        || String(req.headers["x-prioridad"] ?? "").toLowerCase() === "bulk";
+    const ac = new AbortController();
+    res.on("close", () => {
+        if (!res.writableEnded) ac.abort();
+    });
+    return { priority: bulk ? "bulk" : "interactive", signal: ac.signal, label: req.file?.originalname };
+}
+
+// 504 si el parseo excedió su tiempo; 500 en cualquier otro caso.
+export function parserErrorStatus(e: unknown): number {
+    return e instanceof ParserJobError && e.code === "TIMEOUT" ? 504 : 500;
+}
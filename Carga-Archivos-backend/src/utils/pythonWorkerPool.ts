@@ -0,0 +1,156 @@
+import { spawn, ChildProcessWithoutNullStreams } from "node:child_process";
+import readline from "node:readline";
+import os from "node:os";
+import { killChild } from "./parserJobQueue";
+
+// Pool de procesos Python "calientes" (kardex.py / plan_estudio.py en modo --worker).
+// Cada worker atiende una petición a la vez por stdin/stdout (JSON por línea),
+// así que el pool reparte los trabajos entre workers libres y encola el resto.
+
+type Job = {
+    id: number;
+    pdfPath: string;
+    args: string[];
+    resolve: (v: any) => void;
+    reject: (e: Error) => void;
+};
+
+type Worker = {
+    child: ChildProcessWithoutNullStreams;
+    busy: Job | null;
+    stderr: string;
+};
+
+export type PythonWorkerPoolOptions = {
+    script: string;
+    size?: number;
+    pythonExe?: string;
+};
+
+export class PythonWorkerPool {
+    private workers: Worker[] = [];
+    private queue: Job[] = [];
+    private nextId = 1;
+    private readonly size: number;
+    private readonly pythonExe: string;
+
+    constructor(private readonly opts: PythonWorkerPoolOptions) {
+        this.size = Math.max(1, opts.size ?? 1);
+        this.pythonExe = opts.pythonExe ?? "python";
+    }
+
+    run(pdfPath: string, args: string[] = [], signal?: AbortSignal): Promise<any> {
+        return new Promise((resolve, reject) => {
+            if (signal?.aborted) return reject(new Error("Trabajo cancelado"));
+            const job: Job = { id: this.nextId++, pdfPath, args, resolve, reject };
+            signal?.addEventListener("abort", () => this.abortJob(job), { once: true });
+            this.queue.push(job);
+            this.dispatch();
+        });
+    }
+
+    // Timeout / cancelación: si aún está en cola se quita; si ya corre se mata su
+    // worker (onExit rechaza el trabajo y dispatch() levanta otro cuando haga falta).
+    private abortJob(job: Job) {
+        const idx = this.queue.indexOf(job);
+        if (idx !== -1) {
+            this.queue.splice(idx, 1);
+            return job.reject(new Error("Trabajo cancelado"));
+        }
+        const w = this.workers.find((x) => x.busy === job);
+        if (w) killChild(w.child);
+    }
+
+    close() {
+        for (const w of this.workers) w.child.kill();
+        this.workers = [];
+    }
+
+    private dispatch() {
+        while (this.queue.length) {
+            let w = this.workers.find((x) => !x.busy);
+            if (!w && this.workers.length < this.size) w = this.spawnWorker();
+            if (!w) return;
+
+            const job = this.queue.shift() as Job;
+            w.busy = job;
+            w.stderr = "";
+            const req = { id: job.id, path: job.pdfPath, args: job.args };
+            w.child.stdin.write(JSON.stringify(req) + "\n");
+        }
+    }
+
+    private spawnWorker(): Worker {
+        const child = spawn(this.pythonExe, [this.opts.script, "--worker"], {
+            cwd: process.cwd(),
+            env: { ...process.env, PYTHONIOENCODING: "utf-8" },
+            stdio: ["pipe", "pipe", "pipe"],
+        });
+        const worker: Worker = { child, busy: null, stderr: "" };
+
+        const rl = readline.createInterface({ input: child.stdout });
+        rl.on("line", (line) => {
+            const job = worker.busy;
+            if (!job) return;
+            let msg: any;
+            try {
+                msg = JSON.parse(line);
+            } catch (e) {
+                worker.busy = null;
+                job.reject(new Error(`Invalid JSON from python worker: ${e}\nRaw: ${line}`));
+                return this.dispatch();
+            }
+            if (msg?.id !== job.id) return;
+            worker.busy = null;
+            job.resolve(msg.result);
+            this.dispatch();
+        });
+
+        child.stderr.on("data", (d) => {
+            // solo guardamos la cola para reportar errores
+            worker.stderr = (worker.stderr + d.toString("utf-8")).slice(-4000);
+        });
+
+        child.on("error", (err) => this.onExit(worker, err.message));
+        child.on("close", (code) => this.onExit(worker, `Python worker exited ${code}`));
+
+        this.workers.push(worker);
+        return worker;
+    }
+
+    private onExit(worker: Worker, reason: string) {
+        const idx = this.workers.indexOf(worker);
+        if (idx === -1) return;
+        this.workers.splice(idx, 1);
+        if (worker.busy) {
+            worker.busy.reject(new Error(`${reason}: ${worker.stderr}`));
+            worker.busy = null;
+        }
+        // reemplazo perezoso: dispatch() levanta otro worker si hay cola
+        this.dispatch();
+    }
+}
+
+// ---- Configuración por entorno ----
+// PY_WORKER_POOL=0 desactiva el pool (vuelve a un proceso por archivo).
+// PY_WORKER_POOL_SIZE=N fija el número de workers por script (por defecto: min(4, núcleos)).
+export function workerPoolEnabled(): boolean {
+    return String(process.env.PY_WORKER_POOL ?? "1") !== "0";
+}
+
+export function workerPoolSize(): number {
+    const n = parseInt(String(process.env.PY_WORKER_POOL_SIZE ?? ""), 10);
+    if (!Number.isNaN(n) && n > 0) return n;
+    return Math.min(4, os.cpus().length || 1);
+}
+
+const pools = new Map<string, PythonWorkerPool>();
+
+export function getWorkerPool(script: string): PythonWorkerPool {
+    let pool = pools.get(script);
+    if (!pool) {
+        pool = new PythonWorkerPool({ script, size: workerPoolSize() });
+        pools.set(script, pool);
+    }
+    return pool;
+}
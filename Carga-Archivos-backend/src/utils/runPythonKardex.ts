@@ -1,16 +1,31 @@
 import { spawn } from "node:child_process";
 import path from "node:path";
+import { getWorkerPool, workerPoolEnabled } from "./pythonWorkerPool";
+import { getParserQueue, killChild, ParserJobOptions } from "./parserJobQueue";
 
-export function runPythonKardex(pdfPath: string): Promise<any> {
+const KARDEX_SCRIPT = path.join(process.cwd(), "src/scripts/kardex.py");
+
+export function runPythonKardex(pdfPath: string, args: string[] = [], opts: ParserJobOptions = {}): Promise<any> {
+    // Todo parseo pasa por la cola (concurrencia, prioridad, timeout); con el pool
+    // activo se reutiliza un proceso Python con las librerías ya cargadas
+    return getParserQueue().run((signal) => {
+        if (workerPoolEnabled()) return getWorkerPool(KARDEX_SCRIPT).run(pdfPath, args, signal);
+        return spawnPythonKardex(pdfPath, args, signal);
+    }, { ...opts, label: opts.label ?? `kardex ${path.basename(pdfPath)}` });
+}
+
+function spawnPythonKardex(pdfPath: string, args: string[], signal?: AbortSignal): Promise<any> {
     return new Promise((resolve, reject) => {
         const pythonExe = "python";
-        const script = path.join(process.cwd(), "src/scripts/kardex.py");
+        const script = KARDEX_SCRIPT;
 
-        const child = spawn(pythonExe, [script, pdfPath], {
+        const child = spawn(pythonExe, [script, pdfPath, ...args], {
             cwd: process.cwd(),
             stdio: ["ignore", "pipe", "pipe"],
         });
 
+        signal?.addEventListener("abort", () => killChild(child), { once: true });
+
         let stdout = "";
         let stderr = "";
 
@@ -30,4 +45,4 @@ export function runPythonKardex(pdfPath: string): Promise<any> {
             }
         })
     })
-}
\ No newline at end of file
+}
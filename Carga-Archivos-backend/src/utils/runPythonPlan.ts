@@ -1,13 +1,28 @@
 import { spawn } from "child_process";
 import path from "path";
+import { getWorkerPool, workerPoolEnabled } from "./pythonWorkerPool";
+import { getParserQueue, killChild, ParserJobOptions } from "./parserJobQueue";
 
-export function runPythonPlan(pdfPath: string, args: string[] = []): Promise<any> {
+const PLAN_SCRIPT = path.join(process.cwd(), "src", "scripts", "plan_estudio.py");
+
+export function runPythonPlan(pdfPath: string, args: string[] = [], opts: ParserJobOptions = {}): Promise<any> {
+  // Todo parseo pasa por la cola (concurrencia, prioridad, timeout); con el pool
+  // activo se evita re-importar pandas/tabula en cada carga
+  return getParserQueue().run((signal) => {
+    if (workerPoolEnabled()) return getWorkerPool(PLAN_SCRIPT).run(pdfPath, args, signal);
+    return spawnPythonPlan(pdfPath, args, signal);
+  }, { ...opts, label: opts.label ?? `plan ${path.basename(pdfPath)}` });
+}
+
+function spawnPythonPlan(pdfPath: string, args: string[], signal?: AbortSignal): Promise<any> {
   return new Promise((resolve, reject) => {
-    const scriptPath = path.join(process.cwd(), "src", "scripts", "plan_estudio.py");
+    const scriptPath = PLAN_SCRIPT;
     const py = spawn("python", [scriptPath, pdfPath, ...args], {
       env: { ...process.env, PYTHONIOENCODING: "utf-8" },
     });
 
+    signal?.addEventListener("abort", () => killChild(py), { once: true });
+
     let out = "";
     let err = "";
 